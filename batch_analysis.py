@@ -0,0 +1,207 @@
+import argparse
+import json
+import multiprocessing
+import os
+import time
+import cv2
+from detection import seat_detections, seat_states_from_classes
+
+# ========== AYARLAR ==========
+OUTPUT_DIR = "batch_results"
+CHUNK_SIZE = 64        # frames per pool task (also the resume granularity)
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+# Worker process state (server module is imported once per process)
+_server = None
+
+
+# ========== FRAME KAYNAKLARI ==========
+def is_image_dir(source):
+    return os.path.isdir(source)
+
+
+def list_images(source):
+    return sorted(
+        os.path.join(source, name) for name in os.listdir(source)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+
+def count_frames(source):
+    """Kaynaktaki toplam frame sayısını ve FPS'i döndürür"""
+    if is_image_dir(source):
+        return len(list_images(source)), 0.0
+
+    cap = cv2.VideoCapture(source)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+    if total <= 0:
+        # Container does not report a length: count with grab() (no decode)
+        total = 0
+        while cap.grab():
+            total += 1
+    cap.release()
+    return total, fps
+
+
+def iter_frames(source, start=0, end=None, every=1):
+    """Video dosyası veya resim dizininden (index, pts_ms, frame) üretir"""
+    if is_image_dir(source):
+        paths = list_images(source)
+        for idx in range(start, min(end or len(paths), len(paths)), every):
+            frame = cv2.imread(paths[idx])
+            if frame is not None:
+                yield idx, None, frame
+        return
+
+    cap = cv2.VideoCapture(source)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+    if start:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    idx = start
+    try:
+        while end is None or idx < end:
+            if (idx - start) % every:
+                # Skipped frames are only grabbed, not decoded
+                if not cap.grab():
+                    break
+            else:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                yield idx, (idx * 1000.0 / fps) if fps else None, frame
+            idx += 1
+    finally:
+        cap.release()
+
+
+# ========== WORKER ==========
+def _init_worker(torch_threads):
+    """Her işlemde server modellerini bir kez yükler"""
+    global _server
+    import torch
+    # Split the cores between workers instead of every process using all of them
+    torch.set_num_threads(torch_threads)
+    import server
+    server.load_models()
+    _server = server
+
+
+def analyze_frame(cam_name, frame):
+    """Server'daki analiz mantığıyla tek bir frame için sonuç kaydı üretir"""
+    # analyze_worker resizes the RGB copy and converts back to BGR; resizing the
+    # BGR frame directly gives the same model input.
+    if _server.get_cam_type(cam_name) == "external":
+        # Same ROI crops / alert zones as the server
+        detections, in_zone = _server.detect_external_objects(cam_name, frame, _server.get_analysis_size(cam_name))
+        return {
+            "type": "external",
+            "detections": [[round(float(v), 2) for v in det[:5]] + [int(det[5])] for det in detections],
+            "alert": bool(in_zone.any())
+        }
+
+    model_frame = cv2.resize(frame, _server.get_analysis_size(cam_name))
+
+    detections = seat_detections(_server.seat_model, model_frame, _server.seat_conf())
+    seat_states, standing_count = seat_states_from_classes([int(cls) for cls in detections[:, 5]])
+    return {
+        "type": "internal",
+        "seat_states": seat_states,
+        "standing_count": standing_count,
+        "unbelted_count": seat_states.count("occupied")
+    }
+
+
+def process_chunk(task):
+    """Bir frame aralığını işler, kayıt listesini döndürür"""
+    source, cam_name, start, end, every = task
+    records = []
+    for idx, pts_ms, frame in iter_frames(source, start, end, every):
+        record = {"source": source, "cam": cam_name, "frame": idx, "pts_ms": pts_ms}
+        try:
+            record.update(analyze_frame(cam_name, frame))
+        except Exception as e:
+            record["error"] = str(e)
+        records.append(record)
+    return records
+
+
+# ========== DEVAM ETTİRME ==========
+def resume_position(output_path):
+    """Yarım kalan çıktıyı onarır ve bir sonraki frame indeksini döndürür"""
+    if not os.path.exists(output_path):
+        return 0
+
+    last_frame = None
+    valid_bytes = 0
+    with open(output_path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # partial line from an interrupted write
+            try:
+                last_frame = json.loads(line)["frame"]
+            except (ValueError, KeyError):
+                break
+            valid_bytes += len(line)
+
+    with open(output_path, "r+b") as f:
+        f.truncate(valid_bytes)
+    return 0 if last_frame is None else last_frame + 1
+
+
+def analyze_source(pool, source, cam_name, output_dir, every, chunk_size):
+    """Bir kaynağı süreç havuzu ile işler, sonuçları JSONL olarak yazar"""
+    stem = os.path.splitext(os.path.basename(os.path.normpath(source)))[0]
+    output_path = os.path.join(output_dir, f"{stem}.{cam_name}.jsonl")
+    total, fps = count_frames(source)
+    start = resume_position(output_path)
+    # Keep the sampling grid stable across resumes
+    start += (-start) % every
+
+    if start >= total:
+        print(f"✅ {source} zaten tamamlanmış ({total} frame)")
+        return
+
+    if start:
+        print(f"↩️ {source}: {start}. frame'den devam ediliyor")
+    print(f"📼 {source}: {total} frame, {fps:.1f} FPS, kamera={cam_name}")
+
+    step = chunk_size * every
+    tasks = [(source, cam_name, s, min(s + step, total), every) for s in range(start, total, step)]
+
+    processed = 0
+    started = time.time()
+    with open(output_path, "a", encoding="utf-8") as out:
+        # imap keeps chunk order so the file stays sorted by frame
+        for records in pool.imap(process_chunk, tasks):
+            for record in records:
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            processed += len(records)
+            elapsed = time.time() - started
+            print(f"📊 {stem}: {processed} frame işlendi ({processed / max(elapsed, 1e-6):.1f} frame/s)")
+
+    print(f"✅ Sonuçlar kaydedildi: {output_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kayıtlı görüntüler üzerinde toplu analiz")
+    parser.add_argument("sources", nargs="+", help="Video dosyaları veya resim dizinleri")
+    parser.add_argument("--cam", default="cam1", help="Kaynağın kamera adı (cam4 = koltuk analizi)")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    parser.add_argument("--every", type=int, default=1, help="Her N. frame analiz edilir")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    # spawn: PyTorch is not fork-safe once its thread pools are running
+    ctx = multiprocessing.get_context("spawn")
+    torch_threads = max(1, (os.cpu_count() or 1) // args.workers)
+    with ctx.Pool(args.workers, initializer=_init_worker, initargs=(torch_threads,)) as pool:
+        for source in args.sources:
+            analyze_source(pool, source, args.cam, args.output_dir, max(1, args.every), args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+import argparse
+import contextlib
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import cv2
+import numpy as np
+
+# Run from anywhere: python benchmarks/bench_server.py
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# ========== AYARLAR ==========
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+REGRESSION_THRESHOLD = 0.10   # median slower than baseline by more than this = regression
+ROUNDS = 7
+ROUND_TIME = 0.05             # seconds per round (iterations are calibrated to this)
+SEED = 0
+
+
+# ========== SAHTE MODEL ==========
+class _Tensor:
+    """Ultralytics tensörlerinin .cpu().numpy() arayüzü"""
+
+    def __init__(self, array):
+        self.array = array
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.array
+
+
+class _Boxes:
+    def __init__(self, detections):
+        self.xyxy = _Tensor(detections[:, :4])
+        self.conf = _Tensor(detections[:, 4])
+        self.cls = _Tensor(detections[:, 5])
+        self._count = len(detections)
+
+    def __len__(self):
+        return self._count
+
+
+class _Result:
+    def __init__(self, detections):
+        self.boxes = _Boxes(detections)
+
+
+class StubSeatModel:
+    """Sabit tespitler döndüren koltuk modeli: sadece son işlem ölçülür"""
+
+    def __init__(self, detections):
+        self.detections = detections
+
+    def __call__(self, frame, verbose=False, conf=0.25):
+        return [_Result(self.detections)]
+
+
+# ========== SABİT GİRDİLER ==========
+def make_frame(width=320, height=240):
+    """Tekrarlanabilir, JPEG'e gerçekçi sıkışan test karesi (BGR)"""
+    rng = np.random.default_rng(SEED)
+    frame = cv2.GaussianBlur(rng.integers(0, 256, (height, width, 3), dtype=np.uint8), (0, 0), 3)
+    frame = cv2.normalize(frame, None, 0, 255, cv2.NORM_MINMAX)
+    cv2.rectangle(frame, (width // 4, height // 3), (width // 2, height - 20), (40, 40, 200), -1)
+    cv2.putText(frame, "BENCH", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (255, 255, 255), 2)
+    return frame
+
+
+def make_seat_detections(count=12):
+    rng = np.random.default_rng(SEED)
+    xy = rng.uniform(0, 140, (count, 2))
+    boxes = np.concatenate([xy, xy + rng.uniform(10, 40, (count, 2))], axis=1)
+    conf = np.sort(rng.uniform(0.3, 0.95, count))[::-1]
+    cls = np.arange(count) % 3
+    return np.column_stack([boxes, conf, cls]).astype(np.float32)
+
+
+def make_external_detections(count=8, width=320, height=240):
+    rng = np.random.default_rng(SEED)
+    xy = rng.uniform(0, (width - 60, height - 60), (count, 2))
+    boxes = np.concatenate([xy, xy + rng.uniform(10, 60, (count, 2))], axis=1)
+    conf = rng.uniform(0.5, 0.95, count)
+    cls = rng.choice([0, 2, 16, 17], count)
+    return np.column_stack([boxes, conf, cls]).astype(np.float32)
+
+
+def build_cases(server):
+    """Ölçülecek fonksiyonlar: isim -> argümansız çağrı"""
+    detections = make_seat_detections()
+    server.seat_model.loader = lambda path: (StubSeatModel(detections), "fp32")
+    server.seat_model.load()
+
+    frame = make_frame()
+    _, encoded = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), 70])
+    raw_message = json.dumps({"cam": "cam1", "img": encoded.tobytes().hex(), "timestamp": 0.0}).encode("utf-8")
+    class_list = [int(cls) for cls in detections[:, 5]]
+    seat_states, standing_count = server.detect_seat_states_legacy(class_list)
+    seat_image = server.draw_seat_layout_with_icon(server.SEAT_MATRIX, seat_states, standing_count)
+    seat_input = cv2.resize(frame, server.Config.ANALYSIS_SIZE)
+    _, display_frame = server.prepare_analysis_frames("cam1", frame)
+    external = make_external_detections(width=display_frame.shape[1], height=display_frame.shape[0])
+
+    def receive_decode():
+        # zmq_receiver + decode pool: JSON parse, hex -> bytes, imdecode
+        message = json.loads(raw_message)
+        return server.decode_frame_payload(message["img"])
+
+    def analyze_prep_cam4():
+        analysis_frame, display = server.prepare_analysis_frames("cam4", frame)
+        return cv2.cvtColor(analysis_frame, cv2.COLOR_RGB2BGR), display
+
+    return {
+        "detect_seat_states": lambda: server.detect_seat_states(seat_input),
+        "detect_seat_states_legacy": lambda: server.detect_seat_states_legacy(class_list),
+        "draw_seat_layout_with_icon": lambda: server.draw_seat_layout_with_icon(
+            server.SEAT_MATRIX, seat_states, standing_count),
+        "receive_decode_json_hex": receive_decode,
+        "analyze_prep_external": lambda: server.prepare_analysis_frames("cam1", frame),
+        "analyze_prep_cam4": analyze_prep_cam4,
+        "draw_external_detections": lambda: server.draw_external_detections("cam1", display_frame, external),
+        "gui_frame_image_camera": lambda: server.gui_frame_image(display_frame),
+        "gui_frame_image_seat": lambda: server.gui_frame_image(seat_image),
+    }
+
+
+# ========== ÖLÇÜM ==========
+def measure(fn, rounds=ROUNDS, round_time=ROUND_TIME):
+    """Çağrı başına süreyi (mikrosaniye) turların medyanı olarak ölçer"""
+    fn()  # warm-up (caches, lazy init)
+    iterations = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        if time.perf_counter() - start >= round_time or iterations >= 1 << 20:
+            break
+        iterations *= 2
+
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        samples.append((time.perf_counter() - start) / iterations * 1e6)
+    samples = np.asarray(samples)
+    return {
+        "median_us": float(np.median(samples)),
+        "min_us": float(samples.min()),
+        "max_us": float(samples.max()),
+        "iterations": iterations * rounds
+    }
+
+
+def git_revision():
+    try:
+        rev = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+        dirty = subprocess.call(["git", "diff", "--quiet"], cwd=ROOT) != 0
+        return rev + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(only=None):
+    os.chdir(ROOT)  # seat_icon.png and other relative paths
+    # detect_seat_states logs every call; keep the formatting cost but not the terminal I/O
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        import server
+        cases = build_cases(server)
+        results = {}
+        for name, fn in cases.items():
+            if only and name not in only:
+                continue
+            results[name] = measure(fn)
+
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "machine": platform.machine(),
+            "cv2_threads": cv2.getNumThreads()
+        },
+        "results": results
+    }
+
+
+def latest_result(exclude=None):
+    paths = sorted(glob.glob(os.path.join(RESULTS_DIR, "*.json")), key=os.path.getmtime)
+    paths = [p for p in paths if os.path.abspath(p) != os.path.abspath(exclude or "")]
+    return paths[-1] if paths else None
+
+
+def compare(report, baseline, threshold):
+    """Medyanları karşılaştırır, gerileyen ölçümlerin listesini döndürür"""
+    regressions = []
+    print(f"{'ölçüm':30s} {'önceki':>10s} {'şimdi':>10s} {'fark':>8s}")
+    for name, result in report["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            print(f"{name:30s} {'-':>10s} {result['median_us']:10.1f}      yeni")
+            continue
+        change = result["median_us"] / old["median_us"] - 1.0
+        flag = ""
+        if change > threshold:
+            flag = "  ❌ gerileme"
+            regressions.append(name)
+        elif change < -threshold:
+            flag = "  ✅ iyileşme"
+        print(f"{name:30s} {old['median_us']:10.1f} {result['median_us']:10.1f} {change * 100:+7.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Server sıcak fonksiyonları için mikro benchmark (sahte modellerle)")
+    parser.add_argument("--only", nargs="+", default=None, help="Sadece bu ölçümler")
+    parser.add_argument("--output", default=None, help="Sonuç dosyası (varsayılan: benchmarks/results/<zaman>_<commit>.json)")
+    parser.add_argument("--compare", nargs="?", const="latest", default=None,
+                        help="Karşılaştırılacak sonuç dosyası (değer verilmezse en son kayıt)")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="Gerileme eşiği (0.10 = medyan %%10 yavaşladıysa)")
+    args = parser.parse_args()
+
+    # Resolve "latest" before writing this run's file
+    baseline_path = latest_result() if args.compare == "latest" else args.compare
+
+    report = run(args.only)
+    for name, result in report["results"].items():
+        print(f"⏱️ {name:30s} {result['median_us']:10.1f} µs  (min {result['min_us']:.1f}, {result['iterations']} çağrı)")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{time.strftime('%Y%m%d_%H%M%S')}_{report['meta']['revision']}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Sonuçlar kaydedildi: {output}")
+
+    if args.compare:
+        if not baseline_path or not os.path.exists(baseline_path):
+            print("⚠️ Karşılaştırılacak önceki sonuç bulunamadı")
+            return 0
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        print(f"📊 Karşılaştırma: {baseline['meta']['revision']} → {report['meta']['revision']}")
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} ölçümde %{args.threshold * 100:.0f} üzeri gerileme: {', '.join(regressions)}")
+            return 1
+        print("✅ Gerileme yok")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+import threading
+import time
+from collections import deque
+import cv2
+
+# ========== AYARLAR ==========
+FAIL_LIMIT = 5           # consecutive failed reads before the device is reopened
+STALL_TIMEOUT = 2.0      # seconds without a good frame = stalled device, reopen
+BACKOFF_START = 0.5      # first reopen delay, doubled after every failed attempt
+BACKOFF_MAX = 30.0
+HEALTH_WINDOW = 5.0      # seconds used for the FPS figure
+
+
+class SupervisedCamera:
+    """Bir kamerayı açık tutan VideoCapture sarmalayıcısı.
+
+    Art arda FAIL_LIMIT okuma hatası veya STALL_TIMEOUT boyunca kare gelmemesi durumunda
+    cihaz kapatılır ve artan beklemeyle (BACKOFF_START, x2, en fazla BACKOFF_MAX) yeniden
+    açılır. opener(device) her açılışta çağrılır, böylece çözünürlük/FPS/MJPG ayarları
+    yeniden uygulanır. Bekleme süresince read()/grab() beklemeden False döner; beklemeler
+    sadece kameranın kendi thread'inde olur, diğer kameraları etkilemez.
+
+    read(), grab() ve retrieve() VideoCapture ile aynıdır; health() sağlık bilgisini verir.
+    """
+
+    def __init__(self, name, device, opener=cv2.VideoCapture, fail_limit=FAIL_LIMIT,
+                 stall_timeout=STALL_TIMEOUT, backoff_start=BACKOFF_START, backoff_max=BACKOFF_MAX):
+        self.name = name
+        self.device = device
+        self.opener = opener
+        self.fail_limit = fail_limit
+        self.stall_timeout = stall_timeout
+        self.backoff_start = backoff_start
+        self.backoff_max = backoff_max
+        self.stats = {"frames": 0, "failures": 0, "reconnects": 0, "stalls": 0, "open_failures": 0}
+        self._cap = None
+        self._lock = threading.Lock()
+        self._opened_once = False
+        self._fails = 0
+        self._backoff = backoff_start
+        self._next_open = 0.0
+        self._since = time.time()       # start of the current FPS measurement
+        self._last_frame = self._since
+        self._busy_since = None         # a read()/grab() is inside the driver since then
+        self._grab_start = self._since
+        self._frame_times = deque()
+        self._read_ms = 0.0
+        self._open()
+
+    # ---------- VideoCapture interface ----------
+    def isOpened(self):
+        return self._cap is not None
+
+    def read(self):
+        if self._cap is None and not self._open():
+            return False, None
+        start = self._busy_since = time.time()
+        ret, frame = self._cap.read()
+        self._busy_since = None
+        self._record(ret, start)
+        return ret, frame if ret else None
+
+    def grab(self):
+        if self._cap is None and not self._open():
+            return False
+        start = self._busy_since = time.time()
+        ok = self._cap.grab()
+        self._busy_since = None
+        if ok:
+            self._grab_start = start
+        else:
+            self._record(False, start)
+        return ok
+
+    def retrieve(self):
+        if self._cap is None:
+            return False, None
+        ret, frame = self._cap.retrieve()
+        self._record(ret, self._grab_start)
+        return ret, frame if ret else None
+
+    def release(self):
+        with self._lock:
+            if self._cap is not None:
+                self._cap.release()
+                self._cap = None
+
+    # ---------- supervision ----------
+    def _open(self):
+        now = time.time()
+        if now < self._next_open:
+            return False
+        cap = self.opener(self.device)
+        if cap is None or not cap.isOpened():
+            if cap is not None:
+                cap.release()
+            with self._lock:
+                self.stats["open_failures"] += 1
+            print(f"[UYARI] {self.name} açılamadı ({self.device}), {self._backoff:.1f} s sonra tekrar denenecek")
+            self._schedule_retry(now)
+            return False
+
+        # Bound blocking reads where the backend supports it, so a stalled device fails instead of hanging
+        read_timeout = getattr(cv2, "CAP_PROP_READ_TIMEOUT_MSEC", None)
+        if read_timeout is not None:
+            cap.set(read_timeout, self.stall_timeout * 1000)
+        with self._lock:
+            self._cap = cap
+            self._fails = 0
+            self._since = self._last_frame = now
+            self._frame_times.clear()
+            if self._opened_once:
+                self.stats["reconnects"] += 1
+        if self._opened_once:
+            print(f"🔄 {self.name} yeniden açıldı ({self.device})")
+        self._opened_once = True
+        return True
+
+    def _schedule_retry(self, now):
+        self._next_open = now + self._backoff
+        self._backoff = min(self._backoff * 2, self.backoff_max)
+
+    def _record(self, ok, start):
+        now = time.time()
+        with self._lock:
+            if ok:
+                self.stats["frames"] += 1
+                self._fails = 0
+                self._last_frame = now
+                self._frame_times.append(now)
+                self._read_ms += ((now - start) * 1000 - self._read_ms) * 0.1
+                if now - self._since >= self.stall_timeout:
+                    # Stable since the last open: the next outage starts with a short wait again
+                    self._backoff = self.backoff_start
+                return
+            self.stats["failures"] += 1
+            self._fails += 1
+            stalled = now - self._last_frame >= self.stall_timeout
+            if not stalled and self._fails < self.fail_limit:
+                return
+            if stalled:
+                self.stats["stalls"] += 1
+            cap, self._cap = self._cap, None
+        print(f"⚠️ {self.name} {'takıldı' if stalled else 'okunamıyor'}, yeniden açılacak")
+        if cap is not None:
+            cap.release()
+        self._schedule_retry(now)
+
+    def health(self):
+        """Kameranın anlık sağlık bilgisi (başka thread'lerden çağrılabilir)"""
+        now = time.time()
+        with self._lock:
+            while self._frame_times and now - self._frame_times[0] > HEALTH_WINDOW:
+                self._frame_times.popleft()
+            span = min(HEALTH_WINDOW, now - self._since)
+            fps = len(self._frame_times) / span if span > 0 else 0.0
+            busy_since = self._busy_since
+            if self._cap is None:
+                state = "reconnecting"
+            elif (busy_since is not None and now - busy_since >= self.stall_timeout) or \
+                    now - self._last_frame >= self.stall_timeout:
+                state = "stalled"  # a read is stuck in the driver or nothing arrives
+            else:
+                state = "ok"
+            health = dict(self.stats)
+            health.update({
+                "state": state,
+                "fps": round(fps, 1),
+                "read_ms": round(self._read_ms, 1),
+                "last_frame_age_s": round(now - self._last_frame, 1),
+                "retry_in_s": round(max(self._next_open - now, 0.0), 1) if self._cap is None else 0.0
+            })
+        return health
+
+
+def camera_health(cameras):
+    """{cam_name: SupervisedCamera} -> {cam_name: sağlık bilgisi}"""
+    return {name: camera.health() for name, camera in list(cameras.items())
+            if isinstance(camera, SupervisedCamera)}
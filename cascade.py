@@ -0,0 +1,172 @@
+import argparse
+import json
+import time
+from collections import defaultdict
+import cv2
+import numpy as np
+from detection_metrics import agreement
+
+# ========== AYARLAR ==========
+HOLD_FRAMES = 5           # keep running the full model this many frames after a hit
+REFRESH_SEC = 2.0         # full model at least this often, even when the screen is quiet
+REPORT_PATH = "cascade_report.json"
+REPORT_CONFS = (0.10, 0.15, 0.25, 0.35, 0.50)
+
+
+class CascadeGate:
+    """İki aşamalı tespit için karar mantığı (kamera başına histerezis + periyodik yenileme).
+
+    decide(cam, screen_hit, now) -> tam model çalıştırılsın mı
+    update(cam, found) -> tam modelin sonucu (bulursa bekleme süresi yenilenir)
+    """
+
+    def __init__(self, hold_frames=HOLD_FRAMES, refresh_sec=REFRESH_SEC):
+        self.hold_frames = hold_frames
+        self.refresh_sec = refresh_sec
+        self.stats = {"screened": 0, "screen": 0, "hold": 0, "refresh": 0, "skipped": 0}
+        self._hold = defaultdict(int)
+        self._last_full = defaultdict(lambda: float("-inf"))
+
+    def decide(self, cam_name, screen_hit, now=None):
+        now = time.time() if now is None else now
+        self.stats["screened"] += 1
+        if screen_hit:
+            reason = "screen"
+            self._hold[cam_name] = self.hold_frames
+        elif self._hold[cam_name] > 0:
+            reason = "hold"
+            self._hold[cam_name] -= 1
+        elif now - self._last_full[cam_name] >= self.refresh_sec:
+            reason = "refresh"
+        else:
+            self.stats["skipped"] += 1
+            return False
+        self.stats[reason] += 1
+        self._last_full[cam_name] = now
+        return True
+
+    def update(self, cam_name, found):
+        # The screen can lose an object the full model still sees: keep watching it
+        if found:
+            self._hold[cam_name] = max(self._hold[cam_name], self.hold_frames)
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats["full_rate"] = 1.0 - stats["skipped"] / max(stats["screened"], 1)
+        return stats
+
+
+# ========== RECALL RAPORU ==========
+def simulate(frames, conf, hold_frames, refresh_sec):
+    """Kaydedilmiş (zaman, ilk aşama, tam model) sonuçları üzerinde kaskadı çalıştırır"""
+    gate = CascadeGate(hold_frames, refresh_sec)
+    tp = n_ref = positives = caught = 0
+    streak = worst_streak = 0
+    for now, screen, reference, alert in frames:
+        run_full = gate.decide("cam", bool((screen[:, 4] > conf).any()), now)
+        output = reference if run_full else reference[:0]
+        if run_full:
+            gate.update("cam", len(reference) > 0)
+        frame_tp, _, frame_refs = agreement(output, reference)
+        tp += frame_tp
+        n_ref += frame_refs
+        if alert:
+            positives += 1
+            caught += run_full
+            streak = 0 if run_full else streak + 1
+            worst_streak = max(worst_streak, streak)
+    stats = gate.get_stats()
+    return {
+        "screen_conf": conf,
+        "detection_recall": tp / n_ref if n_ref else 1.0,
+        "alert_frame_recall": caught / positives if positives else 1.0,
+        "alert_frames": positives,
+        "worst_missed_streak": worst_streak,
+        "full_rate": stats["full_rate"],
+        "reasons": {key: stats[key] for key in ("screen", "hold", "refresh", "skipped")}
+    }
+
+
+def cmd_report(args):
+    import server
+    from batch_analysis import iter_frames
+    from model_loader import load_screen_model
+    server.load_models()
+    # The NMS threshold inside the model must be at least as low as the lowest conf in the
+    # report, otherwise the lower rows only see boxes that already passed the default 0.25
+    server.screen_model.loader = lambda path: load_screen_model(
+        path or server.Config.CASCADE_SCREEN_MODEL_PATH, min(args.conf))
+    server.screen_model.load()
+
+    hold = server.Config.CASCADE_HOLD_FRAMES if args.hold is None else args.hold
+    refresh = server.Config.CASCADE_REFRESH_SEC if args.refresh is None else args.refresh
+    analysis_size = server.get_analysis_size(args.cam)
+    frames = []  # (time s, screen detections at the lowest conf, full detections, alert)
+    screen_times, full_times = [], []
+    for source in args.sources:
+        offset = frames[-1][0] + 60 if frames else 0.0  # sources never share a refresh window
+        for idx, pts_ms, frame in iter_frames(source, every=args.every):
+            now = offset + (pts_ms / 1000.0 if pts_ms is not None else idx / args.fps)
+            start = time.perf_counter()
+            screen = server.screen_external(cv2.resize(frame, analysis_size), min(args.conf))
+            screen_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            reference, in_zone = server.detect_external_objects(args.cam, frame, analysis_size)
+            full_times.append(time.perf_counter() - start)
+            frames.append((now, screen, reference, bool(in_zone.any())))
+            if args.limit and len(frames) >= args.limit:
+                break
+        print(f"📼 {source}: {len(frames)} kare")
+
+    if not frames:
+        print("❌ Değerlendirilecek kare bulunamadı")
+        return
+
+    screen_ms = float(np.mean(screen_times) * 1000)
+    full_ms = float(np.mean(full_times) * 1000)
+    results = []
+    for conf in sorted(args.conf):
+        result = simulate(frames, conf, hold, refresh)
+        result["est_ms_per_frame"] = screen_ms + result["full_rate"] * full_ms
+        results.append(result)
+        print(f"🔎 conf={conf:.2f}: recall(kutu)={result['detection_recall']:.3f}, "
+              f"recall(uyarı karesi)={result['alert_frame_recall']:.3f}, "
+              f"en uzun kaçırma={result['worst_missed_streak']} kare, "
+              f"tam model oranı=%{result['full_rate'] * 100:.0f}, ~{result['est_ms_per_frame']:.1f} ms/kare")
+
+    report = {
+        "cam": args.cam,
+        "sources": args.sources,
+        "frames": len(frames),
+        "hold_frames": hold,
+        "refresh_sec": refresh,
+        "screen_ms": screen_ms,
+        "full_ms": full_ms,
+        "results": results
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"⏱️ İlk aşama {screen_ms:.1f} ms, tam model {full_ms:.1f} ms (her karede tam model)")
+    print(f"✅ Rapor kaydedildi: {args.output}")
+    print("ℹ️ Seçilen eşiği server.Config.CASCADE_SCREEN_CONF içine yazın")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dış kamera kaskadı: her karede tam modele göre recall raporu")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    r = sub.add_parser("report", help="Kayıtlı görüntülerde kaskadı her karede tam model ile karşılaştır")
+    r.add_argument("sources", nargs="+", help="Video dosyaları veya resim dizinleri")
+    r.add_argument("--cam", default="cam1", help="Kaynağın kamera adı (ROI/uyarı bölgeleri için)")
+    r.add_argument("--every", type=int, default=1, help="Her N. kare (canlı FPS'e yakın tutun)")
+    r.add_argument("--fps", type=float, default=15.0, help="Resim dizinleri için varsayılan FPS")
+    r.add_argument("--conf", type=float, nargs="+", default=list(REPORT_CONFS), help="Denenecek ilk aşama eşikleri")
+    r.add_argument("--hold", type=int, default=None, help="Varsayılan: server.Config.CASCADE_HOLD_FRAMES")
+    r.add_argument("--refresh", type=float, default=None, help="Varsayılan: server.Config.CASCADE_REFRESH_SEC")
+    r.add_argument("--limit", type=int, default=None)
+    r.add_argument("--output", default=REPORT_PATH)
+    r.set_defaults(func=cmd_report)
+
+    args = parser.parse_args()
+    args.func(args)
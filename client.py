@@ -1,8 +1,17 @@
 import zmq
 import cv2
+import json
 import time
 import threading
 from queue import Queue
+from sync_capture import SyncCapture
+from control import ControlServer, CLIENT_CONTROL_ADDR
+from profiler import PROFILER, install_signal_handler, handle_profile_command
+from shm_transport import ShmRingWriter, LOCAL_IPC_ADDR, is_local_address, shm_available
+from video_codec import DeltaEncoder
+from detection_codec import build_message
+from deadlines import FrameDeadlines
+from camera_supervisor import SupervisedCamera, camera_health
 
 # ========== AYARLAR (Optimized for low latency) ==========
 CAMERA_IDS = [0, 2, 4, 6]  # Harici + iç kameralar (örnek)
@@ -17,12 +26,51 @@ FRAME_HEIGHT = 240
 # High Water Mark for ZMQ (prevents buffer buildup)
 ZMQ_HWM = 5
 
+# Grab all cameras at the same moment (grab() on every device, then retrieve())
+SYNC_CAPTURE = False
+
+# "frame": send every JPEG frame, detection runs on the server
+# "edge": run detection here, send compact detection records + low-rate thumbnails
+CLIENT_MODE = "frame"
+
+# Frame encoding for the network: "jpeg" = independent JPEG per frame,
+# "delta" = keyframe every VIDEO_GOP frames + only the changed blocks in between (video_codec.py)
+STREAM_CODEC = "jpeg"
+VIDEO_GOP = 30
+
+# Same-host install: raw frames go through shared memory, no JPEG encode/decode
+# "auto": used when ZMQ_SERVER_ADDR points to this machine, "shm": always, "tcp": never
+LOCAL_TRANSPORT = "auto"
+USE_SHM = shm_available() and (LOCAL_TRANSPORT == "shm" or
+                               (LOCAL_TRANSPORT == "auto" and is_local_address(ZMQ_SERVER_ADDR)))
+# Notifications are tiny; use the server's ipc:// endpoint when possible
+SEND_ADDR = LOCAL_IPC_ADDR if USE_SHM and zmq.has("ipc") else ZMQ_SERVER_ADDR
+
+# Frames older than this (capture -> send) are dropped instead of sent; keep in sync with
+# the server's Config.FRAME_MAX_AGE_MS
+FRAME_MAX_AGE_MS = {"default": 500, "cam4": 1000}
+
+# Camera health (FPS, read latency, reconnects) is sent to the server this often
+HEALTH_INTERVAL = 5.0
+
 # ========== ZMQ Context ==========
 context = zmq.Context()
 msg_queue = Queue(maxsize=QUEUE_MAX_SIZE)
 
+shm_writers = {}  # cam_name -> ShmRingWriter (one ring per camera)
+video_encoders = {}  # cam_name -> DeltaEncoder
+cameras = {}  # cam_name -> SupervisedCamera (reopened automatically when the device fails)
+
+send_deadlines = FrameDeadlines(FRAME_MAX_AGE_MS, clock_offset=False)  # same clock as capture
+
+edge_analyzer = None
+if CLIENT_MODE == "edge":
+    # Imported only in edge mode so the frame-mode client does not need torch
+    from edge_inference import EdgeAnalyzer
+    edge_analyzer = EdgeAnalyzer()
+
 # ========== Kamera Okuma Thread'i (Optimized) ==========
-def capture_single_camera(cam_id, cam_name):
+def open_camera(cam_id):
     cap = cv2.VideoCapture(cam_id)
     
     # Optimize camera settings for low latency
@@ -36,6 +84,68 @@ def capture_single_camera(cam_id, cam_name):
         cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc('M', 'J', 'P', 'G'))
     except:
         pass
+    return cap
+
+def enqueue_message(message):
+    # Use try_put to avoid blocking
+    try:
+        if msg_queue.qsize() < QUEUE_MAX_SIZE:
+            msg_queue.put_nowait(message)
+        else:
+            # Drop oldest frame if queue is full (prevent buildup)
+            try:
+                message_dropped(msg_queue.get_nowait())  # Remove oldest
+                msg_queue.put_nowait(message)
+            except:
+                pass
+    except:
+        pass  # Skip if queue operations fail
+
+def message_header(message):
+    """JSON mesajın kendisi, multipart mesajın başlığı"""
+    return json.loads(message[0]) if isinstance(message, list) else message
+
+def message_dropped(message):
+    """Gönderilemeden atılan mesaj bir video paketiyse o kamerada anahtar kare zorlanır"""
+    if isinstance(message, list):
+        header = message_header(message)
+        encoder = video_encoders.get(header.get("cam"))
+        if header.get("kind") == "video" and encoder is not None:
+            # The server cannot apply later deltas without this packet
+            encoder.force_keyframe()
+
+def frame_message(cam_name, frame, encode_param, timestamp, **fields):
+    """Kareyi mesaja çevirir: yerel server'a paylaşımlı bellek bildirimi, aksi halde delta video veya hex JPEG"""
+    if USE_SHM:
+        writer = shm_writers.get(cam_name)
+        if writer is None:
+            writer = shm_writers[cam_name] = ShmRingWriter(cam_name, max(frame.nbytes, FRAME_WIDTH * FRAME_HEIGHT * 3))
+        message = writer.write(frame, timestamp)
+        if message is not None:  # None: frame larger than the ring slots, send it as JPEG
+            message.update({"cam": cam_name, "timestamp": timestamp}, **fields)
+            return message
+
+    if STREAM_CODEC == "delta":
+        encoder = video_encoders.get(cam_name)
+        if encoder is None:
+            encoder = video_encoders[cam_name] = DeltaEncoder(gop=VIDEO_GOP, quality=JPEG_QUALITY)
+        with PROFILER.timer("video_encode"):
+            header, payload = encoder.encode(frame)
+        return build_message("video", cam_name, payload, timestamp=timestamp, **header, **fields)
+
+    with PROFILER.timer("jpeg_encode"):
+        _, encoded = cv2.imencode('.jpg', frame, encode_param)
+    message = {
+        "cam": cam_name,
+        "img": encoded.tobytes().hex(),
+        "timestamp": timestamp  # Add timestamp for latency measurement
+    }
+    message.update(fields)
+    return message
+
+def capture_single_camera(cam_id, cam_name):
+    # Opened (and reopened after failures) in this thread, so a dead device never blocks the others
+    cap = cameras[cam_name] = SupervisedCamera(cam_name, cam_id, open_camera)
 
     encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), JPEG_QUALITY]
     frame_count = 0
@@ -44,31 +154,13 @@ def capture_single_camera(cam_id, cam_name):
     while True:
         ret, frame = cap.read()
         if ret:
-            # Quick encode
-            _, encoded = cv2.imencode('.jpg', frame, encode_param)
-            
-            # Use try_put to avoid blocking
-            try:
-                if msg_queue.qsize() < QUEUE_MAX_SIZE:
-                    msg_queue.put_nowait({
-                        "cam": cam_name,
-                        "img": encoded.tobytes().hex(),
-                        "timestamp": time.time()  # Add timestamp for latency measurement
-                    })
-                else:
-                    # Drop oldest frame if queue is full (prevent buildup)
-                    try:
-                        msg_queue.get_nowait()  # Remove oldest
-                        msg_queue.put_nowait({
-                            "cam": cam_name,
-                            "img": encoded.tobytes().hex(),
-                            "timestamp": time.time()
-                        })
-                    except:
-                        pass
-            except:
-                pass  # Skip if queue operations fail
-            
+            if edge_analyzer is not None:
+                # Detection runs here; only compact records (+ thumbnails) are sent
+                for message in edge_analyzer.analyze(cam_name, frame, time.time()):
+                    enqueue_message(message)
+            else:
+                enqueue_message(frame_message(cam_name, frame, encode_param, time.time()))
+
             frame_count += 1
             
             # Print FPS info every 5 seconds
@@ -78,17 +170,55 @@ def capture_single_camera(cam_id, cam_name):
                 print(f"📊 {cam_name} FPS: {fps:.1f}")
                 
         else:
-            print(f"[UYARI] {cam_name} için görüntü alınamadı.")
+            # The supervisor reopens the device with backoff; read() returns at once meanwhile
             time.sleep(0.1)  # Short sleep only on error
             
         # No sleep here - capture as fast as possible
 
+# ========== Eşzamanlı Kamera Okuma ==========
+def capture_synced_cameras():
+    for cam_id, cam_name in zip(CAMERA_IDS, CAMERA_NAMES):
+        cameras[cam_name] = SupervisedCamera(cam_name, cam_id, open_camera)
+    sync = SyncCapture(cameras, target_fps=TARGET_FPS).start()
+
+    encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), JPEG_QUALITY]
+    while True:
+        frame_set = sync.get(timeout=1.0)
+        if frame_set is None:
+            print("[UYARI] Eşzamanlı kare kümesi alınamadı.")
+            continue
+
+        for cam_name, frame in frame_set.frames.items():
+            if edge_analyzer is not None:
+                for message in edge_analyzer.analyze(cam_name, frame, frame_set.grab_times[cam_name]):
+                    enqueue_message(message)
+                continue
+            enqueue_message(frame_message(cam_name, frame, encode_param, frame_set.grab_times[cam_name],
+                                          set_id=frame_set.seq, skew_ms=round(frame_set.skew_ms, 2)))
+
+        if frame_set.seq % (TARGET_FPS * 5) == 0:
+            stats = sync.stats
+            print(f"🎯 Senkron kümeler: {stats['sets']}, eksik: {stats['incomplete']}, "
+                  f"ort. kayma: {stats['skew_ms_avg']:.1f}ms, maks: {stats['skew_ms_max']:.1f}ms")
+
+# ========== Kamera Sağlığı ==========
+def health_reporter():
+    """Kamera sağlık bilgisini düzenli olarak server'a gönderir"""
+    while True:
+        time.sleep(HEALTH_INTERVAL)
+        report = camera_health(cameras)
+        if report:
+            enqueue_message({"kind": "health", "cameras": report, "timestamp": time.time()})
+            unhealthy = [name for name, health in report.items() if health["state"] != "ok"]
+            if unhealthy:
+                print(f"🩺 Sorunlu kameralar: {', '.join(unhealthy)}")
+
 # ========== ZMQ Gönderici Thread'i (Optimized) ==========
 def zmq_sender():
     socket = context.socket(zmq.PUSH)
     socket.setsockopt(zmq.SNDHWM, ZMQ_HWM)  # Set high water mark
     socket.setsockopt(zmq.LINGER, 0)  # Don't wait on close
-    socket.connect(ZMQ_SERVER_ADDR)
+    socket.connect(SEND_ADDR)
     print("📤 ZMQ bağlantısı kuruldu, düşük gecikme modu aktif...")
 
     sent_count = 0
@@ -99,21 +229,37 @@ def zmq_sender():
             # Non-blocking get
             message = msg_queue.get_nowait()
             
-            # Calculate and remove timestamp to reduce payload
-            if "timestamp" in message:
-                latency = (time.time() - message["timestamp"]) * 1000
-                del message["timestamp"]
-                if sent_count % 50 == 0:  # Print latency every 50 frames
-                    print(f"⏱️ Client latency: {latency:.1f}ms")
+            # The capture timestamp travels with the frame: the server checks the age at every stage
+            header = message_header(message)
+            if not send_deadlines.fresh("send", header.get("cam"), header.get("timestamp")):
+                # Waited too long in the queue: not worth the bandwidth
+                message_dropped(message)
+                continue
             
-            socket.send_json(message, zmq.NOBLOCK)
+            try:
+                if isinstance(message, list):
+                    # Edge / delta video: multipart [header, binary payload]
+                    with PROFILER.timer("zmq_send"):
+                        socket.send_multipart(message, zmq.NOBLOCK)
+                else:
+                    if "timestamp" in message and sent_count % 50 == 0:  # Print latency every 50 frames
+                        latency = (time.time() - message["timestamp"]) * 1000
+                        print(f"⏱️ Client latency: {latency:.1f}ms")
+                    
+                    with PROFILER.timer("zmq_send"):
+                        socket.send_json(message, zmq.NOBLOCK)
+            except zmq.Again:
+                # Send buffer full (HWM): this message is lost
+                message_dropped(message)
+                continue
             sent_count += 1
             
             # Print throughput every 5 seconds
             if sent_count % (TARGET_FPS * 5) == 0:
                 elapsed = time.time() - start_time
                 throughput = sent_count / elapsed
-                print(f"📤 Gönderim hızı: {throughput:.1f} frame/s")
+                print(f"📤 Gönderim hızı: {throughput:.1f} frame/s, "
+                      f"bayat atılan: {send_deadlines.get_stats()['dropped'].get('send', 0)}")
                 
         except:
             # No messages in queue, very short sleep
@@ -125,12 +271,32 @@ print(f"   - Hedef FPS: {TARGET_FPS}")
 print(f"   - JPEG Kalitesi: {JPEG_QUALITY}%") 
 print(f"   - Queue boyutu: {QUEUE_MAX_SIZE}")
 print(f"   - Frame boyutu: {FRAME_WIDTH}x{FRAME_HEIGHT}")
+print(f"   - Mod: {CLIENT_MODE}, kodlama: {STREAM_CODEC}")
+print(f"   - Taşıma: {'paylaşımlı bellek (' + SEND_ADDR + ')' if USE_SHM else 'JPEG (' + SEND_ADDR + ')'}")
+
+if edge_analyzer is not None:
+    # Load before capture starts so the first frames are not stuck behind model loading
+    edge_analyzer.load_models()
+    print("✅ Edge modu: tespit client üzerinde çalışıyor")
+
+if SYNC_CAPTURE:
+    threading.Thread(target=capture_synced_cameras, name="capture_sync", daemon=True).start()
+    print(f"✅ Eşzamanlı yakalama başlatıldı ({len(CAMERA_IDS)} kamera)")
+else:
+    for cam_id, cam_name in zip(CAMERA_IDS, CAMERA_NAMES):
+        threading.Thread(target=capture_single_camera, args=(cam_id, cam_name), name=f"capture_{cam_name}", daemon=True).start()
+        print(f"✅ {cam_name} thread başlatıldı (kamera ID: {cam_id})")
 
-for cam_id, cam_name in zip(CAMERA_IDS, CAMERA_NAMES):
-    threading.Thread(target=capture_single_camera, args=(cam_id, cam_name), daemon=True).start()
-    print(f"✅ {cam_name} thread başlatıldı (kamera ID: {cam_id})")
+threading.Thread(target=zmq_sender, name="zmq_sender", daemon=True).start()
+threading.Thread(target=health_reporter, name="health_reporter", daemon=True).start()
 
-threading.Thread(target=zmq_sender, daemon=True).start()
+# Profiling on demand: kill -USR1 <pid> or `python control.py profile --addr tcp://127.0.0.1:5557`
+control_server = ControlServer(CLIENT_CONTROL_ADDR)
+control_server.register("profile", handle_profile_command)
+control_server.register("deadlines", lambda request: {"deadlines": send_deadlines.get_stats()})
+control_server.register("health", lambda request: {"cameras": camera_health(cameras)})
+control_server.start()
+install_signal_handler()
 
 # ========== Main Thread (çalışmayı sürdürmek için) ==========
 try:
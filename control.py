@@ -0,0 +1,103 @@
+import argparse
+import json
+import threading
+import zmq
+
+# ========== AYARLAR ==========
+# Sadece yerel makineden erişilebilir
+SERVER_CONTROL_ADDR = "tcp://127.0.0.1:5556"
+CLIENT_CONTROL_ADDR = "tcp://127.0.0.1:5557"
+REQUEST_TIMEOUT_MS = 5000
+
+
+class ControlServer:
+    """Yerel kontrol soketi: JSON komutlarını kayıtlı işleyicilere yönlendirir.
+
+    İstek: {"cmd": "<komut>", ...}  Yanıt: {"ok": bool, ...}
+    """
+
+    def __init__(self, addr=SERVER_CONTROL_ADDR):
+        self.addr = addr
+        self.handlers = {"help": lambda request: {"commands": sorted(self.handlers)}}
+
+    def register(self, cmd, handler):
+        """handler(request) -> dict yanıt"""
+        self.handlers[cmd] = handler
+
+    def start(self):
+        threading.Thread(target=self._run, name="control_server", daemon=True).start()
+        return self
+
+    def _run(self):
+        context = zmq.Context.instance()
+        socket = context.socket(zmq.REP)
+        socket.setsockopt(zmq.LINGER, 0)
+        try:
+            socket.bind(self.addr)
+        except zmq.ZMQError as e:
+            print(f"[HATA] Kontrol soketi açılamadı ({self.addr}): {e}")
+            return
+        print(f"🎛️ Kontrol soketi dinleniyor: {self.addr}")
+
+        while True:
+            try:
+                request = socket.recv_json()
+            except ValueError:
+                socket.send_json({"ok": False, "error": "geçersiz JSON"})
+                continue
+            if not isinstance(request, dict):
+                # Valid JSON but not {"cmd": ...}: still reply, REP must answer every request
+                socket.send_json({"ok": False, "error": "istek bir JSON nesnesi olmalı"})
+                continue
+
+            handler = self.handlers.get(request.get("cmd"))
+            if handler is None:
+                reply = {"ok": False, "error": f"bilinmeyen komut: {request.get('cmd')}"}
+            else:
+                try:
+                    reply = {"ok": True}
+                    reply.update(handler(request) or {})
+                except Exception as e:
+                    reply = {"ok": False, "error": str(e)}
+            socket.send_json(reply, default=str)
+
+
+def send_command(request, addr=SERVER_CONTROL_ADDR, timeout_ms=REQUEST_TIMEOUT_MS):
+    """Kontrol soketine komut gönderir, yanıtı döndürür (zaman aşımında None)"""
+    context = zmq.Context.instance()
+    socket = context.socket(zmq.REQ)
+    socket.setsockopt(zmq.LINGER, 0)
+    socket.connect(addr)
+    try:
+        socket.send_json(request)
+        if socket.poll(timeout_ms):
+            return socket.recv_json()
+        return None
+    finally:
+        socket.close()
+
+
+def _parse_value(value):
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Çalışan server/client'a kontrol komutu gönder")
+    parser.add_argument("cmd", help="Komut adı (ör. status, reload, help)")
+    parser.add_argument("params", nargs="*", help="key=value parametreleri (ör. slot=seat path=yeni.pt)")
+    parser.add_argument("--addr", default=SERVER_CONTROL_ADDR)
+    args = parser.parse_args()
+
+    request = {"cmd": args.cmd}
+    for param in args.params:
+        key, _, value = param.partition("=")
+        request[key] = _parse_value(value)
+
+    reply = send_command(request, args.addr)
+    if reply is None:
+        print("❌ Yanıt alınamadı (server çalışıyor mu?)")
+    else:
+        print(json.dumps(reply, indent=2, ensure_ascii=False, default=str))
@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import defaultdict
+
+# ========== KARE YAŞI SINIRLARI ==========
+# Her kare yakalama zamanını (client saati, time.time()) taşır. Her aşama pahalı işten
+# önce karenin yaşını kameranın sınırıyla karşılaştırır ve bayat kareyi atar:
+#   send (client gönderici) -> receive (server alıcı) -> decode (çözücü havuzu)
+#   -> analyze (analiz thread'i) -> gui (ekrana çizim)
+# Client ve server saatleri farklı olabilir: server, gelen her mesaj için (varış - yakalama)
+# farkının kayan minimumunu tutar. Bu tahmin saat farkını kuyruk gecikmesinden ayıramaz
+# (dakikalarca süren bir tıkanıklıkta minimum da büyür), bu yüzden sadece max_skew_ms'i aşarsa
+# gerçek saat farkı sayılıp düşülür; altında saatler senkron kabul edilir (fark = 0) ve
+# kuyrukta bekleyen kareler gerçek yaşlarıyla atılır. Paylaşımlı bellek (aynı makine, aynı saat)
+# ile gelen kameralar için tahmin hiç yapılmaz.
+STAGES = ("send", "receive", "decode", "analyze", "gui")
+DEFAULT_MAX_AGE_MS = 500
+DEFAULT_MAX_SKEW_MS = 2000   # NTP-synced hosts stay well below this; queueing delay must too
+OFFSET_WINDOW_SEC = 30.0   # minimum is taken over the last 1-2 windows (follows clock drift/steps)
+
+
+class ClockOffset:
+    """Kaynak başına saat farkı tahmini: (varış - yakalama) değerinin kayan minimumu"""
+
+    def __init__(self, window_sec=OFFSET_WINDOW_SEC):
+        self.window_sec = window_sec
+        self._current = {}   # source -> [window start, min in this window]
+        self._previous = {}  # source -> min of the previous window
+
+    def observe(self, source, timestamp, now):
+        delta = now - timestamp
+        current = self._current.get(source)
+        if current is None or now - current[0] >= self.window_sec:
+            if current is not None:
+                self._previous[source] = current[1]
+            self._current[source] = [now, delta]
+        elif delta < current[1]:
+            current[1] = delta
+
+    def sources(self):
+        return list(self._current)
+
+    def get(self, source):
+        """Saniye cinsinden fark (server saati - client saati + en iyi ağ gecikmesi), yoksa 0"""
+        current = self._current.get(source)
+        if current is None:
+            return 0.0
+        previous = self._previous.get(source)
+        return current[1] if previous is None else min(current[1], previous)
+
+
+class FrameDeadlines:
+    """Kamera başına en fazla kare yaşını uygular, atılan kareleri aşamaya göre sayar.
+
+    max_age_ms: {"default": ms, "cam4": ms, ...}; 0 veya None o kamerada sınırı kapatır.
+    clock_offset=False: kareler aynı saatle damgalanmış (client tarafı).
+    max_skew_ms: tahmin edilen fark bunu aşmadıkça saatler senkron kabul edilir.
+    """
+
+    def __init__(self, max_age_ms=None, clock_offset=True, max_skew_ms=DEFAULT_MAX_SKEW_MS):
+        self.max_age_ms = dict(max_age_ms or {})
+        self.offsets = ClockOffset() if clock_offset else None
+        self.max_skew = (max_skew_ms or 0) / 1000.0
+        self.same_clock = set()           # cameras stamped with this process's clock (shared memory)
+        self.dropped = defaultdict(int)   # stage -> count
+        self.checked = defaultdict(int)
+        self.dropped_by_cam = defaultdict(int)
+        self.last_age_ms = {}             # stage -> age of the last checked frame
+        self._lock = threading.Lock()
+
+    def max_age(self, cam_name):
+        """Kameranın sınırı (saniye), sınır yoksa None"""
+        limit = self.max_age_ms.get(cam_name, self.max_age_ms.get("default", DEFAULT_MAX_AGE_MS))
+        return limit / 1000.0 if limit else None
+
+    def observe(self, cam_name, timestamp, now=None, same_clock=False):
+        """Alınan mesajın damgasıyla saat farkı tahminini günceller (server alıcısı).
+        same_clock=True: mesaj aynı makineden geldi, kamera için tahmin kalıcı olarak kapanır."""
+        if same_clock:
+            self.same_clock.add(cam_name)
+            return
+        if cam_name in self.same_clock:
+            return
+        if self.offsets is not None and timestamp is not None:
+            with self._lock:
+                self.offsets.observe(cam_name, timestamp, time.time() if now is None else now)
+
+    def offset(self, cam_name):
+        """Yaştan düşülecek saat farkı (saniye): tahmin max_skew'i aşmıyorsa 0"""
+        if self.offsets is None or cam_name in self.same_clock:
+            return 0.0
+        estimate = self.offsets.get(cam_name)
+        return estimate if abs(estimate) > self.max_skew else 0.0
+
+    def age(self, cam_name, timestamp, now=None):
+        """Karenin yaşı (saniye, bu sürecin saatine göre)"""
+        now = time.time() if now is None else now
+        return now - timestamp - self.offset(cam_name)
+
+    def fresh(self, stage, cam_name, timestamp, now=None):
+        """Kare sınır içindeyse True; değilse aşamanın sayacını artırıp False döner.
+        Damgası olmayan kareler (eski client) her zaman geçer."""
+        if timestamp is None:
+            return True
+        limit = self.max_age(cam_name)
+        age = self.age(cam_name, timestamp, now)
+        with self._lock:
+            self.checked[stage] += 1
+            self.last_age_ms[stage] = age * 1000
+            if limit is None or age <= limit:
+                return True
+            self.dropped[stage] += 1
+            self.dropped_by_cam[cam_name] += 1
+        return False
+
+    def get_stats(self):
+        with self._lock:
+            stats = {
+                "dropped": {stage: self.dropped[stage] for stage in STAGES if stage in self.checked},
+                "checked": {stage: self.checked[stage] for stage in STAGES if stage in self.checked},
+                "last_age_ms": {stage: round(self.last_age_ms[stage], 1)
+                                for stage in STAGES if stage in self.last_age_ms},
+                "dropped_by_cam": dict(self.dropped_by_cam),
+                "max_age_ms": self.max_age_ms
+            }
+            if self.offsets is not None:
+                # Raw estimate per camera and whether it is applied (beyond max_skew_ms)
+                stats["clock_offset_ms"] = {cam: round(self.offsets.get(cam) * 1000, 1)
+                                            for cam in self.offsets.sources() if cam not in self.same_clock}
+                stats["clock_offset_applied"] = sorted(cam for cam in stats["clock_offset_ms"]
+                                                       if self.offset(cam))
+                stats["same_clock"] = sorted(self.same_clock)
+        return stats
@@ -0,0 +1,126 @@
+import threading
+from collections import deque
+
+# ========== AYARLAR ==========
+DECODE_WORKERS = 2
+MAX_PENDING = 15        # queued non-droppable packets per camera (~1 s of video at 15 FPS)
+
+
+class DecodePool:
+    """Sıkıştırılmış kareleri thread havuzunda çözer.
+
+    - Her kamera için aynı anda en fazla bir çözme yapılır, böylece kamera başına
+      sıra korunur; farklı kameralar paralel çözülür (OpenCV çözme sırasında GIL'i bırakır).
+    - Bir kameranın bekleyen karesi varken yenisi gelirse eskisi çözülmeden atılır.
+      droppable=False ile gönderilenler (ör. kareler arası video paketleri) atılmaz,
+      sırayla çözülür. key=True ile gelen paket (anahtar kare) kamerada bekleyen her şeyin
+      yerini alır. Bekleyenler max_pending'i aşarsa (çözme geride kaldı) hepsi atılır ve
+      sonraki anahtar kareye kadar gelen paketler de atılır.
+
+    decode_fn(payload) -> frame (veya None)
+    on_frame(cam_name, frame, meta) çözülen her kare için worker thread'inde çağrılır.
+    expired(cam_name, meta) True dönerse atılabilir kare çözülmeden atılır (yaş sınırı).
+    initializer() her worker thread'inin başında bir kez çağrılır (ör. çekirdek ataması).
+    """
+
+    def __init__(self, decode_fn, on_frame, workers=DECODE_WORKERS, expired=None, initializer=None,
+                 max_pending=MAX_PENDING):
+        self.decode_fn = decode_fn
+        self.on_frame = on_frame
+        self.workers = workers
+        self.expired = expired
+        self.initializer = initializer
+        self.max_pending = max_pending
+        self.stats = {"submitted": 0, "decoded": 0, "stale_dropped": 0, "expired": 0, "failed": 0,
+                      "superseded": 0, "overflow_dropped": 0}
+        self._pending = {}      # cam_name -> deque of [payload, meta, droppable]
+        self._ready = deque()   # cameras with pending work and no decode in flight
+        self._in_flight = set()
+        self._resync = set()    # cameras dropping packets until their next keyframe
+        self._cond = threading.Condition()
+
+    def start(self):
+        for i in range(self.workers):
+            threading.Thread(target=self._run, name=f"decoder_{i}", daemon=True).start()
+        return self
+
+    def submit(self, cam_name, payload, meta=None, droppable=True, key=False):
+        """Sıkıştırılmış kareyi kuyruğa ekler (alım döngüsünü hiç bekletmez)"""
+        with self._cond:
+            self.stats["submitted"] += 1
+            pending = self._pending.get(cam_name)
+            if key:
+                self._resync.discard(cam_name)
+                if pending:
+                    # A keyframe replaces the reference: nothing queued before it is needed any more
+                    self.stats["superseded"] += len(pending)
+                    pending.clear()
+                    pending.append([payload, meta, droppable])
+                    return
+            elif not droppable and cam_name in self._resync:
+                self.stats["overflow_dropped"] += 1
+                return
+            if pending:
+                if droppable and pending[-1][2]:
+                    # An older frame of this camera was never decoded: skip it
+                    self.stats["stale_dropped"] += 1
+                    pending[-1] = [payload, meta, droppable]
+                elif not droppable and len(pending) >= self.max_pending:
+                    # Decoding fell behind: drop the backlog and everything up to the next keyframe
+                    self.stats["overflow_dropped"] += len(pending) + 1
+                    del self._pending[cam_name]
+                    self._resync.add(cam_name)
+                else:
+                    pending.append([payload, meta, droppable])
+                return
+            self._pending[cam_name] = deque([[payload, meta, droppable]])
+            # After an overflow the camera may still be scheduled with its old (dropped) backlog
+            if cam_name not in self._in_flight and cam_name not in self._ready:
+                self._ready.append(cam_name)
+            self._cond.notify()
+
+    def get_stats(self):
+        with self._cond:
+            stats = dict(self.stats)
+            stats["pending"] = sum(len(pending) for pending in self._pending.values())
+        return stats
+
+    def _run(self):
+        if self.initializer is not None:
+            self.initializer()
+        while True:
+            with self._cond:
+                while not self._ready:
+                    self._cond.wait()
+                cam_name = self._ready.popleft()
+                pending = self._pending.get(cam_name)
+                if not pending:
+                    continue  # its backlog was dropped (overflow) after it was scheduled
+                payload, meta, droppable = pending.popleft()
+                if not pending:
+                    del self._pending[cam_name]
+                self._in_flight.add(cam_name)
+
+            expired = droppable and self.expired is not None and self.expired(cam_name, meta)
+            frame = None
+            if not expired:
+                try:
+                    frame = self.decode_fn(payload)
+                    if frame is not None:
+                        self.on_frame(cam_name, frame, meta)
+                except Exception as e:
+                    frame = None
+                    print(f"[HATA] Kare çözme hatası ({cam_name}): {e}")
+
+            with self._cond:
+                self._in_flight.discard(cam_name)
+                if expired:
+                    self.stats["expired"] += 1
+                elif frame is None:
+                    self.stats["failed"] += 1
+                else:
+                    self.stats["decoded"] += 1
+                # A newer frame arrived while we were decoding
+                if cam_name in self._pending:
+                    self._ready.append(cam_name)
+                    self._cond.notify()
@@ -0,0 +1,146 @@
+import numpy as np
+from detection_metrics import as_detection_array, box_iou
+
+# ========== ORTAK TESPİT MANTIĞI ==========
+# Server, raporlama ve toplu analiz araçları aynı sınıf/eşik mantığını
+# kullansın diye model çıktısının işlenmesi burada toplanır.
+TARGET_CLASSES = {0: "insan", 2: "arac", 16: "kedi", 17: "kopek"}
+SEAT_MATRIX = [
+    [1, 1, 0, 1],
+    [1, 1, 0, 1],
+    [1, 1, 0, 1],
+    [1, 1, 1, 1]
+]
+TOTAL_SEATS = sum(cell for row in SEAT_MATRIX for cell in row)
+
+# ROI crops are letterboxed to this size (AutoShape default is 640)
+ROI_INFERENCE_SIZE = 320
+ROI_DUPLICATE_IOU = 0.6  # same object seen by two overlapping ROIs
+
+
+def seat_states_from_classes(class_list):
+    """Sınıf listesini koltuk durumlarına ve ayakta yolcu sayısına çevirir"""
+    seat_states = []
+    standing_count = 0
+    for i in range(TOTAL_SEATS):
+        if i < len(class_list):
+            cls = class_list[i]
+            if cls == 2:  # Belted passenger
+                seat_states.append("belted")
+            elif cls == 1:  # Occupied but not belted
+                seat_states.append("occupied")
+            else:  # Empty seat, person standing
+                seat_states.append("empty")
+                standing_count += 1
+        else:
+            seat_states.append("empty")
+    return seat_states, standing_count
+
+
+def external_output_detections(results, index=0):
+    """YOLOv5 (AutoShape) çıktısını (N, 6) diziye çevirir (batch içinde index. görüntü)"""
+    return as_detection_array(results.xyxy[index])
+
+
+def seat_output_detections(results):
+    """Ultralytics çıktısını güvene göre sıralı (N, 6) diziye çevirir"""
+    boxes = getattr(results[0], "boxes", None)
+    if boxes is None or len(boxes) == 0:
+        return np.zeros((0, 6), dtype=np.float32)
+    detections = np.concatenate([
+        boxes.xyxy.cpu().numpy(),
+        boxes.conf.cpu().numpy()[:, None],
+        boxes.cls.cpu().numpy()[:, None]
+    ], axis=1).astype(np.float32)
+    # NMS output is usually sorted already, but ONNX/int8 backends do not guarantee it
+    return detections[np.argsort(-detections[:, 4], kind="stable")]
+
+
+def external_detections(model, frame, conf_threshold, size=None):
+    """YOLOv5 çıktısından hedef sınıflarda ve eşiği geçen kutuları (N, 6) döndürür"""
+    detections = external_output_detections(model(frame) if size is None else model(frame, size=size))
+    return _filter_targets(detections, conf_threshold)
+
+
+def _filter_targets(detections, conf_threshold):
+    keep = np.isin(detections[:, 5], list(TARGET_CLASSES)) & (detections[:, 4] > conf_threshold)
+    return detections[keep]
+
+
+# ========== ROI (ilgi bölgeleri) ==========
+# Kamera başına bölgeler: {"name": "kapi", "box": (x1, y1, x2, y2), "alert": True}
+# box kare boyutuna oranlı (0-1); alert=False bölgeler sadece çizim/izleme içindir.
+
+def roi_pixel_boxes(rois, width, height):
+    """Oranlı ROI kutularını piksel koordinatlarına çevirir"""
+    boxes = []
+    for roi in rois:
+        x1, y1, x2, y2 = roi["box"]
+        px1 = min(max(int(x1 * width), 0), width - 1)
+        py1 = min(max(int(y1 * height), 0), height - 1)
+        px2 = min(max(int(round(x2 * width)), px1 + 1), width)
+        py2 = min(max(int(round(y2 * height)), py1 + 1), height)
+        boxes.append((px1, py1, px2, py2))
+    return boxes
+
+
+def external_detections_in_rois(model, frame, rois, conf_threshold, size=ROI_INFERENCE_SIZE):
+    """Sadece ROI kırpmalarını tek batch'te modele verir, kutuları tam kare koordinatlarına taşır"""
+    if not rois:
+        return external_detections(model, frame, conf_threshold)
+
+    height, width = frame.shape[:2]
+    boxes = roi_pixel_boxes(rois, width, height)
+    results = model([frame[y1:y2, x1:x2] for x1, y1, x2, y2 in boxes], size=size)
+
+    parts = []
+    for i, (x1, y1, _, _) in enumerate(boxes):
+        detections = _filter_targets(external_output_detections(results, i), conf_threshold)
+        detections[:, [0, 2]] += x1
+        detections[:, [1, 3]] += y1
+        parts.append(detections)
+    detections = np.concatenate(parts)
+    return _suppress_duplicates(detections) if len(boxes) > 1 else detections
+
+
+def _suppress_duplicates(detections, iou_threshold=ROI_DUPLICATE_IOU):
+    """Örtüşen ROI'lerde iki kez görülen nesneleri (aynı sınıf, yüksek IoU) tekilleştirir"""
+    if len(detections) < 2:
+        return detections
+    detections = detections[np.argsort(-detections[:, 4], kind="stable")]
+    ious = box_iou(detections[:, :4], detections[:, :4])
+    ious = np.where(detections[:, None, 5] == detections[None, :, 5], ious, 0.0)
+    keep = np.ones(len(detections), dtype=bool)
+    for i in range(len(detections)):
+        if keep[i]:
+            keep[i + 1:] &= ious[i, i + 1:] < iou_threshold
+    return detections[keep]
+
+
+def scale_detections(detections, from_size, to_size):
+    """Kutuları (genişlik, yükseklik) from_size'dan to_size'a ölçekler"""
+    if tuple(from_size) == tuple(to_size):
+        return detections
+    scaled = detections.copy()
+    scaled[:, [0, 2]] *= to_size[0] / from_size[0]
+    scaled[:, [1, 3]] *= to_size[1] / from_size[1]
+    return scaled
+
+
+def alert_zone_mask(detections, rois, width, height):
+    """Merkezi uyarı bölgelerinden birinde olan tespitler için True (ROI yoksa hepsi)"""
+    alert_rois = [roi for roi in rois if roi.get("alert", True)] if rois else None
+    if alert_rois is None:
+        return np.ones(len(detections), dtype=bool)
+    cx = (detections[:, 0] + detections[:, 2]) / 2 / width
+    cy = (detections[:, 1] + detections[:, 3]) / 2 / height
+    mask = np.zeros(len(detections), dtype=bool)
+    for roi in alert_rois:
+        x1, y1, x2, y2 = roi["box"]
+        mask |= (cx >= x1) & (cx < x2) & (cy >= y1) & (cy < y2)
+    return mask
+
+
+def seat_detections(model, frame, conf_threshold):
+    """Koltuk modelinin kutularını güvene göre sıralı (N, 6) dizi olarak döndürür"""
+    return seat_output_detections(model(frame, verbose=False, conf=conf_threshold))
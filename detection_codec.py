@@ -0,0 +1,82 @@
+import json
+import struct
+from collections import namedtuple
+import numpy as np
+
+# ========== EDGE MESAJ FORMATI ==========
+# Edge modunda client, kare yerine ZMQ multipart mesajları gönderir:
+#   [başlık JSON, yük]
+#   başlık: {"v": 1, "kind": "det" | "seat" | "thumb", "cam": "cam1", "timestamp": ..., "seq": ...}
+#   det   -> kompakt tespit kaydı (encode_detections)
+#   seat  -> koltuk durum kodları (encode_seat_states)
+#   thumb -> düşük çözünürlüklü JPEG baytları (ekranda göstermek için)
+# Eski mod (tek parçalı JSON, hex JPEG) server tarafından aynen kabul edilmeye devam eder.
+PROTOCOL_VERSION = 1
+MESSAGE_KINDS = ("det", "seat", "thumb")
+
+# Detection record: <width, height, count> + count x 10-byte boxes
+DET_HEADER = struct.Struct("<HHH")
+DET_DTYPE = np.dtype([("box", "<u2", (4,)), ("conf", "u1"), ("cls", "u1")])
+
+# Seat record: <standing_count, seat_count> + one code per seat
+SEAT_HEADER = struct.Struct("<BB")
+SEAT_STATE_CODES = {"empty": 0, "occupied": 1, "belted": 2}
+SEAT_STATE_NAMES = {code: name for name, code in SEAT_STATE_CODES.items()}
+
+EdgeResult = namedtuple("EdgeResult", ["kind", "data", "size"])
+
+
+def encode_detections(detections, frame_size):
+    """(N, 6) tespit dizisini kompakt ikili kayda çevirir (kutu başına 10 bayt)"""
+    detections = np.asarray(detections, dtype=np.float32).reshape(-1, 6)
+    record = np.empty(len(detections), dtype=DET_DTYPE)
+    record["box"] = np.clip(np.rint(detections[:, :4]), 0, 0xFFFF)
+    record["conf"] = np.clip(np.rint(detections[:, 4] * 255), 0, 255)
+    record["cls"] = np.clip(detections[:, 5], 0, 255)
+    return DET_HEADER.pack(int(frame_size[0]), int(frame_size[1]), len(record)) + record.tobytes()
+
+
+def decode_detections(payload):
+    """Kompakt kaydı ((N, 6) float32 dizi, (genişlik, yükseklik)) olarak çözer"""
+    width, height, count = DET_HEADER.unpack_from(payload)
+    record = np.frombuffer(payload, dtype=DET_DTYPE, count=count, offset=DET_HEADER.size)
+    detections = np.empty((count, 6), dtype=np.float32)
+    detections[:, :4] = record["box"]
+    detections[:, 4] = record["conf"] / 255.0
+    detections[:, 5] = record["cls"]
+    return detections, (width, height)
+
+
+def encode_seat_states(seat_states, standing_count):
+    """Koltuk durumlarını koltuk başına bir bayta çevirir"""
+    codes = bytes(SEAT_STATE_CODES[state] for state in seat_states)
+    return SEAT_HEADER.pack(min(int(standing_count), 255), len(codes)) + codes
+
+
+def decode_seat_states(payload):
+    """İkili koltuk kaydını (durumlar, ayakta sayısı) olarak çözer"""
+    standing_count, count = SEAT_HEADER.unpack_from(payload)
+    codes = payload[SEAT_HEADER.size:SEAT_HEADER.size + count]
+    return [SEAT_STATE_NAMES.get(code, "empty") for code in codes], standing_count
+
+
+def build_message(kind, cam_name, payload, **fields):
+    """Edge mesajını ZMQ multipart parçaları olarak oluşturur"""
+    header = {"v": PROTOCOL_VERSION, "kind": kind, "cam": cam_name}
+    header.update(fields)
+    return [json.dumps(header, separators=(",", ":")).encode("utf-8"), payload]
+
+
+def parse_message(parts):
+    """Multipart edge mesajını (başlık, EdgeResult) olarak çözer"""
+    header = json.loads(parts[0])
+    kind = header.get("kind")
+    payload = parts[1]
+    if kind == "det":
+        detections, size = decode_detections(payload)
+        return header, EdgeResult(kind, detections, size)
+    if kind == "seat":
+        return header, EdgeResult(kind, decode_seat_states(payload), None)
+    if kind == "thumb":
+        return header, EdgeResult(kind, payload, None)
+    raise ValueError(f"bilinmeyen edge mesaj türü: {kind}")
@@ -0,0 +1,110 @@
+import numpy as np
+
+# ========== TESPİT METRİKLERİ ==========
+# Tespitler (N, 6) dizileri olarak tutulur: [x1, y1, x2, y2, conf, cls]
+# Referans kutular (ground truth veya fp32 çıktısı) aynı formatı kullanır,
+# conf sütunu referans tarafında dikkate alınmaz.
+
+
+def as_detection_array(rows):
+    """Liste/tensor tespitlerini (N, 6) float32 diziye çevirir"""
+    if rows is None:
+        return np.zeros((0, 6), dtype=np.float32)
+    if hasattr(rows, "cpu"):
+        rows = rows.cpu().numpy()
+    arr = np.asarray(rows, dtype=np.float32)
+    if arr.size == 0:
+        return np.zeros((0, 6), dtype=np.float32)
+    return arr.reshape(-1, 6)
+
+
+def box_iou(a, b):
+    """İki kutu kümesi arasındaki IoU matrisini hesaplar, (len(a), len(b))"""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def match_detections(preds, refs, iou_threshold=0.5):
+    """Aynı sınıftaki tahminleri referanslarla açgözlü (güvene göre) eşleştirir.
+
+    Her tahmin için eşleşip eşleşmediğini (true positive) döndürür.
+    """
+    preds = as_detection_array(preds)
+    refs = as_detection_array(refs)
+    order = np.argsort(-preds[:, 4], kind="stable")
+    tp = np.zeros(len(preds), dtype=bool)
+    if len(refs) == 0:
+        return tp
+    ious = box_iou(preds[:, :4], refs[:, :4])
+    same_class = preds[:, None, 5] == refs[None, :, 5]
+    ious = np.where(same_class, ious, 0.0)
+    used = np.zeros(len(refs), dtype=bool)
+    for i in order:
+        candidates = np.where(used, -1.0, ious[i])
+        j = int(np.argmax(candidates))
+        if candidates[j] >= iou_threshold:
+            used[j] = True
+            tp[i] = True
+    return tp
+
+
+def agreement(preds, refs, iou_threshold=0.5):
+    """Tek bir frame için (tp, tahmin sayısı, referans sayısı) döndürür"""
+    preds = as_detection_array(preds)
+    refs = as_detection_array(refs)
+    tp = int(match_detections(preds, refs, iou_threshold).sum())
+    return tp, len(preds), len(refs)
+
+
+def precision_recall_f1(tp, n_pred, n_ref):
+    """Toplam sayılardan precision, recall ve F1 hesaplar"""
+    precision = tp / n_pred if n_pred else 1.0
+    recall = tp / n_ref if n_ref else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return precision, recall, f1
+
+
+def average_precision(frames, iou_threshold=0.5):
+    """Sınıf başına AP@iou ve ortalamasını (mAP) hesaplar.
+
+    frames: [(tahminler, referanslar), ...] - her eleman bir frame
+    """
+    scores, hits, classes = [], [], []
+    ref_counts = {}
+    for preds, refs in frames:
+        preds = as_detection_array(preds)
+        refs = as_detection_array(refs)
+        hits.append(match_detections(preds, refs, iou_threshold))
+        scores.append(preds[:, 4])
+        classes.append(preds[:, 5])
+        for cls in refs[:, 5].astype(int):
+            ref_counts[int(cls)] = ref_counts.get(int(cls), 0) + 1
+
+    if not ref_counts:
+        return {}, 0.0
+    scores = np.concatenate(scores) if scores else np.zeros(0)
+    hits = np.concatenate(hits) if hits else np.zeros(0, dtype=bool)
+    classes = np.concatenate(classes).astype(int) if classes else np.zeros(0, dtype=int)
+
+    per_class = {}
+    for cls, n_ref in ref_counts.items():
+        mask = classes == cls
+        order = np.argsort(-scores[mask], kind="stable")
+        cls_hits = hits[mask][order]
+        tp = np.cumsum(cls_hits)
+        fp = np.cumsum(~cls_hits)
+        recall = np.concatenate([[0.0], tp / n_ref, [1.0]])
+        precision = np.concatenate([[1.0], tp / np.maximum(tp + fp, 1), [0.0]])
+        # All-point interpolation (VOC 2010+)
+        precision = np.flip(np.maximum.accumulate(np.flip(precision)))
+        steps = np.where(recall[1:] != recall[:-1])[0]
+        per_class[cls] = float(np.sum((recall[steps + 1] - recall[steps]) * precision[steps + 1]))
+    return per_class, float(np.mean(list(per_class.values())))
@@ -0,0 +1,86 @@
+import time
+import cv2
+from detection import external_detections, seat_detections, seat_states_from_classes, \
+    external_output_detections, seat_output_detections, external_detections_in_rois
+from detection_codec import build_message, encode_detections, encode_seat_states
+from model_loader import load_external_model, load_seat_model, conf_threshold
+from model_slots import ModelSlot
+
+# ========== AYARLAR ==========
+# Server'daki Config ile aynı tutulmalı (aynı karar, farklı makine)
+INTERNAL_CAMERAS = {"cam4"}                 # seat model; the others run the external model
+MODEL_PRECISION = "fp32"                    # "int8" runs the quantize_models.py outputs
+EXTERNAL_MODEL_INT8_PATH = "quantized_models/yolov5s_int8.onnx"
+SEAT_MODEL_PATH = "seat_model.pt"
+SEAT_MODEL_INT8_PATH = "quantized_models/seat_model_int8.onnx"
+ANALYSIS_SIZE = {"cam4": (160, 120)}        # others: (320, 240)
+DEFAULT_ANALYSIS_SIZE = (320, 240)
+EXTERNAL_ROIS = {}                          # same format as Config.EXTERNAL_ROIS on the server
+
+# Low-rate preview stream so the server GUI still has a picture
+THUMBNAIL_FPS = 2
+THUMBNAIL_SIZE = (160, 120)
+THUMBNAIL_QUALITY = 60
+
+
+class EdgeAnalyzer:
+    """Tespiti kameraların yanında çalıştırır, kare yerine kompakt sonuç mesajları üretir.
+
+    analyze(cam_name, frame) -> gönderilecek multipart mesajların listesi
+    (her kare için bir "det"/"seat" mesajı, THUMBNAIL_FPS hızında bir "thumb").
+    """
+
+    def __init__(self):
+        # Slots serialise calls from the capture threads and load lazily
+        self.external_model = ModelSlot(
+            "external", lambda path: load_external_model(MODEL_PRECISION, EXTERNAL_MODEL_INT8_PATH),
+            external_output_detections)
+        self.seat_model = ModelSlot(
+            "seat", lambda path: load_seat_model(MODEL_PRECISION, SEAT_MODEL_PATH, SEAT_MODEL_INT8_PATH),
+            seat_output_detections)
+        self._seq = {}
+        self._last_thumb = {}
+        self._thumb_param = [int(cv2.IMWRITE_JPEG_QUALITY), THUMBNAIL_QUALITY]
+
+    def load_models(self):
+        self.external_model.load()
+        self.seat_model.load()
+
+    def external_conf(self):
+        # Same per-precision table as the server (int8 may have fallen back to fp32)
+        return conf_threshold("external", self.external_model.precision)
+
+    def seat_conf(self):
+        return conf_threshold("seat", self.seat_model.precision)
+
+    def analyze(self, cam_name, frame, timestamp=None):
+        timestamp = timestamp if timestamp is not None else time.time()
+        seq = self._seq.get(cam_name, 0) + 1
+        self._seq[cam_name] = seq
+
+        size = ANALYSIS_SIZE.get(cam_name, DEFAULT_ANALYSIS_SIZE)
+        rois = EXTERNAL_ROIS.get(cam_name)
+        if cam_name in INTERNAL_CAMERAS or not rois:
+            model_frame = cv2.resize(frame, size) if frame.shape[1::-1] != size else frame
+
+        if cam_name in INTERNAL_CAMERAS:
+            detections = seat_detections(self.seat_model, model_frame, self.seat_conf())
+            seat_states, standing_count = seat_states_from_classes([int(cls) for cls in detections[:, 5]])
+            messages = [build_message("seat", cam_name, encode_seat_states(seat_states, standing_count),
+                                      timestamp=timestamp, seq=seq)]
+        elif rois:
+            # Crops from the full-resolution frame; boxes are sent in its coordinates
+            detections = external_detections_in_rois(self.external_model, frame, rois, self.external_conf())
+            messages = [build_message("det", cam_name, encode_detections(detections, frame.shape[1::-1]),
+                                      timestamp=timestamp, seq=seq)]
+        else:
+            detections = external_detections(self.external_model, model_frame, self.external_conf())
+            messages = [build_message("det", cam_name, encode_detections(detections, size),
+                                      timestamp=timestamp, seq=seq)]
+
+        if timestamp - self._last_thumb.get(cam_name, 0) >= 1.0 / THUMBNAIL_FPS:
+            self._last_thumb[cam_name] = timestamp
+            thumb = cv2.resize(frame, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+            _, encoded = cv2.imencode('.jpg', thumb, self._thumb_param)
+            messages.append(build_message("thumb", cam_name, encoded.tobytes(), timestamp=timestamp, seq=seq))
+        return messages
@@ -1,18 +1,20 @@
+import atexit
 import cv2
 import torch
 import os
 import itertools
+from sync_capture import grab_retrieve_once
+from snapshot_writer import SnapshotWriter
+from overlay import OverlayRenderer
+from camera_supervisor import SupervisedCamera
 # Kullanmak istediğin video cihazları (0, 2, 4 gibi)
 device_ids = [0]
 
-# Kameraları aç, düzgün açılmayan olursa bildir
+# Kameraları aç; açılamayan veya sonradan kopan kamera artan aralıklarla yeniden denenir
 cams = {}
 for i, dev_id in enumerate(device_ids, start=1):
-    cap = cv2.VideoCapture(dev_id)
-    if not cap.isOpened():
-        print(f"[HATA] Kamera /dev/video{dev_id} açılamadı!")
-    else:
-        cams[f"cam{i}"] = cap
+    cams[f"cam{i}"] = SupervisedCamera(f"cam{i}", dev_id)
+    if cams[f"cam{i}"].isOpened():
         print(f"Kamera /dev/video{dev_id} başarıyla açıldı.")
 
 # YOLOv5s modelini yükle
@@ -25,60 +27,76 @@ TARGET_CLASSES = {
     17: "Kopek",     # dog
 }
 
+# Snapshots keep their frame, so detections are drawn in place (no reusable buffers)
+overlay = OverlayRenderer(TARGET_CLASSES, color=(0, 255, 0), classes=TARGET_CLASSES, show_conf=False,
+                          font_scale=0.6, label_offset=10)
+
 # Kayıt klasörü varsa yoksa oluştur
 output_dir = "external_cameras"
 os.makedirs(output_dir, exist_ok=True)
 
+# Çıktılar atomik olarak yazılır (okuyanlar yarım dosya görmez); capture fonksiyonları
+# dönmeden önce yazmanın bitmesini bekler, çıkışta bekleyen yazma da kaybolmaz
+snapshot_writer = SnapshotWriter()
+atexit.register(snapshot_writer.flush)
+
 cam_cycle = itertools.cycle(cams.items())
 
 def capture_one():
     name, cap = next(cam_cycle)
     ret, frame = cap.read()
     if not ret:
-        print(f"[UYARI] {name} için kare alınamadı.")
+        print(f"[UYARI] {name} için kare alınamadı ({cap.health()['state']}).")
         return
 
     frame = cv2.resize(frame, (416, 416))
     results = model(frame)
-    detections = results.pred[0]
-
-    for *box, conf, cls in detections:
-        if int(cls) in TARGET_CLASSES:
-            x1, y1, x2, y2 = map(int, box)
-            label = TARGET_CLASSES[int(cls)]
-            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-            cv2.putText(frame, label, (x1, y1 - 10),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 1)
+    overlay.draw(frame, results.pred[0])
 
     output_path = os.path.join(output_dir, f"{name}_output.jpg")
-    cv2.imwrite(output_path, frame)
-    print(f"✅ {name} → Kaydedildi: {output_path}")
+    errors = snapshot_writer.get_stats()["errors"]
+    if not snapshot_writer.submit(output_path, frame):
+        print(f"❌ {name} → Yazma kuyruğu dolu: {output_path}")
+        return
+    wait_for_snapshots({name: output_path}, errors)
+
+def wait_for_snapshots(paths, errors_before):
+    """Kuyruğa alınan görüntüler diske yazılana kadar bekler ve sonucu bildirir"""
+    if not snapshot_writer.flush():
+        print(f"❌ Yazma zaman aşımına uğradı: {', '.join(paths.values())}")
+    elif snapshot_writer.get_stats()["errors"] > errors_before:
+        print(f"❌ Bazı görüntüler yazılamadı: {', '.join(paths.values())}")
+    else:
+        for name, output_path in paths.items():
+            print(f"✅ {name} → Kaydedildi: {output_path}")
 
 def capture():
-    for name, cap in cams.items():
-        ret, frame = cap.read()
-        if not ret:
-            print(f"[UYARI] {name} için kare alınamadı.")
-            continue
+    # Önce tüm kameralara grab(), sonra retrieve(): kareler aynı ana ait olur
+    frame_set = grab_retrieve_once(cams)
+    for name in frame_set.missing:
+        print(f"[UYARI] {name} için kare alınamadı ({cams[name].health()['state']}).")
+    if len(frame_set.frames) > 1:
+        print(f"🎯 Kameralar arası zaman farkı: {frame_set.skew_ms:.1f}ms")
 
+    saved = {}
+    errors = snapshot_writer.get_stats()["errors"]
+    for name, frame in frame_set.frames.items():
         # Performans için çözünürlüğü küçült
         frame = cv2.resize(frame, (416, 416))
 
         # YOLO tahmini
         results = model(frame)
-        detections = results.pred[0]
 
         # Tespit edilen nesneler üzerinden çizim yap
-        for *box, conf, cls in detections:
-            cls_id = int(cls)
-            if cls_id in TARGET_CLASSES:
-                x1, y1, x2, y2 = map(int, box)
-                label = TARGET_CLASSES[cls_id]
-                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                cv2.putText(frame, label, (x1, y1 - 10),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 1)
+        overlay.draw(frame, results.pred[0])
 
         # Sonuçları kaydet
         output_path = os.path.join(output_dir, f"{name}_output.jpg")
-        cv2.imwrite(output_path, frame)
-        print(f"✅ {name} → Kaydedildi: {output_path}")
+        if snapshot_writer.submit(output_path, frame):
+            saved[name] = output_path
+        else:
+            print(f"❌ {name} → Yazma kuyruğu dolu: {output_path}")
+
+    # Encoding/writing overlaps with the next camera's inference; wait once at the end
+    if saved:
+        wait_for_snapshots(saved, errors)
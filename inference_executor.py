@@ -0,0 +1,347 @@
+import argparse
+import itertools
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+
+# ========== ÇALIŞMA ZAMANI AYARI (THREAD / ÇEKİRDEK) ==========
+# Server aynı süreçte iki PyTorch modeli, OpenCV (çözme/resize/dönüşüm) ve Tk çalıştırır.
+# Her biri varsayılan olarak tüm çekirdekleri kullanmaya çalışınca thread'ler birbirini bekler.
+# Bu modül her modele kendi çıkarım thread'ini (thread sayısı + isteğe bağlı çekirdek listesi),
+# OpenCV'ye sabit thread sayısı, çözücü/analiz/GUI thread'lerine çekirdek listesi atar.
+# Ayarlar kurulum başına runtime_tuning.json dosyasından okunur (yoksa server.Config varsayılanları);
+# dosya bu donanımda "python inference_executor.py autotune <kayıtlar>" ile üretilir.
+TUNING_PATH = "runtime_tuning.json"
+ROLES = ("decoder", "analyze", "gui")
+AUTOTUNE_FRAMES = 40           # frames per stream per configuration
+AUTOTUNE_CV2_THREADS = (1, 2)
+
+# Cores this process may use (taskset/cgroup limits are respected); captured before any pinning
+ALL_CPUS = frozenset(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else None
+
+
+def parse_cpus(spec):
+    """"0-3,6" / [0, 1] / None -> çekirdek kümesi (None = kısıtlama yok)"""
+    if spec is None or spec == "":
+        return None
+    if isinstance(spec, int):
+        return {spec}
+    if not isinstance(spec, str):
+        return {int(cpu) for cpu in spec}
+    cpus = set()
+    for part in spec.split(","):
+        first, _, last = part.strip().partition("-")
+        cpus.update(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+def format_cpus(cpus):
+    """Çekirdek kümesini "0-3,6" biçimine çevirir"""
+    if not cpus:
+        return None
+    ranges = []
+    for _, group in itertools.groupby(enumerate(sorted(cpus)), lambda item: item[1] - item[0]):
+        group = [cpu for _, cpu in group]
+        ranges.append(str(group[0]) if len(group) == 1 else f"{group[0]}-{group[-1]}")
+    return ",".join(ranges)
+
+
+def pin_current_thread(cpus):
+    """Çağıran thread'i çekirdeklere bağlar (None = sürecin tüm çekirdekleri); desteklenmezse False.
+    Yeni thread'ler oluşturan thread'in maskesini miras aldığı için yönetilen her thread
+    kendi maskesini açıkça ayarlar."""
+    if ALL_CPUS is None:
+        return False
+    cpus = set(cpus) & ALL_CPUS if cpus else ALL_CPUS
+    try:
+        # pid 0 = the calling thread on Linux, not the whole process
+        os.sched_setaffinity(0, cpus or ALL_CPUS)
+        return True
+    except OSError as e:
+        print(f"[UYARI] Çekirdek ataması yapılamadı ({format_cpus(cpus)}): {e}")
+        return False
+
+
+def set_torch_threads(threads):
+    """Çağıran thread'in PyTorch intra-op thread sayısını ayarlar"""
+    import torch
+    # The first get_num_threads() on a thread copies the process-wide value into it; do it first so
+    # a later lazy init cannot overwrite this thread's count with another executor's setting
+    torch.get_num_threads()
+    torch.set_num_threads(threads)
+
+
+class InferenceExecutor:
+    """Bir modelin çıkarımlarını tek, ayarlı bir thread'de çalıştırır.
+
+    threads: o thread'in PyTorch thread sayısı (None = PyTorch varsayılanı)
+    cpus: çekirdek listesi (None = tüm çekirdekler); modelin OpenMP thread'leri de bunu miras alır.
+    PyTorch OpenMP ile derlendiğinde (Linux/Windows paketleri) thread sayısı thread başınadır,
+    böylece iki model kendi çekirdek gruplarında birbirini bölmeden çalışır. ONNX (int8)
+    oturumları kendi thread havuzunu kullanır; onlarda sadece çekirdek ataması etkilidir.
+    """
+
+    def __init__(self, name, threads=None, cpus=None):
+        self.name = name
+        self.threads = threads
+        self.cpus = parse_cpus(cpus)
+        self.stats = {"calls": 0, "busy_ms": 0.0}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"infer_{name}",
+                                        initializer=self._init_thread)
+
+    def _init_thread(self):
+        pin_current_thread(self.cpus)
+        if self.threads:
+            set_torch_threads(self.threads)
+
+    def _timed(self, fn, args, kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.stats["calls"] += 1
+                self.stats["busy_ms"] += (time.perf_counter() - start) * 1000
+
+    def submit(self, fn, *args, **kwargs):
+        """fn'i çıkarım thread'ine gönderir, Future döndürür"""
+        return self._pool.submit(self._timed, fn, args, kwargs)
+
+    def run(self, fn, *args, **kwargs):
+        """fn'i çıkarım thread'inde çalıştırıp sonucunu bekler (çağıran thread'den çağrılabilir)"""
+        if threading.current_thread().name.startswith(f"infer_{self.name}_"):
+            return self._timed(fn, args, kwargs)  # already on this executor (nested call)
+        return self.submit(fn, *args, **kwargs).result()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats["mean_ms"] = round(stats["busy_ms"] / stats["calls"], 2) if stats["calls"] else 0.0
+        stats["busy_ms"] = round(stats["busy_ms"], 1)
+        stats.update({"threads": self.threads, "cpus": format_cpus(self.cpus)})
+        return stats
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
+
+
+class RuntimeTuning:
+    """Kurulum başına thread/çekirdek ayarları.
+
+    {"opencv_threads": 2,
+     "executors": {"external": {"threads": 2, "cpus": "0-1"}, "seat": {"threads": 1, "cpus": "2"}},
+     "threads": {"decoder": {"cpus": "3"}, "analyze": {"cpus": "3"}, "gui": {"cpus": "3"}}}
+    """
+
+    def __init__(self, settings=None):
+        settings = settings or {}
+        self.opencv_threads = settings.get("opencv_threads")
+        self.executor_settings = dict(settings.get("executors") or {})
+        self.thread_settings = dict(settings.get("threads") or {})
+        self.source = settings.get("source")
+        self._executors = {}
+
+    @classmethod
+    def load(cls, path=TUNING_PATH, defaults=None):
+        """Varsayılanların üzerine dosyadaki ayarları uygular (dosya yoksa sadece varsayılanlar)"""
+        settings = json.loads(json.dumps(defaults or {}))  # deep copy
+        settings["source"] = "Config"
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    loaded = json.load(f)
+                for key in ("executors", "threads"):
+                    settings.setdefault(key, {}).update(loaded.get(key) or {})
+                if "opencv_threads" in loaded:
+                    settings["opencv_threads"] = loaded["opencv_threads"]
+                settings["source"] = path
+            except (OSError, ValueError) as e:
+                print(f"[UYARI] {path} okunamadı, varsayılan thread ayarları kullanılıyor: {e}")
+        return cls(settings)
+
+    def apply(self):
+        """Süreç geneli ayarlar (OpenCV thread sayısı); modeller yüklenmeden önce çağrılır"""
+        if self.opencv_threads is not None:
+            cv2.setNumThreads(int(self.opencv_threads))
+        return self
+
+    def executor(self, name):
+        """İsimli çıkarım thread'i (aynı isim aynı executor'ı döndürür)"""
+        executor = self._executors.get(name)
+        if executor is None:
+            settings = self.executor_settings.get(name) or {}
+            executor = self._executors[name] = InferenceExecutor(name, settings.get("threads"),
+                                                                 settings.get("cpus"))
+        return executor
+
+    def initializer(self, role):
+        """Bir thread'in başında çağrılacak çekirdek ataması (rol ayarı yoksa tüm çekirdekler)"""
+        cpus = parse_cpus((self.thread_settings.get(role) or {}).get("cpus"))
+        return lambda: pin_current_thread(cpus)
+
+    def status(self):
+        return {
+            "source": self.source,
+            "opencv_threads": cv2.getNumThreads(),
+            "cpus": format_cpus(ALL_CPUS),
+            "executors": {name: executor.get_stats() for name, executor in self._executors.items()},
+            "threads": self.thread_settings
+        }
+
+    def describe(self):
+        parts = [f"OpenCV {cv2.getNumThreads()} thread"]
+        for name, settings in self.executor_settings.items():
+            parts.append(f"{name}: {settings.get('threads') or 'varsayılan'} thread"
+                         + (f" @ {settings['cpus']}" if settings.get("cpus") else ""))
+        return ", ".join(parts)
+
+
+# ========== OTOMATİK AYAR ==========
+def candidate_settings(cpus, pin=True, cv2_threads=AUTOTUNE_CV2_THREADS):
+    """Denenecek ayarlar: iki modelin thread sayıları x çekirdek ataması x OpenCV thread sayısı"""
+    cpus = sorted(cpus)
+    cpu_count = len(cpus)
+    counts = sorted({1, 2, 4, 8, cpu_count // 2, cpu_count} - {0})
+    counts = [count for count in counts if count <= cpu_count]
+    yield {"opencv_threads": None, "executors": {}, "threads": {}, "label": "varsayılan"}
+    for external, seat in itertools.product(counts, counts):
+        for pinned in ((False, True) if pin else (False,)):
+            if pinned and external + seat > cpu_count:
+                continue
+            for opencv_threads in cv2_threads:
+                settings = {"opencv_threads": opencv_threads, "executors": {
+                    "external": {"threads": external}, "seat": {"threads": seat}}, "threads": {}}
+                if pinned:
+                    # Disjoint core groups for the models; OpenCV/decode/GUI get what is left
+                    # (or share the last core when the models take all of them)
+                    rest = cpus[external + seat:] or cpus[-1:]
+                    settings["executors"]["external"]["cpus"] = format_cpus(cpus[:external])
+                    settings["executors"]["seat"]["cpus"] = format_cpus(cpus[external:external + seat])
+                    settings["threads"] = {role: {"cpus": format_cpus(rest)} for role in ROLES}
+                settings["label"] = (f"dış={external} iç={seat} opencv={opencv_threads}"
+                                     + (" sabit" if pinned else ""))
+                yield settings
+
+
+def load_streams(sources, frames, every):
+    """Kayıtlardan dış kamera ve koltuk akışı için JPEG kareler (canlı sistemdeki gibi çözülecek)"""
+    from batch_analysis import iter_frames
+    encoded = []
+    for source in sources:
+        for _, _, frame in iter_frames(source, every=every):
+            ok, data = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), 70])
+            if ok:
+                encoded.append(data)
+            if len(encoded) >= frames:
+                return encoded
+    return encoded
+
+
+def run_workload(server, tuning, encoded, cam):
+    """Canlı sisteme benzer yük: iki akış kendi thread'inde çözer/hazırlar, modelleri executor'larda çalıştırır"""
+    tuning.apply()
+    slots = {"external": server.external_model, "seat": server.seat_model}
+    for name, slot in slots.items():
+        slot.executor = tuning.executor(name)
+    latencies = {"external": [], "seat": []}
+
+    def external_stream():
+        tuning.initializer("decoder")()
+        for data in encoded:
+            start = time.perf_counter()
+            frame = cv2.imdecode(data, cv2.IMREAD_COLOR)
+            server.detect_external_objects(cam, frame, server.get_analysis_size(cam))
+            latencies["external"].append(time.perf_counter() - start)
+
+    def seat_stream():
+        tuning.initializer("analyze")()
+        for data in encoded:
+            start = time.perf_counter()
+            frame = cv2.imdecode(data, cv2.IMREAD_COLOR)
+            analysis_frame, _ = server.prepare_analysis_frames("cam4", frame)
+            server.seat_detections(server.seat_model, cv2.cvtColor(analysis_frame, cv2.COLOR_RGB2BGR),
+                                   server.seat_conf())
+            latencies["seat"].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=external_stream), threading.Thread(target=seat_stream)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    for slot in slots.values():
+        slot.executor.shutdown()
+        slot.executor = None
+    result = {"fps": round(2 * len(encoded) / elapsed, 2)}
+    for name, values in latencies.items():
+        values = np.asarray(values) * 1000
+        result[f"{name}_ms"] = round(float(np.median(values)), 2)
+        result[f"{name}_p95_ms"] = round(float(np.percentile(values, 95)), 2)
+    return result
+
+
+def cmd_autotune(args):
+    import server
+    server.load_models()
+    encoded = load_streams(args.sources, args.frames, max(1, args.every))
+    if not encoded:
+        print("❌ Denenecek kare bulunamadı")
+        return
+
+    cpus = ALL_CPUS or range(os.cpu_count() or 1)
+    candidates = list(candidate_settings(cpus, pin=ALL_CPUS is not None))
+    print(f"🧪 {len(encoded)} kare, {len(cpus)} çekirdek, {len(candidates)} ayar denenecek")
+    # Warm-up: first inferences allocate and JIT; they would penalise whichever setting runs first
+    run_workload(server, RuntimeTuning(), encoded[:5], args.cam)
+
+    results = []
+    for settings in candidates:
+        label = settings.pop("label")
+        result = run_workload(server, RuntimeTuning(settings), encoded, args.cam)
+        results.append({"label": label, "settings": settings, **result})
+        print(f"⏱️ {label:32s} {result['fps']:7.1f} kare/s  dış {result['external_ms']:.1f} ms "
+              f"(p95 {result['external_p95_ms']:.1f}), iç {result['seat_ms']:.1f} ms (p95 {result['seat_p95_ms']:.1f})")
+
+    # Highest combined throughput; p95 latency breaks near-ties (within 2%)
+    top_fps = max(result["fps"] for result in results)
+    best = min((result for result in results if result["fps"] >= top_fps * 0.98),
+               key=lambda result: max(result["external_p95_ms"], result["seat_p95_ms"]))
+    baseline = results[0]
+    output = dict(best["settings"])
+    output["autotune"] = {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "cpus": format_cpus(ALL_CPUS),
+        "frames": len(encoded),
+        "sources": args.sources,
+        "label": best["label"],
+        "fps": best["fps"],
+        "baseline_fps": baseline["fps"],
+        "results": results
+    }
+    with open(args.output, "w") as f:
+        json.dump(output, f, indent=2, ensure_ascii=False)
+    print(f"🏆 En iyi: {best['label']} ({best['fps']:.1f} kare/s, varsayılan {baseline['fps']:.1f} kare/s)")
+    print(f"✅ Ayarlar kaydedildi: {args.output} (server başlangıçta okur)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Model/OpenCV thread sayıları ve çekirdek ataması")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    a = sub.add_parser("autotune", help="Kayıtlı karelerde ayarları dener, bu donanım için en iyisini yazar")
+    a.add_argument("sources", nargs="+", help="Video dosyaları veya resim dizinleri")
+    a.add_argument("--cam", default="cam1", help="Dış kamera akışı için kamera adı (ROI ayarları)")
+    a.add_argument("--frames", type=int, default=AUTOTUNE_FRAMES, help="Ayar başına akış başına kare")
+    a.add_argument("--every", type=int, default=1, help="Her N. kare")
+    a.add_argument("--output", default=TUNING_PATH)
+    a.set_defaults(func=cmd_autotune)
+
+    args = parser.parse_args()
+    args.func(args)
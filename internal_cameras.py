@@ -1,9 +1,12 @@
+import atexit
 import cv2
 import numpy as np
 import os
 import time
 from ultralytics import YOLO
 from PIL import Image, ImageDraw, ImageFont
+from snapshot_writer import SnapshotWriter
+from camera_supervisor import SupervisedCamera
 
 # ==== AYARLAR ====
 SEAT_MATRIX = [
@@ -23,8 +26,10 @@ SEAT_STATUS_COLOR = {
 }
 
 model = YOLO(MODEL_PATH)
-cap = cv2.VideoCapture(0)
+cap = SupervisedCamera("cam4", 0)  # reopened with backoff if the device drops out
 icon = Image.open("seat_icon.png").convert("RGBA")
+snapshot_writer = SnapshotWriter()
+atexit.register(snapshot_writer.flush)  # a queued write is not lost on exit
 def detect_seat_states(frame):
     """Kameradan alınan görüntüdeki kişi sınıflarını analiz eder ve ayakta olan sayısını döndürür."""
     results = model(frame, verbose=False)[0]
@@ -89,11 +94,16 @@ def draw_seat_layout_with_icon(matrix, states, standing_count):
 
 def capture():
     ret, frame = cap.read()
+    if not ret:
+        print(f"[UYARI] cam4 için kare alınamadı ({cap.health()['state']}).")
+        return
     seat_states, standing_count = detect_seat_states(frame)
     sim_img = draw_seat_layout_with_icon(SEAT_MATRIX, seat_states, standing_count)
 
-    result = cv2.imwrite(SAVE_PATH, sim_img)
-    if result:
+    # Wait for the write: callers expect the file to exist once capture() returns
+    errors = snapshot_writer.get_stats()["errors"]
+    if snapshot_writer.submit(SAVE_PATH, sim_img) and snapshot_writer.flush() \
+            and snapshot_writer.get_stats()["errors"] == errors:
         print(f"✅ Güncellendi: {SAVE_PATH}")
     else:
         print(f"❌ Kaydedilemedi: {SAVE_PATH}")
@@ -0,0 +1,91 @@
+import os
+import torch
+from ultralytics import YOLO
+
+# ========== MODEL YÜKLEYİCİ ==========
+# Desteklenen hassasiyetler: "fp32" (orijinal PyTorch ağırlıkları) ve
+# "int8" (quantize_models.py ile üretilen statik quantize ONNX modelleri)
+PRECISIONS = ("fp32", "int8")
+FALLBACK_SEAT_MODEL = "yolov8n.pt"
+SCREEN_MODEL = "yolov5n"  # first stage of the external cascade
+# Detection confidence thresholds per model and precision, shared by the server and edge mode
+# (re-tune the int8 rows from the quantize_models.py report)
+CONF_THRESHOLDS = {
+    "external": {"fp32": 0.5, "int8": 0.5},
+    "seat": {"fp32": 0.25, "int8": 0.25}
+}
+
+
+def conf_threshold(model_name, precision):
+    """Yüklenen modelin gerçek hassasiyetine göre güven eşiği (henüz yüklenmediyse fp32)"""
+    return CONF_THRESHOLDS[model_name][precision or "fp32"]
+
+
+def load_external_model(precision="fp32", int8_path=None):
+    """Dış kamera modelini (YOLOv5s) yükler, (model, gerçek hassasiyet) döndürür"""
+    if precision == "int8":
+        if int8_path and os.path.exists(int8_path):
+            # YOLOv5 hub, ONNX dosyalarını DetectMultiBackend ile çalıştırır;
+            # AutoShape sarmalayıcısı sayesinde results.xyxy arayüzü aynı kalır
+            model = torch.hub.load('ultralytics/yolov5', 'custom', path=int8_path)
+            print(f"✅ Dış kamera modeli int8 olarak yüklendi: {int8_path}")
+            return model, "int8"
+        print(f"⚠️ int8 dış kamera modeli bulunamadı ({int8_path}), fp32 kullanılacak")
+
+    model = torch.hub.load('ultralytics/yolov5', 'yolov5s')
+    model.to("cpu").eval()
+    return model, "fp32"
+
+
+def load_screen_model(path=None, conf=None):
+    """Kaskadın ilk aşaması için küçük YOLOv5 modelini yükler.
+    conf: AutoShape'in NMS eşiği (varsayılan 0.25); altındaki kutular hiç dönmez."""
+    if path:
+        model, precision = load_external_model_file(path)
+    else:
+        model = torch.hub.load('ultralytics/yolov5', SCREEN_MODEL)
+        model.to("cpu").eval()
+        precision = "fp32"
+    if conf is not None:
+        model.conf = conf
+    return model, precision
+
+
+def load_seat_model(precision="fp32", fp32_path="seat_model.pt", int8_path=None):
+    """Koltuk modelini yükler, (model, gerçek hassasiyet) döndürür"""
+    if precision == "int8":
+        if int8_path and os.path.exists(int8_path):
+            model = YOLO(int8_path, task="detect")
+            print(f"✅ Koltuk modeli int8 olarak yüklendi: {int8_path}")
+            return model, "int8"
+        print(f"⚠️ int8 koltuk modeli bulunamadı ({int8_path}), fp32 kullanılacak")
+
+    try:
+        if os.path.exists(fp32_path):
+            model = YOLO(fp32_path)
+            print("✅ Koltuk modeli yüklendi")
+        else:
+            print("⚠️ Koltuk modeli bulunamadı, varsayılan model kullanılacak")
+            model = YOLO(FALLBACK_SEAT_MODEL)  # Fallback to default model
+    except Exception as e:
+        print(f"⚠️ Model yükleme hatası: {e}, varsayılan model kullanılacak")
+        model = YOLO(FALLBACK_SEAT_MODEL)
+    return model, "fp32"
+
+
+def precision_from_path(path):
+    """Dosya adından hassasiyeti tahmin eder (quantize_models.py çıktıları *_int8.onnx)"""
+    return "int8" if "int8" in os.path.basename(path) else "fp32"
+
+
+def load_external_model_file(path):
+    """Verilen dosyadan dış kamera modeli yükler (.pt veya .onnx)"""
+    model = torch.hub.load('ultralytics/yolov5', 'custom', path=path)
+    if path.endswith(".pt"):
+        model.to("cpu").eval()
+    return model, precision_from_path(path)
+
+
+def load_seat_model_file(path):
+    """Verilen dosyadan koltuk modeli yükler (.pt veya .onnx)"""
+    return YOLO(path, task="detect"), precision_from_path(path)
@@ -0,0 +1,187 @@
+import os
+import threading
+import time
+from collections import deque
+from detection_metrics import agreement, precision_recall_f1
+
+# ========== AYARLAR ==========
+HISTORY_SIZE = 8          # recent inputs kept for warm-up / comparison
+MIN_AGREEMENT = 0.5       # F1 against the current model required to swap
+WATCH_INTERVAL = 2.0      # seconds between model file checks
+
+
+class ModelSlot:
+    """Çalışırken değiştirilebilen model yuvası (double-buffer).
+
+    Yeni model arka planda yüklenir, son karelerde ısıtılır ve mevcut modelle
+    karşılaştırılır; ardından iki çıkarım arasında tek bir atama ile devreye alınır.
+    Çağrılar kilit altında yapıldığı için hiçbir kare yarım yüklenmiş modeli görmez.
+
+    loader(path) -> (model, precision); path None ise varsayılan model yüklenir.
+    to_detections(output) -> (N, 6) dizi; karşılaştırma için kullanılır.
+    executor: verilirse (InferenceExecutor) çıkarımlar ve ısıtma onun thread'inde çalışır.
+    """
+
+    def __init__(self, name, loader, to_detections=None, history=HISTORY_SIZE,
+                 min_agreement=MIN_AGREEMENT):
+        self.name = name
+        self.loader = loader
+        self.to_detections = to_detections
+        self.min_agreement = min_agreement
+        self.precision = None
+        self.path = None
+        self.version = 0
+        self.loaded_at = None
+        self.last_swap = None  # report of the last staging attempt
+        self._model = None
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=history)
+        self._staging = False
+        self.executor = None
+
+    # ---------- inference ----------
+    def __call__(self, frame, *args, **kwargs):
+        if self.executor is not None:
+            return self.executor.run(self._infer, frame, *args, **kwargs)
+        return self._infer(frame, *args, **kwargs)
+
+    def _infer(self, frame, *args, **kwargs):
+        with self._lock:
+            if self._model is None:
+                self._install(*self.loader(None), None)
+            output = self._model(frame, *args, **kwargs)
+        # Keep the input and what the current model said about it for the next swap
+        self._recent.append((frame, args, kwargs, output))
+        return output
+
+    @property
+    def loaded(self):
+        return self._model is not None
+
+    def load(self, path=None):
+        """Modeli senkron olarak yükler (başlangıçta kullanılır)"""
+        model, precision = self.loader(path)
+        with self._lock:
+            self._install(model, precision, path)
+        return self
+
+    def _install(self, model, precision, path):
+        self._model = model
+        self.precision = precision
+        self.path = path
+        self.version += 1
+        self.loaded_at = time.time()
+
+    def status(self):
+        return {
+            "slot": self.name,
+            "loaded": self.loaded,
+            "precision": self.precision,
+            "path": self.path,
+            "version": self.version,
+            "loaded_at": self.loaded_at,
+            "staging": self._staging,
+            "last_swap": self.last_swap
+        }
+
+    # ---------- hot swap ----------
+    def stage(self, path, force=False):
+        """Yeni modeli arka planda yükler, doğrular ve uygunsa devreye alır"""
+        with self._lock:
+            if self._staging:
+                return False
+            self._staging = True
+        threading.Thread(target=self._stage, args=(path, force),
+                         name=f"model_stage_{self.name}", daemon=True).start()
+        return True
+
+    def _stage(self, path, force):
+        report = {"path": path, "started": time.time(), "swapped": False}
+        try:
+            print(f"🔄 {self.name} modeli yükleniyor: {path}")
+            start = time.perf_counter()
+            model, precision = self.loader(path)
+            report["load_s"] = time.perf_counter() - start
+            report["precision"] = precision
+
+            # Warm up on recent frames and compare with what the live model produced
+            recent = list(self._recent)
+            totals = [0, 0, 0]
+            latencies = []
+            for frame, args, kwargs, old_output in recent:
+                start = time.perf_counter()
+                if self.executor is not None:
+                    # Same threads/cores as live inference, so warmup_ms is comparable
+                    new_output = self.executor.run(model, frame, *args, **kwargs)
+                else:
+                    new_output = model(frame, *args, **kwargs)
+                latencies.append(time.perf_counter() - start)
+                if self.to_detections is not None:
+                    tp, n_new, n_old = agreement(self.to_detections(new_output), self.to_detections(old_output))
+                    totals[0] += tp
+                    totals[1] += n_new
+                    totals[2] += n_old
+
+            report["warmup_frames"] = len(recent)
+            if latencies:
+                report["warmup_ms"] = sum(latencies) / len(latencies) * 1000
+            if self.to_detections is not None and recent:
+                _, _, f1 = precision_recall_f1(*totals)
+                report["agreement_f1"] = f1
+                if f1 < self.min_agreement and not force:
+                    report["reason"] = f"uyum düşük ({f1:.2f} < {self.min_agreement})"
+                    print(f"⚠️ {self.name} modeli devreye alınmadı: {report['reason']}")
+                    return
+
+            # Atomic swap between two inferences
+            with self._lock:
+                self._install(model, precision, path)
+            report["swapped"] = True
+            print(f"✅ {self.name} modeli değiştirildi (v{self.version}, {precision}, "
+                  f"uyum={report.get('agreement_f1', float('nan')):.2f})")
+        except Exception as e:
+            report["reason"] = str(e)
+            print(f"[HATA] {self.name} modeli yüklenemedi: {e}")
+        finally:
+            report["finished"] = time.time()
+            self.last_swap = report
+            with self._lock:
+                self._staging = False
+
+
+class ModelWatcher:
+    """Model dosyalarını izler; değişip yazımı biten dosyayı ilgili yuvaya yükletir"""
+
+    def __init__(self, watches, interval=WATCH_INTERVAL):
+        self.watches = dict(watches)  # {path: slot}
+        self.interval = interval
+        self._seen = {path: self._signature(path) for path in self.watches}
+        self._pending = {}
+
+    @staticmethod
+    def _signature(path):
+        try:
+            st = os.stat(path)
+            return st.st_mtime, st.st_size
+        except OSError:
+            return None
+
+    def start(self):
+        threading.Thread(target=self._run, name="model_watcher", daemon=True).start()
+        return self
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            for path, slot in self.watches.items():
+                signature = self._signature(path)
+                if signature is None or signature == self._seen.get(path):
+                    self._pending.pop(path, None)
+                    continue
+                # Wait until the file stops changing (copy in progress)
+                if self._pending.get(path) != signature:
+                    self._pending[path] = signature
+                    continue
+                if slot.stage(path):
+                    self._seen[path] = signature
+                    del self._pending[path]
@@ -0,0 +1,341 @@
+import json
+import math
+import os
+import threading
+import time
+import numpy as np
+
+# ========== AYARLAR ==========
+STATE_CODES = {"empty": 0, "occupied": 1, "belted": 2}
+# (name, bucket resolution in seconds, ring capacity in buckets)
+TIERS = (
+    ("1s", 1, 24 * 3600),       # one day of 1 s buckets
+    ("1m", 60, 7 * 24 * 60),    # one week of 1 min buckets
+    ("1h", 3600, 365 * 24),     # one year of 1 h buckets
+)
+FLUSH_INTERVAL = 30.0  # seconds between memmap flushes
+
+
+class _Tier:
+    """Tek çözünürlükteki halka tampon (her sütun ayrı NumPy dizisi)"""
+
+    def __init__(self, name, resolution, capacity, num_seats, spill_dir=None):
+        self.name = name
+        self.resolution = resolution
+        self.capacity = capacity
+        scalar = (capacity,)
+        per_seat = (capacity, num_seats)
+        columns = {
+            "t": (scalar, np.int64),              # bucket start (epoch s), 0 = unused row
+            "samples": (scalar, np.uint32),
+            "occupied_sum": (scalar, np.uint32),  # sum over samples of occupied seats
+            "belted_sum": (scalar, np.uint32),
+            "empty_sum": (scalar, np.uint32),
+            "standing_sum": (scalar, np.uint32),
+            "standing_max": (scalar, np.uint16),
+            "seat_last": (per_seat, np.uint8),       # last state code per seat
+            "seat_occupied": (per_seat, np.uint32),  # samples with the seat taken
+            "seat_belted": (per_seat, np.uint32),
+        }
+        self.cols = {}
+        for col, (shape, dtype) in columns.items():
+            self.cols[col] = self._allocate(spill_dir, col, shape, dtype)
+
+        # Resume after a restart: the newest bucket is the head of the ring
+        t = self.cols["t"]
+        if t.any():
+            self.head = int(np.argmax(t))
+            self.current = int(t[self.head])
+        else:
+            self.head = -1
+            self.current = None
+
+    def _allocate(self, spill_dir, col, shape, dtype):
+        if spill_dir is None:
+            return np.zeros(shape, dtype=dtype)
+        path = os.path.join(spill_dir, f"{self.name}_{col}.npy")
+        if os.path.exists(path):
+            arr = np.load(path, mmap_mode="r+")
+            if arr.shape == shape and arr.dtype == dtype:
+                return arr
+            print(f"⚠️ {path} uyumsuz (koltuk düzeni değişmiş olabilir), sıfırlanıyor")
+            del arr
+        return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+
+    def add(self, t, codes, occupied, belted, empty, standing):
+        bucket = int(t) // self.resolution * self.resolution
+        if self.current is None or bucket > self.current:
+            self.head = (self.head + 1) % self.capacity
+            for arr in self.cols.values():
+                arr[self.head] = 0
+            self.cols["t"][self.head] = bucket
+            self.current = bucket
+        # Late samples (clock going backwards) are folded into the current bucket
+        row = self.head
+        c = self.cols
+        c["samples"][row] += 1
+        c["occupied_sum"][row] += occupied
+        c["belted_sum"][row] += belted
+        c["empty_sum"][row] += empty
+        c["standing_sum"][row] += standing
+        c["standing_max"][row] = max(int(c["standing_max"][row]), standing)
+        c["seat_last"][row] = codes
+        c["seat_occupied"][row] += codes != STATE_CODES["empty"]
+        c["seat_belted"][row] += codes == STATE_CODES["belted"]
+
+    def rows(self, start, end):
+        """[start, end) aralığındaki satırları bitişik dilimler olarak döndürür.
+
+        Halka iki sıralı parçadan oluşur ([head+1, cap) ve [0, head]); her parçada
+        ikili arama yapılır, maske/kopya gerekmez.
+        """
+        if self.head < 0:
+            return []
+        t = self.cols["t"]
+        slices = []
+        for lo, hi in ((self.head + 1, self.capacity), (0, self.head + 1)):
+            segment = t[lo:hi]
+            if segment.size == 0 or segment[-1] == 0:
+                continue  # unused tail of a ring that has not wrapped yet
+            a = lo + int(np.searchsorted(segment, start, side="left"))
+            b = lo + int(np.searchsorted(segment, end, side="left"))
+            if b > a:
+                slices.append(slice(a, b))
+        return slices
+
+    def oldest(self):
+        """Halkadaki en eski kovanın başlangıcı (boşsa None)"""
+        if self.head < 0:
+            return None
+        t = self.cols["t"]
+        following = t[(self.head + 1) % self.capacity]
+        return int(following) if following > 0 else int(t[0])
+
+    def covers(self, start):
+        """start'tan bu yana tüm veri bu katmanda mı?"""
+        if self.head < 0:
+            return False
+        wrapped = self.cols["t"][(self.head + 1) % self.capacity] > 0
+        return not wrapped or self.oldest() <= start
+
+    def flush(self):
+        for arr in self.cols.values():
+            if isinstance(arr, np.memmap):
+                arr.flush()
+
+
+class OccupancyStore:
+    """Koltuk durumlarının zaman serisi: 1 sn / 1 dk / 1 sa katmanları.
+
+    Her kayıt tüm katmanların o anki kovasına eklenir, yani alt örnekleme artımlı
+    yapılır. spill_dir verilirse diziler bellek eşlemeli .npy dosyalarında tutulur
+    ve yeniden başlatmada kaldığı yerden devam eder.
+    """
+
+    def __init__(self, num_seats, spill_dir=None, flush_interval=FLUSH_INTERVAL):
+        self.num_seats = num_seats
+        self.spill_dir = spill_dir
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+        self.tiers = [_Tier(name, res, cap, num_seats, spill_dir) for name, res, cap in TIERS]
+        self.stops = self._load_stops()
+        self._lock = threading.Lock()
+        if spill_dir:
+            threading.Thread(target=self._flush_loop, args=(flush_interval,),
+                             name="occupancy_flush", daemon=True).start()
+
+    # ---------- write ----------
+    def record(self, seat_states, standing_count, t=None):
+        """Bir koltuk durumu örneğini tüm katmanlara ekler"""
+        t = time.time() if t is None else t
+        codes = np.zeros(self.num_seats, dtype=np.uint8)
+        for i, state in enumerate(seat_states[:self.num_seats]):
+            codes[i] = STATE_CODES.get(state, 0)
+        occupied = int(np.count_nonzero(codes == STATE_CODES["occupied"]))
+        belted = int(np.count_nonzero(codes == STATE_CODES["belted"]))
+        empty = self.num_seats - occupied - belted
+        with self._lock:
+            for tier in self.tiers:
+                tier.add(t, codes, occupied, belted, empty, int(standing_count))
+
+    def mark_stop(self, name, t=None):
+        """Durak geçişini kaydeder (durak bazlı doluluk için)"""
+        with self._lock:
+            self.stops.append((time.time() if t is None else t, name))
+            self._save_stops()
+
+    # ---------- read ----------
+    def _pick_tier(self, start, step=None):
+        """Aralığı kapsayan en ince katmanı seçer; step verilirse ona uyan en kaba katmanı"""
+        candidates = [tier for tier in self.tiers if step is None or tier.resolution <= step] or self.tiers[:1]
+        covering = [tier for tier in candidates if tier.covers(start)]
+        if not covering:
+            return candidates[-1]  # coarsest tier keeps the longest history
+        return covering[-1] if step is not None else covering[0]
+
+    def _segments(self, index, start, end, split=False):
+        """[start, end) aralığını katmanın tam kovalarından okur; kenarlardaki yarım kovaları
+        bir ince katmandan tamamlar. ((katman, dilim) listesi, kapsanan başlangıç, bitiş) döner.
+
+        İnce katman kenarı artık tutmuyorsa yarım kova dışarıda kalır. split=True ise (bitişik
+        pencereler, trend()) bitişteki yarım kova bu pencereye eklenir: kova başlangıcının düştüğü
+        pencereye sayılır, hiçbir örnek kaybolmaz veya iki kez sayılmaz.
+        """
+        tier = self.tiers[index]
+        if index == 0:
+            return [(tier, part) for part in tier.rows(start, end)], start, end
+        finer = self.tiers[index - 1]
+        inner_start = math.ceil(start / tier.resolution) * tier.resolution
+        inner_end = math.floor(end / tier.resolution) * tier.resolution
+        if inner_start >= inner_end:
+            # The whole range is inside one bucket of this tier
+            if finer.covers(start):
+                return self._segments(index - 1, start, end, split)
+            if split and inner_start < end:
+                # The bucket starting in this window; it runs past end
+                return [(tier, part) for part in tier.rows(start, end)], inner_start, inner_start + tier.resolution
+            return [], end, end
+
+        parts = [(tier, part) for part in tier.rows(inner_start, inner_end)]
+        covered_start, covered_end = inner_start, inner_end
+        if start < inner_start and finer.covers(start):
+            edge, covered_start, _ = self._segments(index - 1, start, inner_start, split)
+            parts = edge + parts
+        if inner_end < end:
+            if finer.covers(inner_end):
+                edge, _, covered_end = self._segments(index - 1, inner_end, end, split)
+                parts += edge
+            elif split:
+                parts += [(tier, part) for part in tier.rows(inner_end, end)]
+                covered_end = inner_end + tier.resolution
+        return parts, covered_start, covered_end
+
+    def query(self, start, end=None):
+        """Aralık için toplu istatistikleri döndürür (tepe ayakta, kemer uyumu vb.).
+
+        Kaba katmandaki yarım kovalar ince katmandan tamamlanır. İnce katman o kenarı artık
+        tutmuyorsa yarım kova dışarıda kalır; "start"/"end" özetin gerçekten kapsadığı aralıktır.
+        """
+        end = time.time() + 1 if end is None else end
+        with self._lock:
+            tier = self._pick_tier(start)
+            parts, covered_start, covered_end = self._segments(self.tiers.index(tier), start, end)
+            samples = sum(int(t.cols["samples"][p].sum()) for t, p in parts)
+            if samples == 0:
+                return {"tier": tier.name, "samples": 0, "start": covered_start, "end": covered_end}
+            occupied = sum(int(t.cols["occupied_sum"][p].sum()) for t, p in parts)
+            belted = sum(int(t.cols["belted_sum"][p].sum()) for t, p in parts)
+            standing = sum(int(t.cols["standing_sum"][p].sum()) for t, p in parts)
+            seat_occupied = sum(t.cols["seat_occupied"][p].sum(axis=0, dtype=np.int64) for t, p in parts)
+            seat_belted = sum(t.cols["seat_belted"][p].sum(axis=0, dtype=np.int64) for t, p in parts)
+            peak_standing = max(int(t.cols["standing_max"][p].max()) for t, p in parts)
+
+        taken = occupied + belted
+        return {
+            "tier": tier.name,
+            "start": covered_start,
+            "end": covered_end,
+            "samples": samples,
+            "mean_occupied": taken / samples,
+            "mean_belted": belted / samples,
+            "mean_standing": standing / samples,
+            "peak_standing": peak_standing,
+            "belt_compliance": belted / taken if taken else 1.0,
+            "seat_occupancy": (seat_occupied / samples).round(3).tolist(),
+            "seat_belt_compliance": np.where(
+                seat_occupied > 0, seat_belted / np.maximum(seat_occupied, 1), 1.0
+            ).round(3).tolist()
+        }
+
+    def trend(self, start, end, step):
+        """Aralığı step saniyelik kovalara bölerek eğilim serisi döndürür (kenarlar query() gibi
+        ince katmandan tamamlanır; "start"/"end" gerçekten kapsanan aralıktır)"""
+        with self._lock:
+            tier = self._pick_tier(start, step)
+            index = self.tiers.index(tier)
+            n = int(np.ceil((end - start) / step))
+            # Each point is read on its own, so coarse buckets straddling a step boundary are
+            # split from the finer tier exactly like the range edges (or counted once, in the
+            # point where they start, when the finer tier no longer holds them)
+            parts, windows, lengths = [], [], []
+            covered_start = covered_end = None
+            for i in range(n):
+                window, window_start, window_end = self._segments(
+                    index, start + i * step, min(start + (i + 1) * step, end), split=True)
+                if window:
+                    covered_start = window_start if covered_start is None else covered_start
+                    covered_end = window_end
+                parts += window
+                windows += [i] * len(window)
+                lengths += [p.stop - p.start for _, p in window]
+
+            def column(name):
+                return np.concatenate([t.cols[name][p] for t, p in parts] or [np.zeros(0)])
+
+            idx = np.repeat(np.asarray(windows, dtype=np.int64), lengths)
+
+            samples = np.bincount(idx, weights=column("samples"), minlength=n)[:n]
+            occupied = np.bincount(idx, weights=column("occupied_sum"), minlength=n)[:n]
+            belted = np.bincount(idx, weights=column("belted_sum"), minlength=n)[:n]
+            standing = np.bincount(idx, weights=column("standing_sum"), minlength=n)[:n]
+            peak = np.zeros(n)
+            np.maximum.at(peak, idx, column("standing_max"))
+
+        taken = occupied + belted
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return {
+                "tier": tier.name,
+                "start": covered_start,
+                "end": covered_end,
+                "t": start + np.arange(n) * step,
+                "samples": samples,
+                "mean_occupied": taken / samples,
+                "mean_standing": standing / samples,
+                "peak_standing": peak,
+                "belt_compliance": np.where(taken > 0, belted / taken, np.nan)
+            }
+
+    def per_stop(self):
+        """Ardışık duraklar arasındaki doluluk özetlerini döndürür"""
+        with self._lock:
+            stops = list(self.stops)
+        result = []
+        for i, (t, name) in enumerate(stops):
+            end = stops[i + 1][0] if i + 1 < len(stops) else None
+            summary = self.query(t, end)
+            summary["stop"] = name
+            # "start" stays the covered start reported by query(); the stop time has its own key
+            summary["stop_time"] = t
+            result.append(summary)
+        return result
+
+    # ---------- persistence ----------
+    def _stops_path(self):
+        return os.path.join(self.spill_dir, "stops.json") if self.spill_dir else None
+
+    def _load_stops(self):
+        path = self._stops_path()
+        if path and os.path.exists(path):
+            with open(path) as f:
+                return [tuple(item) for item in json.load(f)]
+        return []
+
+    def _save_stops(self):
+        path = self._stops_path()
+        if path:
+            with open(path + ".tmp", "w") as f:
+                json.dump(self.stops, f)
+            os.replace(path + ".tmp", path)
+
+    def flush(self):
+        with self._lock:
+            for tier in self.tiers:
+                tier.flush()
+
+    def _flush_loop(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[HATA] Doluluk verisi diske yazılamadı: {e}")
@@ -0,0 +1,146 @@
+import cv2
+import numpy as np
+from detection_metrics import as_detection_array
+
+# ========== TESPİT ÇİZİMİ (OVERLAY) ==========
+# Tespitler (N, 6) dizi olarak gelir: x1, y1, x2, y2, conf, cls.
+#   - sınıf/güven filtresi NumPy ile yapılır (tensör üzerinde eleman eleman int() yok)
+#   - etiket metni (sınıf, güven kovası) başına bir kez çizilip maske olarak saklanır
+#   - tüm kutular ve etiketler tek bir maskeye çizilir, kareye tek geçişte renk basılır
+#   - render() her karede yeni bir çıktı dizisine çizer: yayınlanan kare (GUI, anlık görüntü)
+#     bir daha yazılmaz, okuyan thread'ler kilitsiz okuyabilir; sadece etiket maskesi yeniden kullanılır
+# GUI, anlık görüntüler ve ileride eklenecek HTTP akışı aynı çizimi kullanır.
+BOX_COLOR = (255, 0, 0)      # red on the server's RGB frames
+BOX_THICKNESS = 2
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+FONT_SCALE = 0.5
+FONT_THICKNESS = 1
+LABEL_OFFSET = 5             # label baseline this many pixels above the box
+CONF_BUCKET = 0.01           # label cache granularity (0.01 = same text as f"{conf:.2f}")
+
+
+def filter_detections(detections, classes=None, min_conf=None):
+    """(N, 6) tespitleri sınıf ve güvene göre NumPy ile süzer"""
+    detections = as_detection_array(detections)
+    keep = np.ones(len(detections), dtype=bool)
+    if classes is not None:
+        keep &= np.isin(detections[:, 5], list(classes))
+    if min_conf is not None:
+        keep &= detections[:, 4] > min_conf
+    return detections[keep]
+
+
+class LabelCache:
+    """(sınıf, güven kovası) başına önceden çizilmiş etiket maskeleri"""
+
+    def __init__(self, class_names=None, show_conf=True, font_scale=FONT_SCALE,
+                 thickness=FONT_THICKNESS, offset=LABEL_OFFSET, bucket=CONF_BUCKET):
+        self.class_names = class_names or {}
+        self.show_conf = show_conf
+        self.font_scale = font_scale
+        self.thickness = thickness
+        self.offset = offset
+        self.bucket = bucket
+        self._sprites = {}
+
+    def get(self, cls_id, conf):
+        """(maske, dx, dy) döndürür; maske 0/1 uint8, (dx, dy) kutunun sol üst köşesine göre konumu"""
+        step = int(round(conf / self.bucket)) if self.show_conf else 0
+        key = (cls_id, step)
+        sprite = self._sprites.get(key)
+        if sprite is None:
+            name = self.class_names.get(cls_id, cls_id)
+            text = f"{name} {step * self.bucket:.2f}" if self.show_conf else str(name)
+            (width, height), baseline = cv2.getTextSize(text, FONT, self.font_scale, self.thickness)
+            # Hershey glyphs can reach past getTextSize's box: render with a margin, then trim
+            pad = 4 * self.thickness
+            canvas = np.zeros((height + baseline + 2 * pad, width + 2 * pad), dtype=np.uint8)
+            cv2.putText(canvas, text, (pad, pad + height), FONT, self.font_scale, 255, self.thickness)
+            # LINE_8 text is already 0/255 with the pinned OpenCV 4.x; newer builds antialias it
+            canvas = (canvas >= 128).view(np.uint8)
+            ys, xs = np.nonzero(canvas)
+            mask = np.ascontiguousarray(canvas[ys.min():ys.max() + 1, xs.min():xs.max() + 1])
+            sprite = self._sprites[key] = (mask, int(xs.min()) - pad, int(ys.min()) - pad - height - self.offset)
+        return sprite
+
+
+def draw_detections(frame, detections, labels, color=BOX_COLOR, thickness=BOX_THICKNESS, mask=None, solid=None):
+    """Kutuları ve etiketleri kareye yerinde çizer (tek maske, tek kompozit)"""
+    if len(detections) == 0:
+        return frame
+    frame_h, frame_w = frame.shape[:2]
+    boxes = detections[:, :4].astype(np.int32).tolist()
+    sprites = [labels.get(int(cls), conf) for conf, cls in detections[:, 4:6].tolist()]
+    label_tops = [y1 + dy for (_, y1, _, _), (_, _, dy) in zip(boxes, sprites)]
+    # Only the rows the overlay touches are cleared and composited
+    top = max(min(min(label_tops), min(box[1] for box in boxes)) - thickness, 0)
+    bottom = min(max(max(box[3] for box in boxes) + thickness,
+                     max(y + sprite.shape[0] for y, (sprite, _, _) in zip(label_tops, sprites))) + 1, frame_h)
+    if top >= bottom:
+        return frame
+    if mask is None or mask.shape != (frame_h, frame_w):
+        mask = np.empty((frame_h, frame_w), dtype=np.uint8)
+    band = mask[top:bottom]
+    band.fill(0)
+
+    for (x1, y1, x2, y2), label_top, (sprite, dx, _) in zip(boxes, label_tops, sprites):
+        cv2.rectangle(band, (x1, y1 - top), (x2, y2 - top), 1, thickness)
+        # Same pixels as cv2.putText(frame, label, (x1, y1 - offset)), clipped to the band
+        sy, sx = label_top - top, x1 + dx
+        oy, ox = max(-sy, 0), max(-sx, 0)
+        ey = min(sprite.shape[0], band.shape[0] - sy)
+        ex = min(sprite.shape[1], frame_w - sx)
+        if oy < ey and ox < ex:
+            target = band[sy + oy:sy + ey, sx + ox:sx + ex]
+            np.bitwise_or(target, sprite[oy:ey, ox:ex], out=target)
+
+    # Masked copy from a solid colour image: one C pass (numpy boolean/where assignment is ~100x slower)
+    if solid is None or solid.shape != frame.shape:
+        solid = np.full(frame.shape, color, dtype=frame.dtype)
+    cv2.copyTo(solid[top:bottom], band, frame[top:bottom])
+    return frame
+
+
+class OverlayRenderer:
+    """Tespitleri karelere çizer (etiket ve maske önbellekli).
+
+    render(key, frame, detections) -> çizilmiş yeni kare (frame değişmez). Dönen dizi
+    renderer tarafından bir daha yazılmaz; başka thread'lere kilitsiz verilebilir.
+    Aynı key için çağrılar tek bir thread'den yapılmalıdır (maske akış başına paylaşılır).
+    """
+
+    def __init__(self, class_names=None, color=BOX_COLOR, thickness=BOX_THICKNESS, classes=None,
+                 min_conf=None, show_conf=True, font_scale=FONT_SCALE, label_offset=LABEL_OFFSET):
+        self.labels = LabelCache(class_names, show_conf, font_scale, offset=label_offset)
+        self.color = color
+        self.thickness = thickness
+        self.classes = classes
+        self.min_conf = min_conf
+        self._masks = {}    # key -> overlay mask (scratch, only used inside render)
+        self._solids = {}   # frame shape -> solid colour image for the masked copy
+
+    def _select(self, detections):
+        if self.classes is None and self.min_conf is None:
+            return as_detection_array(detections)
+        return filter_detections(detections, self.classes, self.min_conf)
+
+    def _solid(self, frame):
+        solid = self._solids.get(frame.shape)
+        if solid is None or solid.dtype != frame.dtype:
+            solid = self._solids[frame.shape] = np.full(frame.shape, self.color, dtype=frame.dtype)
+        return solid
+
+    def draw(self, frame, detections):
+        """Tespitleri verilen kareye yerinde çizer (tampon kullanılmaz)"""
+        return draw_detections(frame, self._select(detections), self.labels, self.color, self.thickness,
+                               solid=self._solid(frame))
+
+    def render(self, key, frame, detections):
+        mask = self._masks.get(key)
+        if mask is None or mask.shape != frame.shape[:2]:
+            mask = self._masks[key] = np.empty(frame.shape[:2], dtype=np.uint8)
+        # A fresh output every frame: the published array is never written again, so the GUI
+        # can resize/convert it while the next frame is drawn (a rotating buffer would tear)
+        out = frame.copy()
+        return draw_detections(out, self._select(detections), self.labels, self.color, self.thickness,
+                               mask, self._solid(frame))
@@ -0,0 +1,217 @@
+import functools
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+# ========== AYARLAR ==========
+PROFILE_DIR = "profiles"
+SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+DEFAULT_SECONDS = 10
+MAX_STACK_DEPTH = 64
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _Timer:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record_call(self.name, time.perf_counter() - self.start)
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class SamplingProfiler:
+    """Tüm thread'lerin yığınlarını periyodik olarak örnekleyen düşük maliyetli profiler.
+
+    Kapalıyken hiçbir iş yapmaz; açıldığında N saniye boyunca örnek toplar ve
+    collapsed-stack (.folded), speedscope (.speedscope.json) ve fonksiyon
+    süreleri (.timings.json) dosyalarını yazar.
+    """
+
+    def __init__(self, name="server", output_dir=PROFILE_DIR, interval=SAMPLE_INTERVAL):
+        self.name = name
+        self.output_dir = output_dir
+        self.interval = interval
+        self.active = False
+        self.last_output = None
+        self._lock = threading.Lock()
+        self._timings = defaultdict(list)
+
+    # ---------- control ----------
+    def start(self, seconds=DEFAULT_SECONDS):
+        """Profili başlatır; zaten çalışıyorsa False döner"""
+        with self._lock:
+            if self.active:
+                return False
+            self.active = True
+            self._timings = defaultdict(list)
+        threading.Thread(target=self._run, args=(seconds,), name="profiler", daemon=True).start()
+        print(f"🔬 Profil başladı ({seconds} sn)")
+        return True
+
+    def record_call(self, name, duration):
+        with self._lock:
+            if self.active:
+                self._timings[name].append(duration)
+
+    def timer(self, name):
+        """with profiler.timer("isim"): ... — profil kapalıyken maliyetsiz"""
+        return _Timer(self, name) if self.active else _NULL_TIMER
+
+    # ---------- sampling ----------
+    def _run(self, seconds):
+        own_id = threading.get_ident()
+        stacks = Counter()
+        sample_count = 0
+        started = time.time()
+        deadline = time.perf_counter() + seconds
+        try:
+            while time.perf_counter() < deadline:
+                names = {t.ident: t.name for t in threading.enumerate()}
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_id:
+                        continue
+                    stacks[self._collapse(names.get(thread_id, f"thread-{thread_id}"), frame)] += 1
+                sample_count += 1
+                time.sleep(self.interval)
+            elapsed = time.time() - started
+            # Stop recording and take the timings before writing: other threads append to them
+            with self._lock:
+                self.active = False
+                timings, self._timings = self._timings, defaultdict(list)
+            self.last_output = self._write(stacks, sample_count, elapsed, started, timings)
+            print(f"✅ Profil kaydedildi: {self.last_output}")
+        except Exception as e:
+            print(f"[HATA] Profil hatası: {e}")
+        finally:
+            with self._lock:
+                self.active = False
+
+    @staticmethod
+    def _collapse(thread_name, frame):
+        parts = []
+        while frame is not None and len(parts) < MAX_STACK_DEPTH:
+            code = frame.f_code
+            parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        parts.append(thread_name)
+        return ";".join(reversed(parts))
+
+    # ---------- output ----------
+    def _write(self, stacks, sample_count, elapsed, started, call_timings):
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(started))
+        base = os.path.join(self.output_dir, f"{self.name}_{stamp}")
+
+        # Collapsed stacks (flamegraph.pl / speedscope / inferno)
+        with open(base + ".folded", "w", encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        # Speedscope: one sampled profile per thread, weights in milliseconds
+        frame_index = {}
+        frames = []
+        per_thread = defaultdict(lambda: {"samples": [], "weights": []})
+        sample_ms = elapsed * 1000 / max(sample_count, 1)
+        for stack, count in stacks.items():
+            thread_name, *calls = stack.split(";")
+            indices = []
+            for call in calls:
+                if call not in frame_index:
+                    frame_index[call] = len(frames)
+                    frames.append({"name": call})
+                indices.append(frame_index[call])
+            per_thread[thread_name]["samples"].append(indices)
+            per_thread[thread_name]["weights"].append(count * sample_ms)
+
+        speedscope = {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": f"{self.name} {stamp}",
+            "exporter": "akilli-servis profiler",
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": thread_name,
+                    "unit": "milliseconds",
+                    "startValue": 0,
+                    "endValue": sum(data["weights"]),
+                    "samples": data["samples"],
+                    "weights": data["weights"]
+                }
+                for thread_name, data in sorted(per_thread.items())
+            ]
+        }
+        with open(base + ".speedscope.json", "w", encoding="utf-8") as f:
+            json.dump(speedscope, f)
+
+        timings = {}
+        for name, durations in call_timings.items():
+            durations = sorted(d * 1000 for d in durations)
+            n = len(durations)
+            timings[name] = {
+                "calls": n,
+                "total_ms": sum(durations),
+                "mean_ms": sum(durations) / n,
+                "p50_ms": durations[n // 2],
+                "p95_ms": durations[min(n - 1, int(n * 0.95))],
+                "max_ms": durations[-1]
+            }
+        with open(base + ".timings.json", "w", encoding="utf-8") as f:
+            json.dump({"seconds": elapsed, "samples": sample_count, "timings": timings}, f, indent=2)
+        return base
+
+
+# Process-wide profiler (server and client each have their own)
+PROFILER = SamplingProfiler(name=os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0] or "python")
+
+
+def profiled(name=None):
+    """Fonksiyonun çağrı sürelerini profil açıkken kaydeden dekoratör"""
+    def decorator(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not PROFILER.active:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                PROFILER.record_call(label, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def install_signal_handler(seconds=DEFAULT_SECONDS):
+    """SIGUSR1 ile profil başlatmayı etkinleştirir (Windows'ta sinyal yok, kontrol soketi kullanılır)"""
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: PROFILER.start(seconds))
+        print(f"🔬 Profil için: kill -USR1 {os.getpid()}")
+
+
+def handle_profile_command(request):
+    """Kontrol komutu: {"cmd": "profile", "seconds": 10}"""
+    seconds = float(request.get("seconds", DEFAULT_SECONDS))
+    started = PROFILER.start(seconds)
+    return {"started": started, "output_dir": PROFILER.output_dir, "last_output": PROFILER.last_output}
@@ -0,0 +1,326 @@
+import argparse
+import json
+import os
+import time
+import cv2
+import numpy as np
+import onnxruntime as ort
+import torch
+from onnxruntime.quantization import (CalibrationDataReader, CalibrationMethod, QuantFormat,
+                                      QuantType, quantize_static)
+from ultralytics import YOLO
+from detection import seat_states_from_classes, external_detections, seat_detections
+from detection_metrics import agreement, average_precision, precision_recall_f1
+from model_loader import load_external_model, load_seat_model, CONF_THRESHOLDS
+
+# ========== AYARLAR ==========
+# server.Config ile aynı tutulmalı
+OUTPUT_DIR = "quantized_models"
+SEAT_MODEL_PATH = "seat_model.pt"
+EXTERNAL_INT8_PATH = os.path.join(OUTPUT_DIR, "yolov5s_int8.onnx")
+SEAT_INT8_PATH = os.path.join(OUTPUT_DIR, "seat_model_int8.onnx")
+REPORT_PATH = os.path.join(OUTPUT_DIR, "quantization_report.json")
+
+# analyze_worker ile aynı ön işleme: dış kameralar 320x240, cam4 Config.ANALYSIS_SIZE
+EXTERNAL_ANALYSIS_SIZE = (320, 240)
+SEAT_ANALYSIS_SIZE = (160, 120)
+EXTERNAL_FP32_CONF = CONF_THRESHOLDS["external"]["fp32"]
+SEAT_FP32_CONF = CONF_THRESHOLDS["seat"]["fp32"]
+THRESHOLD_SWEEP = [round(t, 2) for t in np.arange(0.25, 0.75, 0.05)]
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+# ========== FRAME YÜKLEME ==========
+def list_frames(frames_dir, limit=None):
+    """Kayıtlı kamera karelerinin yollarını sıralı döndürür"""
+    paths = sorted(
+        os.path.join(frames_dir, name) for name in os.listdir(frames_dir)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    return paths[:limit] if limit else paths
+
+
+def load_frame(path, size):
+    """Kareyi okuyup server'daki analiz boyutuna getirir (BGR)"""
+    frame = cv2.imread(path)
+    if frame is None:
+        return None
+    return cv2.resize(frame, size)
+
+
+def letterbox(frame, new_size=640, stride=32):
+    """Kareyi oranı koruyarak stride katına pad eder, (1, 3, H, W) float32 döndürür"""
+    h, w = frame.shape[:2]
+    scale = new_size / max(h, w)
+    nh, nw = int(round(h * scale)), int(round(w * scale))
+    ph, pw = int(np.ceil(nh / stride) * stride), int(np.ceil(nw / stride) * stride)
+    canvas = np.full((ph, pw, 3), 114, dtype=np.uint8)
+    top, left = (ph - nh) // 2, (pw - nw) // 2
+    canvas[top:top + nh, left:left + nw] = cv2.resize(frame, (nw, nh))
+    return np.ascontiguousarray(canvas.transpose(2, 0, 1)[None], dtype=np.float32) / 255.0
+
+
+class FrameCalibrationReader(CalibrationDataReader):
+    """onnxruntime statik quantization için kayıtlı karelerden girdi üretir"""
+
+    def __init__(self, input_name, paths, size, rgb):
+        self.input_name = input_name
+        self.paths = paths
+        self.size = size
+        self.rgb = rgb
+        self._iter = iter(self.paths)
+
+    def get_next(self):
+        for path in self._iter:
+            frame = load_frame(path, self.size)
+            if frame is None:
+                continue
+            # YOLOv5 AutoShape kareyi olduğu gibi (BGR) alır, ultralytics ise RGB'ye çevirir
+            if self.rgb:
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            return {self.input_name: letterbox(frame)}
+        return None
+
+    def rewind(self):
+        self._iter = iter(self.paths)
+
+
+# ========== EXPORT + QUANTIZATION ==========
+def export_external_onnx(path):
+    """YOLOv5s'i dinamik girişli ONNX olarak dışa aktarır"""
+    import onnx
+
+    hub_model = torch.hub.load('ultralytics/yolov5', 'yolov5s')
+    det_model = hub_model.model.model  # AutoShape -> DetectMultiBackend -> DetectionModel
+    det_model.to("cpu").eval()
+    detect_layer = det_model.model[-1]
+    detect_layer.export = True  # single output tensor
+    detect_layer.dynamic = True
+    dummy = torch.zeros(1, 3, 480, 640)
+    torch.onnx.export(
+        det_model, dummy, path, opset_version=12, do_constant_folding=True,
+        input_names=["images"], output_names=["output0"],
+        dynamic_axes={"images": {0: "batch", 2: "height", 3: "width"}, "output0": {0: "batch", 1: "anchors"}}
+    )
+    # DetectMultiBackend stride ve sınıf isimlerini metadata'dan okur
+    onnx_model = onnx.load(path)
+    for key, value in {"stride": int(max(det_model.stride)), "names": det_model.names}.items():
+        meta = onnx_model.metadata_props.add()
+        meta.key, meta.value = key, str(value)
+    onnx.save(onnx_model, path)
+    return path
+
+
+def export_seat_onnx(fp32_path):
+    """Koltuk modelini ultralytics exporter ile ONNX'e çevirir"""
+    return YOLO(fp32_path).export(format="onnx", dynamic=True, simplify=False)
+
+
+def quantize_onnx(fp32_onnx, int8_onnx, calib_paths, size, rgb):
+    """Kayıtlı karelerle kalibre edilmiş statik int8 (QDQ) model üretir"""
+    try:
+        from onnxruntime.quantization.shape_inference import quant_pre_process
+        prepared = fp32_onnx.replace(".onnx", "_prep.onnx")
+        quant_pre_process(fp32_onnx, prepared)
+    except Exception as e:
+        print(f"⚠️ Ön işleme atlandı: {e}")
+        prepared = fp32_onnx
+
+    input_name = ort.InferenceSession(prepared, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+    reader = FrameCalibrationReader(input_name, calib_paths, size, rgb)
+    quantize_static(
+        prepared, int8_onnx, reader,
+        quant_format=QuantFormat.QDQ,
+        per_channel=True,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        calibrate_method=CalibrationMethod.MinMax
+    )
+    print(f"✅ int8 model kaydedildi: {int8_onnx}")
+
+
+def cmd_quantize(args):
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    calib_paths = list_frames(args.calib_dir, args.limit)
+    if not calib_paths:
+        print(f"❌ Kalibrasyon karesi bulunamadı: {args.calib_dir}")
+        return
+    print(f"📷 {len(calib_paths)} kalibrasyon karesi kullanılacak")
+
+    if args.model in ("external", "all"):
+        fp32_onnx = export_external_onnx(os.path.join(OUTPUT_DIR, "yolov5s.onnx"))
+        quantize_onnx(fp32_onnx, EXTERNAL_INT8_PATH, calib_paths, EXTERNAL_ANALYSIS_SIZE, rgb=False)
+
+    if args.model in ("seat", "all"):
+        if not os.path.exists(SEAT_MODEL_PATH):
+            print(f"❌ Koltuk modeli bulunamadı: {SEAT_MODEL_PATH}")
+            return
+        fp32_onnx = export_seat_onnx(SEAT_MODEL_PATH)
+        quantize_onnx(fp32_onnx, SEAT_INT8_PATH, calib_paths, SEAT_ANALYSIS_SIZE, rgb=True)
+
+
+# ========== RAPOR ==========
+def read_yolo_labels(labels_dir, image_path, size):
+    """YOLO formatındaki etiketleri (cls cx cy w h, normalize) kutulara çevirir"""
+    stem = os.path.splitext(os.path.basename(image_path))[0]
+    label_path = os.path.join(labels_dir, stem + ".txt")
+    if not os.path.exists(label_path):
+        return None
+    w, h = size
+    rows = []
+    with open(label_path) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) < 5:
+                continue
+            cls, cx, cy, bw, bh = int(parts[0]), *map(float, parts[1:5])
+            rows.append([(cx - bw / 2) * w, (cy - bh / 2) * h, (cx + bw / 2) * w, (cy + bh / 2) * h, 1.0, cls])
+    return np.array(rows, dtype=np.float32).reshape(-1, 6)
+
+
+def latency_summary(samples):
+    samples = np.asarray(samples) * 1000
+    if samples.size == 0:
+        return {}
+    return {
+        "mean_ms": float(samples.mean()),
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p95_ms": float(np.percentile(samples, 95)),
+    }
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def compare_models(name, paths, size, detect_fp32, detect_int8, fp32_conf, labels_dir=None, seat=False):
+    """fp32 ve int8 modellerini aynı karelerde karşılaştırır"""
+    frames = []  # (fp32 preds, int8 preds, labels)
+    lat_fp32, lat_int8 = [], []
+    for path in paths:
+        frame = load_frame(path, size)
+        if frame is None:
+            continue
+        preds_fp32, dt = timed(detect_fp32, frame)
+        lat_fp32.append(dt)
+        preds_int8, dt = timed(detect_int8, frame)
+        lat_int8.append(dt)
+        labels = read_yolo_labels(labels_dir, path, size) if labels_dir else None
+        frames.append((preds_fp32, preds_int8, labels))
+
+    if not frames:
+        return {}
+
+    refs = [p32[p32[:, 4] > fp32_conf] for p32, _, _ in frames]
+
+    # Threshold sweep: which int8 threshold reproduces fp32@fp32_conf best?
+    sweep = {}
+    for t in THRESHOLD_SWEEP:
+        totals = np.zeros(3)
+        for (_, p8, _), ref in zip(frames, refs):
+            totals += agreement(p8[p8[:, 4] > t], ref)
+        precision, recall, f1 = precision_recall_f1(*totals)
+        sweep[t] = {"precision": precision, "recall": recall, "f1": f1}
+    best_threshold = max(sweep, key=lambda t: sweep[t]["f1"])
+
+    same_threshold = min(sweep, key=lambda t: abs(t - fp32_conf))
+
+    _, map_vs_fp32 = average_precision([(p8, ref) for (_, p8, _), ref in zip(frames, refs)])
+    report = {
+        "frames": len(frames),
+        "map50_int8_vs_fp32": map_vs_fp32,
+        "agreement_at_fp32_threshold": sweep[same_threshold],
+        "recommended_int8_threshold": best_threshold,
+        "agreement_at_recommended": sweep[best_threshold],
+        "threshold_sweep": {str(t): v for t, v in sweep.items()},
+        "latency_fp32": latency_summary(lat_fp32),
+        "latency_int8": latency_summary(lat_int8),
+    }
+
+    labelled = [(p32, p8, lab) for p32, p8, lab in frames if lab is not None]
+    if labelled:
+        _, report["map50_fp32_vs_labels"] = average_precision([(p32, lab) for p32, _, lab in labelled])
+        _, report["map50_int8_vs_labels"] = average_precision([(p8, lab) for _, p8, lab in labelled])
+        report["labelled_frames"] = len(labelled)
+
+    if seat:
+        # Koltuk durumu uyumu: eşik uygulandıktan sonra üretilen durumlar aynı mı?
+        matches, total = 0, 0
+        for (_, p8, _), ref in zip(frames, refs):
+            states_fp32, _ = seat_states_from_classes([int(c) for c in ref[:, 5]])
+            states_int8, _ = seat_states_from_classes([int(c) for c in p8[p8[:, 4] > best_threshold][:, 5]])
+            matches += sum(a == b for a, b in zip(states_fp32, states_int8))
+            total += len(states_fp32)
+        report["seat_state_agreement"] = matches / total if total else 1.0
+
+    speedup = report["latency_fp32"]["mean_ms"] / max(report["latency_int8"]["mean_ms"], 1e-9)
+    report["speedup"] = speedup
+    print(f"📊 {name}: mAP50(int8↔fp32)={map_vs_fp32:.3f}, "
+          f"F1@{fp32_conf}={report['agreement_at_fp32_threshold']['f1']:.3f}, "
+          f"önerilen int8 eşiği={best_threshold} (F1={sweep[best_threshold]['f1']:.3f}), "
+          f"gecikme {report['latency_fp32']['mean_ms']:.1f}ms → {report['latency_int8']['mean_ms']:.1f}ms "
+          f"(x{speedup:.2f})")
+    return report
+
+
+def cmd_report(args):
+    paths = list_frames(args.frames_dir, args.limit)
+    if not paths:
+        print(f"❌ Değerlendirme karesi bulunamadı: {args.frames_dir}")
+        return
+
+    report = {"frames_dir": args.frames_dir, "created": time.strftime("%Y-%m-%d %H:%M:%S")}
+    low_conf = 0.05  # keep low-confidence boxes so AP and the sweep see the full curve
+
+    if args.model in ("external", "all"):
+        fp32, _ = load_external_model("fp32")
+        int8, precision = load_external_model("int8", EXTERNAL_INT8_PATH)
+        if precision == "int8":
+            fp32.conf = int8.conf = low_conf
+            report["external"] = compare_models(
+                "external", paths, EXTERNAL_ANALYSIS_SIZE,
+                lambda f: external_detections(fp32, f, low_conf),
+                lambda f: external_detections(int8, f, low_conf),
+                EXTERNAL_FP32_CONF, args.labels_dir
+            )
+
+    if args.model in ("seat", "all"):
+        fp32, _ = load_seat_model("fp32", SEAT_MODEL_PATH)
+        int8, precision = load_seat_model("int8", SEAT_MODEL_PATH, SEAT_INT8_PATH)
+        if precision == "int8":
+            report["seat"] = compare_models(
+                "seat", paths, SEAT_ANALYSIS_SIZE,
+                lambda f: seat_detections(fp32, f, low_conf),
+                lambda f: seat_detections(int8, f, low_conf),
+                SEAT_FP32_CONF, args.labels_dir, seat=True
+            )
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Rapor kaydedildi: {args.output}")
+    print("ℹ️ Önerilen eşikleri model_loader.CONF_THRESHOLDS['external'/'seat']['int8'] içine yazın")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="int8 model üretimi ve fp32 karşılaştırma raporu")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    q = sub.add_parser("quantize", help="Kayıtlı karelerle kalibre edilmiş int8 ONNX modelleri üret")
+    q.add_argument("calib_dir", help="Kalibrasyon kareleri (kendi kameralarımızdan kayıtlar)")
+    q.add_argument("--model", choices=["external", "seat", "all"], default="all")
+    q.add_argument("--limit", type=int, default=300, help="En fazla kaç kare kullanılacak")
+    q.set_defaults(func=cmd_quantize)
+
+    r = sub.add_parser("report", help="fp32 ve int8 modellerini karşılaştır")
+    r.add_argument("frames_dir", help="Değerlendirme kareleri (kalibrasyondan ayrı tutulmalı)")
+    r.add_argument("--labels-dir", default=None, help="İsteğe bağlı YOLO formatında etiketler (mAP için)")
+    r.add_argument("--model", choices=["external", "seat", "all"], default="all")
+    r.add_argument("--limit", type=int, default=None)
+    r.add_argument("--output", default=REPORT_PATH)
+    r.set_defaults(func=cmd_report)
+
+    args = parser.parse_args()
+    args.func(args)
@@ -7,11 +7,28 @@ import numpy as np
 import threading
 import psutil
 import time
-import torch
+import json
 from datetime import datetime
 from queue import Queue
-from ultralytics import YOLO
 import os
+from detection import (TARGET_CLASSES, SEAT_MATRIX, TOTAL_SEATS, seat_states_from_classes, external_detections,
+                       seat_detections, external_output_detections, seat_output_detections,
+                       external_detections_in_rois, scale_detections, alert_zone_mask, roi_pixel_boxes)
+from model_loader import (load_external_model, load_seat_model, load_external_model_file, load_seat_model_file,
+                          load_screen_model, CONF_THRESHOLDS)
+from model_slots import ModelSlot, ModelWatcher
+from control import ControlServer, SERVER_CONTROL_ADDR
+from profiler import PROFILER, profiled, install_signal_handler, handle_profile_command
+from snapshot_writer import SnapshotWriter
+from decode_pool import DecodePool
+from occupancy_store import OccupancyStore
+from detection_codec import parse_message, EdgeResult
+from shm_transport import ShmRingReader, LOCAL_IPC_ADDR, shm_available
+from cascade import CascadeGate
+from video_codec import StreamDecoders
+from overlay import OverlayRenderer
+from deadlines import FrameDeadlines
+from inference_executor import RuntimeTuning, TUNING_PATH
 
 # ========== GENEL AYARLAR ==========
 class Config:
@@ -29,14 +46,61 @@ class Config:
     ANALYSIS_SKIP_FRAMES = 1   # Process every frame for cam4 (no skipping)
     RESIZE_BEFORE_ANALYSIS = True  # resize frames before analysis
     ANALYSIS_SIZE = (160, 120) # smaller size for faster analysis
+    DECODE_WORKERS = 2         # JPEG decode threads (decode runs in parallel, ordered per camera)
+
+    # Model precision: "fp32" or "int8" (int8 models are produced by quantize_models.py)
+    MODEL_PRECISION = "fp32"
+    EXTERNAL_MODEL_INT8_PATH = "quantized_models/yolov5s_int8.onnx"
+    SEAT_MODEL_INT8_PATH = "quantized_models/seat_model_int8.onnx"
+    # Detection confidence thresholds per precision (model_loader.CONF_THRESHOLDS, shared with
+    # edge mode; re-tune from the quantization report)
+    EXTERNAL_CONF_THRESHOLD = CONF_THRESHOLDS["external"]
+    SEAT_CONF_THRESHOLD = CONF_THRESHOLDS["seat"]
+
+    # Model hot-swap: a changed file is loaded, warmed up and swapped in at runtime
+    EXTERNAL_MODEL_WATCH_PATH = "external_model.pt"  # drop a retrained YOLOv5 here
+    MODEL_SWAP_MIN_AGREEMENT = 0.5  # F1 vs the live model on recent frames ("force" skips it)
+
+    # External camera regions of interest, as fractions of the frame (x1, y1, x2, y2).
+    # Only these crops go to the external model (one batch); cameras without an entry
+    # use the whole frame. Alerts fire only for detections inside zones with alert=True.
+    EXTERNAL_ROIS = {
+        # "cam1": [{"name": "kapi", "box": (0.55, 0.30, 1.00, 1.00), "alert": True},
+        #          {"name": "kor_nokta", "box": (0.00, 0.45, 0.35, 1.00), "alert": True}],
+    }
+
+    # Two-stage cascade for external cameras: a tiny model screens every frame at low
+    # resolution, the full external model runs only when it fires, for a few frames after,
+    # or every CASCADE_REFRESH_SEC. Off until recall has been checked on recorded footage:
+    # python cascade.py report <videos>, then set CASCADE_SCREEN_CONF and turn this on
+    EXTERNAL_CASCADE = False
+    CASCADE_SCREEN_MODEL_PATH = None  # None = yolov5n from torch hub
+    CASCADE_SCREEN_SIZE = 160
+    CASCADE_SCREEN_CONF = 0.25        # kept low: a miss here is a miss of the whole cascade
+    CASCADE_HOLD_FRAMES = 5
+    CASCADE_REFRESH_SEC = 2.0
+
+    # Occupancy time series (memory-mapped, survives restarts; None = RAM only)
+    OCCUPANCY_DIR = "occupancy_data"
+
+    # Maximum frame age (capture on the client -> now) per camera. Older frames are dropped
+    # at receive, decode, analysis and display before any work is done on them.
+    # "default" covers cameras without an entry; 0 disables the check for that camera.
+    FRAME_MAX_AGE_MS = {"default": 500, "cam4": 1000}
+    # Client/server clock difference (estimated from arrivals) is only corrected when larger than
+    # this; below it the clocks count as synced, so sustained queueing delay is never hidden
+    CLOCK_SKEW_MAX_MS = 2000
+
+    # Thread counts / core pinning per model, OpenCV and the worker threads. These are the
+    # defaults; RUNTIME_TUNING_PATH (written by "python inference_executor.py autotune <videos>"
+    # on the target hardware) overrides them per deployment. None = library default / all cores.
+    RUNTIME_TUNING_PATH = TUNING_PATH
+    RUNTIME_TUNING = {
+        "opencv_threads": None,
+        "executors": {"external": {"threads": None, "cpus": None}, "seat": {"threads": None, "cpus": None}},
+        "threads": {"decoder": {"cpus": None}, "analyze": {"cpus": None}, "gui": {"cpus": None}}
+    }
 
-TARGET_CLASSES = {0: "insan", 2: "arac", 16: "kedi", 17: "kopek"}
-SEAT_MATRIX = [
-    [1, 1, 0, 1],
-    [1, 1, 0, 1],
-    [1, 1, 0, 1],
-    [1, 1, 1, 1]
-]
 SEAT_STATUS_COLOR = {
     "empty": (180, 180, 180),
     "occupied": (0, 0, 255),
@@ -52,21 +116,104 @@ except FileNotFoundError:
     icon = Image.new("RGBA", (64, 64), (128, 128, 128, 255))
 
 # ========== MODEL ==========
-# External camera model (YOLOv5)
-external_model = torch.hub.load('ultralytics/yolov5', 'yolov5s')
-external_model.to("cpu").eval()
+def _external_loader(path):
+    if path is None:
+        return load_external_model(Config.MODEL_PRECISION, Config.EXTERNAL_MODEL_INT8_PATH)
+    return load_external_model_file(path)
 
+def _seat_loader(path):
+    if path is None:
+        return load_seat_model(Config.MODEL_PRECISION, Config.SEAT_MODEL_PATH, Config.SEAT_MODEL_INT8_PATH)
+    return load_seat_model_file(path)
+
+# Models live in swappable slots; they are loaded by load_models() (or on first use)
+# External camera model (YOLOv5)
+external_model = ModelSlot("external", _external_loader, external_output_detections,
+                           min_agreement=Config.MODEL_SWAP_MIN_AGREEMENT)
 # Internal seat detection model (YOLO)
-try:
-    if os.path.exists(Config.SEAT_MODEL_PATH):
-        seat_model = YOLO(Config.SEAT_MODEL_PATH)
-        print("✅ Koltuk modeli yüklendi")
-    else:
-        print("⚠️ Koltuk modeli bulunamadı, varsayılan model kullanılacak")
-        seat_model = YOLO('yolov8n.pt')  # Fallback to default model
-except Exception as e:
-    print(f"⚠️ Model yükleme hatası: {e}, varsayılan model kullanılacak")
-    seat_model = YOLO('yolov8n.pt')
+seat_model = ModelSlot("seat", _seat_loader, seat_output_detections,
+                       min_agreement=Config.MODEL_SWAP_MIN_AGREEMENT)
+# First stage of the external cascade (tiny YOLOv5)
+screen_model = ModelSlot("screen", lambda path: load_screen_model(path or Config.CASCADE_SCREEN_MODEL_PATH,
+                                                                  Config.CASCADE_SCREEN_CONF),
+                         external_output_detections, min_agreement=Config.MODEL_SWAP_MIN_AGREEMENT)
+MODEL_SLOTS = {"external": external_model, "seat": seat_model}
+if Config.EXTERNAL_CASCADE:
+    MODEL_SLOTS["screen"] = screen_model
+cascade_gate = CascadeGate(Config.CASCADE_HOLD_FRAMES, Config.CASCADE_REFRESH_SEC)
+frame_deadlines = FrameDeadlines(Config.FRAME_MAX_AGE_MS, max_skew_ms=Config.CLOCK_SKEW_MAX_MS)
+runtime_tuning = RuntimeTuning.load(Config.RUNTIME_TUNING_PATH, Config.RUNTIME_TUNING)
+
+def load_models():
+    """Modelleri yükler (import sırasında değil, başlangıçta çağrılır)"""
+    for slot in MODEL_SLOTS.values():
+        if not slot.loaded:
+            slot.load()
+
+def apply_runtime_tuning():
+    """Thread/çekirdek ayarlarını uygular ve modelleri kendi çıkarım thread'lerine bağlar (başlangıçta)"""
+    runtime_tuning.apply()
+    # The cascade runs the screen model right before the full one, so they share cores
+    external_model.executor = screen_model.executor = runtime_tuning.executor("external")
+    seat_model.executor = runtime_tuning.executor("seat")
+
+def external_conf():
+    """Yüklü dış kamera modelinin hassasiyetine göre güven eşiği"""
+    # Thresholds follow the precision that was actually loaded (int8 may fall back to fp32)
+    return Config.EXTERNAL_CONF_THRESHOLD[external_model.precision or "fp32"]
+
+def seat_conf():
+    """Yüklü koltuk modelinin hassasiyetine göre güven eşiği"""
+    return Config.SEAT_CONF_THRESHOLD[seat_model.precision or "fp32"]
+
+def start_model_watcher():
+    """Model dosyalarındaki değişiklikleri izleyip sıcak değiştirme başlatır"""
+    seat_path = Config.SEAT_MODEL_INT8_PATH if Config.MODEL_PRECISION == "int8" else Config.SEAT_MODEL_PATH
+    return ModelWatcher({
+        Config.EXTERNAL_MODEL_WATCH_PATH: external_model,
+        seat_path: seat_model
+    }).start()
+
+def handle_reload(request):
+    """Kontrol komutu: {"cmd": "reload", "slot": "seat", "path": "...", "force": false}"""
+    slot = MODEL_SLOTS[request["slot"]]
+    default_path = {
+        "seat": Config.SEAT_MODEL_PATH,
+        "external": Config.EXTERNAL_MODEL_WATCH_PATH,
+        "screen": Config.CASCADE_SCREEN_MODEL_PATH  # None = hub yolov5n, no file to reload from
+    }[slot.name]
+    path = request.get("path") or slot.path or default_path
+    if path is None:
+        return {"ok": False, "error": f"{slot.name} modeli için dosya yolu (path) belirtilmeli"}
+    if not os.path.exists(path):
+        return {"ok": False, "error": f"dosya bulunamadı: {path}"}
+    started = slot.stage(path, force=bool(request.get("force")))
+    return {"staging": started, "path": path}
+
+def handle_stop(data_manager, request):
+    """Kontrol komutu: {"cmd": "stop", "name": "Merkez"} durak geçişini kaydeder;
+    name verilmezse sadece durak bazlı doluluk özetlerini döndürür"""
+    if request.get("name"):
+        data_manager.occupancy.mark_stop(str(request["name"]), request.get("t"))
+    return {"stops": data_manager.occupancy.per_stop()}
+
+def handle_model_status(request):
+    """Kontrol komutu: {"cmd": "status"} - model yuvalarının durumu"""
+    return {"models": {name: slot.status() for name, slot in MODEL_SLOTS.items()}}
+
+control_server = ControlServer(SERVER_CONTROL_ADDR)
+control_server.register("reload", handle_reload)
+control_server.register("status", handle_model_status)
+control_server.register("profile", handle_profile_command)
+control_server.register("cascade", lambda request: {"cascade": cascade_gate.get_stats()})
+control_server.register("deadlines", lambda request: {"deadlines": frame_deadlines.get_stats()})
+control_server.register("runtime", lambda request: {"runtime": runtime_tuning.status()})
+
+# Background writer for snapshot files (seat simulation etc.)
+snapshot_writer = SnapshotWriter()
+
+# Annotated external frames: render() returns a fresh array per frame, safe to hand to the GUI thread
+overlay = OverlayRenderer(TARGET_CLASSES)
 
 # ========== DATA MANAGER ==========
 class DataManager:
@@ -86,18 +233,39 @@ class DataManager:
             "internal_frames": 0,
             "alerts_count": 0
         }
+        # Per-seat occupancy history (1 s / 1 min / 1 h tiers)
+        self.occupancy = OccupancyStore(TOTAL_SEATS, spill_dir=Config.OCCUPANCY_DIR)
         # Performance optimization
         self.frame_skip_counter = {"cam4": 0}  # Skip frames for faster processing
         self.cached_gui_frames = {}  # Cache processed GUI frames
+        self.gui_frame_times = {}  # Capture timestamp of each cached GUI frame
+        self.camera_health = {}  # cam_name -> latest capture health reported by the client
+        self.edge_thumbnails = {}  # Latest thumbnail (RGB, display size) per edge-mode camera
+        self._frame_lock = threading.Lock()
 
     def add_frame(self, cam_type, cam_name, frame):
-        self.latest_frames[cam_type][cam_name] = frame
+        # Called from several decoder threads
+        with self._frame_lock:
+            self.latest_frames[cam_type][cam_name] = frame
+            self._count_frame(cam_type)
+
+    def count_frame(self, cam_type):
+        """Görüntüsüz gelen (edge modu) analiz sonucunu kare olarak sayar"""
+        with self._frame_lock:
+            self._count_frame(cam_type)
+
+    def _count_frame(self, cam_type):
         self.stats["total_frames"] += 1
         if cam_type == "external":
             self.stats["external_frames"] += 1
         else:
             self.stats["internal_frames"] += 1
 
+    def set_gui_frame(self, cam_name, frame, timestamp=None):
+        """GUI'de gösterilecek kareyi yakalama zamanıyla birlikte saklar"""
+        self.cached_gui_frames[cam_name] = frame
+        self.gui_frame_times[cam_name] = timestamp
+
     def add_alert(self, cam_type, cam_name, level, message):
         self.alerts[cam_type][cam_name] = {
             "timestamp": datetime.now(),
@@ -111,12 +279,23 @@ class DataManager:
         self.seat_data["states"] = seat_states
         self.seat_data["standing_count"] = standing_count
         self.seat_data["last_update"] = datetime.now()
+        self.occupancy.record(seat_states, standing_count)
+
+    def get_trip_summary(self):
+        """Sistem açıldığından beri tepe ayakta yolcu ve kemer uyumunu döndürür"""
+        summary = self.occupancy.query(self.stats["start_time"].timestamp())
+        if not summary["samples"]:
+            return {"peak_standing": 0, "belt_compliance": "-"}
+        return {
+            "peak_standing": summary["peak_standing"],
+            "belt_compliance": f"%{summary['belt_compliance'] * 100:.0f}"
+        }
 
     def get_seat_summary(self):
         """Gerçek koltuk verilerini döndürür"""
         if not self.seat_data["states"]:
             # Varsayılan değerler
-            total_seats = sum(cell for row in SEAT_MATRIX for cell in row)
+            total_seats = TOTAL_SEATS
             return {
                 "total_seats": total_seats,
                 "occupied_seats": 0,
@@ -141,37 +320,17 @@ class DataManager:
         }
 
 # ========== SEAT UTILS ==========
+@profiled()
 def detect_seat_states(frame):
     """Kameradan alınan görüntüdeki kişi sınıflarını analiz eder ve ayakta olan sayısını döndürür."""
     try:
-        results = seat_model(frame, verbose=False)[0]
-        
-        # Check if we have any detections
-        if hasattr(results, 'boxes') and results.boxes is not None and len(results.boxes) > 0:
-            class_list = [int(cls) for cls in results.boxes.cls.tolist()]
-            conf_list = [float(conf) for conf in results.boxes.conf.tolist()]
-            # Reduced logging for performance
-            if len(class_list) > 0:
-                print(f"✅ Tespit: {len(class_list)} obje, en yüksek güven: {max(conf_list):.2f}")
-        else:
-            class_list = []
-        
-        seat_states = []
-        total_seats = sum(cell for row in SEAT_MATRIX for cell in row)
-        standing_count = 0
-
-        for i in range(total_seats):
-            if i < len(class_list):
-                cls = class_list[i]
-                if cls == 2:  # Belted passenger
-                    seat_states.append("belted")
-                elif cls == 1:  # Occupied but not belted
-                    seat_states.append("occupied")
-                else:  # Empty seat, person standing
-                    seat_states.append("empty")
-                    standing_count += 1
-            else:
-                seat_states.append("empty")
+        detections = seat_detections(seat_model, frame, seat_conf())
+        class_list = [int(cls) for cls in detections[:, 5]]
+        # Reduced logging for performance
+        if len(class_list) > 0:
+            print(f"✅ Tespit: {len(class_list)} obje, en yüksek güven: {detections[:, 4].max():.2f}")
+
+        seat_states, standing_count = seat_states_from_classes(class_list)
 
         # Reduced logging for performance
         if len(class_list) > 0:
@@ -182,28 +341,13 @@ def detect_seat_states(frame):
     except Exception as e:
         print(f"[HATA] Koltuk durumu tespit hatası: {e}")
         # Return default empty states on error
-        total_seats = sum(cell for row in SEAT_MATRIX for cell in row)
-        return ["empty"] * total_seats, 0
+        return ["empty"] * TOTAL_SEATS, 0
 
 def detect_seat_states_legacy(class_list):
     """Eski sürüm - geriye dönük uyumluluk için"""
-    seat_states = []
-    total_seats = sum(cell for row in SEAT_MATRIX for cell in row)
-    standing_count = 0
-    for i in range(total_seats):
-        if i < len(class_list):
-            cls = class_list[i]
-            if cls == 2:
-                seat_states.append("belted")
-            elif cls == 1:
-                seat_states.append("occupied")
-            else:
-                seat_states.append("empty")
-                standing_count += 1
-        else:
-            seat_states.append("empty")
-    return seat_states, standing_count
+    return seat_states_from_classes(class_list)
 
+@profiled()
 def draw_seat_layout_with_icon(matrix, states, standing_count):
     """Koltuk düzenini ikon ve durum renkleriyle çizer"""
     seat_w, seat_h = 80, 80
@@ -294,6 +438,47 @@ def draw_seat_layout_with_icon(matrix, states, standing_count):
     
     return np.array(canvas.convert("RGB"))
 
+def draw_external_detections(cam_name, frame, detections):
+    """Dış kamera tespitlerini (RGB) yeni bir kareye çizer; frame değişmez, sonuç GUI'ye verilebilir"""
+    return overlay.render(cam_name, frame, detections)
+
+def draw_roi_zones(frame, rois):
+    """ROI bölgelerini (RGB) çizer: uyarı bölgeleri sarı, diğerleri gri"""
+    height, width = frame.shape[:2]
+    for roi, (x1, y1, x2, y2) in zip(rois, roi_pixel_boxes(rois, width, height)):
+        color = (255, 200, 0) if roi.get("alert", True) else (160, 160, 160)
+        cv2.rectangle(frame, (x1, y1), (x2 - 1, y2 - 1), color, 1)
+        cv2.putText(frame, roi.get("name", ""), (x1 + 2, y1 + 12), cv2.FONT_HERSHEY_SIMPLEX, 0.4, color, 1)
+    return frame
+
+def publish_seat_states(data_manager, cam_name, seat_states, standing_count):
+    """Koltuk sonucunu simülasyona, DataManager'a ve uyarılara işler (cam4 akışı)"""
+    counter = data_manager.frame_skip_counter.get(cam_name, 0)
+    sim_img = draw_seat_layout_with_icon(SEAT_MATRIX, seat_states, standing_count)
+    data_manager.annotated_frames["seat"] = sim_img
+    data_manager.update_seat_data(seat_states, standing_count)
+    
+    # Save seat simulation less frequently to reduce I/O
+    if counter % 30 == 0:  # Every 30 frames
+        save_seat_simulation(sim_img)
+    
+    # Reduced logging - only print significant changes
+    occupied = seat_states.count('occupied')
+    belted = seat_states.count('belted')
+    if counter % 20 == 0:  # Every 20 frames
+        print(f"🪑 {cam_name} - Dolu: {occupied}, Kemerli: {belted}, Ayakta: {standing_count}")
+    
+    # Add seat-related alerts (less frequent)
+    if counter % 10 == 0:  # Every 10 frames
+        if standing_count > 3:
+            data_manager.add_alert("internal", cam_name, "warning", 
+                                 f"⚠️ Çok fazla ayakta yolcu: {standing_count}")
+        
+        unbelted_count = seat_states.count("occupied")
+        if unbelted_count > 2:  # Only alert if more than 2
+            data_manager.add_alert("internal", cam_name, "info", 
+                                 f"ℹ️ Kemersiz yolcu: {unbelted_count}")
+
 # ========== UTILITY FUNCTIONS ==========
 def ensure_directories():
     """Gerekli dizinleri oluşturur"""
@@ -303,26 +488,157 @@ def ensure_directories():
             os.makedirs(directory)
             print(f"✅ Dizin oluşturuldu: {directory}")
 
+def get_cam_type(cam_name):
+    """Kamera adından tipini belirler (cam4 iç kamera, diğer cam* dış kamera)"""
+    # cam4 is internal camera for seat detection, others starting with "cam" are external
+    if cam_name == "cam4":
+        return "internal"
+    elif cam_name.startswith("cam"):
+        return "external"
+    return "internal"
+
+def get_analysis_size(cam_name):
+    """Analizde kullanılacak frame boyutunu döndürür"""
+    if Config.RESIZE_BEFORE_ANALYSIS and cam_name == "cam4":
+        return Config.ANALYSIS_SIZE
+    return (320, 240)
+
+def detect_external_objects(cam_name, frame, analysis_size):
+    """Dış kamera tespiti (BGR kare): ROI varsa sadece kırpmalar, yoksa analiz boyutunda tam kare.
+    Kutular analiz boyutunda, uyarı bölgesi maskesiyle birlikte döner."""
+    rois = Config.EXTERNAL_ROIS.get(cam_name)
+    with PROFILER.timer("external_inference"):
+        if rois:
+            # Crops come from the received frame, so they keep its full resolution
+            detections = external_detections_in_rois(external_model, frame, rois, external_conf())
+            detections = scale_detections(detections, frame.shape[1::-1], analysis_size)
+        else:
+            detections = external_detections(external_model, cv2.resize(frame, analysis_size), external_conf())
+    return detections, alert_zone_mask(detections, rois, *analysis_size)
+
+def screen_external(frame, conf=None):
+    """Kaskadın ilk aşaması: küçük modelle düşük çözünürlükte hedef sınıf taraması (BGR kare)"""
+    conf = Config.CASCADE_SCREEN_CONF if conf is None else conf
+    return external_detections(screen_model, frame, conf, size=Config.CASCADE_SCREEN_SIZE)
+
+def detect_external_cascaded(cam_name, frame, analysis_size):
+    """Kaskad açıksa tam modeli sadece ilk aşama tetiklediğinde (veya yenileme zamanı) çalıştırır"""
+    if Config.EXTERNAL_CASCADE:
+        with PROFILER.timer("cascade_screen"):
+            hit = len(screen_external(cv2.resize(frame, analysis_size))) > 0
+        if not cascade_gate.decide(cam_name, hit):
+            return np.zeros((0, 6), dtype=np.float32), np.zeros(0, dtype=bool)
+
+    detections, in_zone = detect_external_objects(cam_name, frame, analysis_size)
+    if Config.EXTERNAL_CASCADE:
+        cascade_gate.update(cam_name, len(detections) > 0)
+    return detections, in_zone
+
 def save_seat_simulation(img_array, save_path=None):
-    """Koltuk simülasyon görüntüsünü kaydeder"""
+    """Koltuk simülasyon görüntüsünü arka planda kaydedilmek üzere kuyruğa alır"""
     if save_path is None:
         save_path = Config.SAVE_PATH
     
+    # Encoding and the atomic file replace happen on the snapshot writer thread
+    if snapshot_writer.submit(save_path, img_array):
+        return True
+    print(f"❌ Koltuk simülasyonu kaydedilemedi (yazma kuyruğu dolu): {save_path}")
+    return False
+
+# ========== Frame Decode (parallel) ==========
+def decode_jpeg_payload(payload):
+    """Hex kodlu (eski mod) veya ham (edge küçük resmi) JPEG verisini BGR frame'e çözer"""
+    data = payload if isinstance(payload, bytes) else bytes.fromhex(payload)
+    npimg = np.frombuffer(data, dtype=np.uint8)
+    return cv2.imdecode(npimg, cv2.IMREAD_COLOR)
+
+# Per-camera reference frames of delta video streams
+stream_decoders = StreamDecoders()
+
+def decode_frame_payload(payload):
+    """Alınan yükü çözer: (başlık, bayt) delta video paketi, diğerleri JPEG"""
+    if isinstance(payload, tuple):
+        return stream_decoders.decode(*payload)
+    return decode_jpeg_payload(payload)
+
+def enqueue_analysis(frame_queue, item):
+    """Analiz kuyruğuna bloklamadan ekler, doluysa en eskisini atar"""
+    # Non-blocking queue put
     try:
-        ensure_directories()
-        result = cv2.imwrite(save_path, img_array)
-        if result:
-            print(f"✅ Koltuk simülasyonu güncellendi: {save_path}")
-            return True
+        if frame_queue.qsize() < Config.FRAME_QUEUE_SIZE:
+            frame_queue.put_nowait(item)
         else:
-            print(f"❌ Koltuk simülasyonu kaydedilemedi: {save_path}")
-            return False
-    except Exception as e:
-        print(f"❌ Koltuk simülasyonu kaydetme hatası: {e}")
-        return False
+            # Drop oldest frame
+            try:
+                frame_queue.get_nowait()
+                frame_queue.put_nowait(item)
+            except:
+                pass
+    except:
+        pass
+
+def dispatch_frame(data_manager, frame_queue, cam_name, frame, meta=None):
+    """Çözülmüş kareyi DataManager'a ve analiz kuyruğuna iletir"""
+    timestamp = meta.get("timestamp") if meta else None
+    if meta and meta.get("thumbnail"):
+        # Edge-mode preview: display only, detection already ran on the client
+        store_edge_thumbnail(data_manager, cam_name, frame, timestamp)
+        return
+    data_manager.add_frame(get_cam_type(cam_name), cam_name, frame)
+    enqueue_analysis(frame_queue, (cam_name, frame, timestamp))
+
+def frame_expired(stage, cam_name, meta):
+    """Karenin yaşı kameranın sınırını aştıysa True (aşamanın düşen sayacı artar)"""
+    return not frame_deadlines.fresh(stage, cam_name, meta.get("timestamp") if meta else None)
+
+# ========== Edge Mode (detection on the client) ==========
+def receive_edge_message(data_manager, frame_queue, decode_pool, parts):
+    """Edge multipart mesajını işler: sonuçlar analiz kuyruğuna, küçük resimler çözücüye gider"""
+    header, result = parse_message(parts)
+    cam_name = header["cam"]
+    if result.kind == "thumb":
+        decode_pool.submit(cam_name, result.data, {"timestamp": header.get("timestamp"), "thumbnail": True})
+    else:
+        # One det/seat record per captured frame, so it counts as a frame
+        data_manager.count_frame(get_cam_type(cam_name))
+        enqueue_analysis(frame_queue, (cam_name, result, header.get("timestamp")))
+    return header
+
+def store_edge_thumbnail(data_manager, cam_name, frame, timestamp=None):
+    """Edge küçük resmini ekran boyutunda (RGB) saklar"""
+    thumb = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), Config.EXTERNAL_CAM_SIZE)
+    data_manager.edge_thumbnails[cam_name] = thumb
+    if get_cam_type(cam_name) == "internal":
+        data_manager.annotated_frames["internal"][cam_name] = thumb
+        data_manager.set_gui_frame(cam_name, thumb, timestamp)
+
+def handle_edge_result(data_manager, cam_name, result, timestamp=None):
+    """Client'ta üretilen tespit/koltuk sonucunu sunucu analiziyle aynı şekilde işler"""
+    if result.kind == "seat":
+        data_manager.frame_skip_counter[cam_name] = data_manager.frame_skip_counter.get(cam_name, 0) + 1
+        seat_states, standing_count = result.data
+        publish_seat_states(data_manager, cam_name, seat_states, standing_count)
+        return
+
+    detections = result.data
+    rois = Config.EXTERNAL_ROIS.get(cam_name)
+    if alert_zone_mask(detections, rois, *result.size).any():
+        data_manager.add_alert("external", cam_name, "warning", "🚨 TESPİT VAR")
+
+    # Boxes are in the client's analysis resolution; draw them on the latest thumbnail
+    thumb = data_manager.edge_thumbnails.get(cam_name)
+    if thumb is None:
+        return
+    annotated_frame = draw_external_detections(
+        cam_name, thumb, scale_detections(detections, result.size, thumb.shape[1::-1]))
+    if rois:
+        draw_roi_zones(annotated_frame, rois)
+    data_manager.annotated_frames["external"][cam_name] = annotated_frame
+    data_manager.set_gui_frame(cam_name, annotated_frame, timestamp)
 
 # ========== ZMQ Receiver (Optimized for low latency) ==========
 def zmq_receiver(data_manager, frame_queue):
+    runtime_tuning.initializer("decoder")()
     context = zmq.Context()
     socket = context.socket(zmq.PULL)
     
@@ -330,8 +646,21 @@ def zmq_receiver(data_manager, frame_queue):
     socket.setsockopt(zmq.RCVHWM, 5)  # High water mark
     socket.setsockopt(zmq.LINGER, 0)  # Don't wait on close
     socket.bind("tcp://*:5555")
+    if zmq.has("ipc"):
+        # Same-host clients send shared-memory notifications here
+        socket.bind(LOCAL_IPC_ADDR)
+    shm_reader = ShmRingReader() if shm_available() else None
+    
+    # Decoding runs on a thread pool; this loop only receives and enqueues payloads
+    decode_pool = DecodePool(
+        decode_frame_payload,
+        lambda cam_name, frame, meta: dispatch_frame(data_manager, frame_queue, cam_name, frame, meta),
+        workers=Config.DECODE_WORKERS,
+        expired=lambda cam_name, meta: frame_expired("decode", cam_name, meta),
+        initializer=runtime_tuning.initializer("decoder")
+    ).start()
     
-    print("📡 ZMQ alıcısı düşük gecikme modunda başlatıldı")
+    print(f"📡 ZMQ alıcısı düşük gecikme modunda başlatıldı ({Config.DECODE_WORKERS} çözücü thread)")
     received_count = 0
     start_time = time.time()
     
@@ -339,50 +668,67 @@ def zmq_receiver(data_manager, frame_queue):
         try:
             # Non-blocking receive with short timeout
             if socket.poll(timeout=1):  # 1ms timeout
-                message = socket.recv_json(zmq.NOBLOCK)
+                parts = socket.recv_multipart(zmq.NOBLOCK)
                 received_count += 1
                 
-                cam_name = message["cam"]
-                img_bytes = bytes.fromhex(message["img"])
-                npimg = np.frombuffer(img_bytes, dtype=np.uint8)
-                frame = cv2.imdecode(npimg, cv2.IMREAD_COLOR)
-                
-                if frame is not None:
-                    # Measure latency if timestamp available
-                    if "timestamp" in message:
-                        latency = (time.time() - message["timestamp"]) * 1000
-                        if received_count % 100 == 0:  # Print every 100 frames
-                            print(f"📊 Total latency {cam_name}: {latency:.1f}ms")
-                    
-                    # cam4 is internal camera for seat detection, others starting with "cam" are external
-                    if cam_name == "cam4":
-                        cam_type = "internal"
-                    elif cam_name.startswith("cam"):
-                        cam_type = "external"
+                if len(parts) == 1:
+                    # Frame mode: one JSON message with a hex JPEG
+                    message = json.loads(parts[0])
+                    if message.get("kind") == "health":
+                        # Periodic capture health from the client (camera_supervisor.py)
+                        data_manager.camera_health.update(message["cameras"])
+                        continue
+                    # Shared-memory frames come from this machine: same clock, no offset to estimate
+                    frame_deadlines.observe(message["cam"], message.get("timestamp"), same_clock="shm" in message)
+                    if frame_expired("receive", message["cam"], message):
+                        pass  # Already too old: skip the shared-memory copy / decode
+                    elif "shm" in message:
+                        # Same-host client: raw frame from the shared-memory ring, nothing to decode
+                        frame = shm_reader.read(message) if shm_reader else None
+                        if frame is not None:
+                            dispatch_frame(data_manager, frame_queue, message["cam"], frame,
+                                           {"timestamp": message.get("timestamp")})
                     else:
-                        cam_type = "internal"
-                    
-                    data_manager.add_frame(cam_type, cam_name, frame)
-                    
-                    # Non-blocking queue put
-                    try:
-                        if frame_queue.qsize() < Config.FRAME_QUEUE_SIZE:
-                            frame_queue.put_nowait((cam_name, frame))
-                        else:
-                            # Drop oldest frame
-                            try:
-                                frame_queue.get_nowait()
-                                frame_queue.put_nowait((cam_name, frame))
-                            except:
-                                pass
-                    except:
+                        decode_pool.submit(message["cam"], message["img"], {"timestamp": message.get("timestamp")})
+                else:
+                    message = json.loads(parts[0])
+                    frame_deadlines.observe(message["cam"], message.get("timestamp"))
+                    if message.get("kind") == "video":
+                        # Delta video: every packet is needed (in order) to keep the reference frame,
+                        # so stale packets are still decoded and only dropped before analysis
+                        decode_pool.submit(message["cam"], (message, parts[1]),
+                                           {"timestamp": message.get("timestamp")}, droppable=False,
+                                           key=message.get("type") == "key")
+                    elif frame_expired("receive", message["cam"], message):
                         pass
-                    
-                    # Reduced logging for performance
-                    if received_count % 50 == 0:
-                        elapsed = time.time() - start_time
-                        throughput = received_count / elapsed
-                        print(f"📥 Alım hızı: {throughput:.1f} frame/s")
+                    else:
+                        # Edge mode: [header, binary detections / seat states / thumbnail]
+                        receive_edge_message(data_manager, frame_queue, decode_pool, parts)
+                
+                cam_name = message["cam"]
+                
+                # Measure latency if timestamp available
+                if "timestamp" in message:
+                    latency = (time.time() - message["timestamp"]) * 1000
+                    if received_count % 100 == 0:  # Print every 100 frames
+                        print(f"📊 Total latency {cam_name}: {latency:.1f}ms")
+                
+                # Reduced logging for performance
+                if received_count % 50 == 0:
+                    elapsed = time.time() - start_time
+                    throughput = received_count / elapsed
+                    decode_stats = decode_pool.get_stats()
+                    print(f"📥 Alım hızı: {throughput:.1f} frame/s, çözülen: {decode_stats['decoded']}, "
+                          f"çözülmeden atılan: {decode_stats['stale_dropped']}, "
+                          f"yaş sınırı: {decode_stats['expired']}")
+                    video_stats = stream_decoders.get_stats()
+                    if video_stats["key"]:
+                        print(f"🎞️ Video: anahtar {video_stats['key']}, delta {video_stats['delta']}, "
+                              f"anahtar kare beklerken atılan {video_stats['broken']}, "
+                              f"geride kalınca atılan {decode_stats['overflow_dropped'] + decode_stats['superseded']}")
+                    if shm_reader and shm_reader.stats["read"]:
+                        print(f"🧠 Paylaşımlı bellek: okunan {shm_reader.stats['read']}, "
+                              f"üzerine yazılan {shm_reader.stats['overwritten']}, yarım {shm_reader.stats['torn']}")
                         
         except Exception as e:
             if "Resource temporarily unavailable" not in str(e):
@@ -390,31 +736,41 @@ def zmq_receiver(data_manager, frame_queue):
             time.sleep(0.001)  # Very short sleep on error
 
 # ========== Frame Analyze Worker (Optimized for low latency) ==========
+def prepare_analysis_frames(cam_name, frame):
+    """Gelen BGR kareden RGB analiz ve gösterim karelerini hazırlar"""
+    # Convert BGR to RGB immediately for consistency
+    if len(frame.shape) == 3 and frame.shape[2] == 3:
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    else:
+        frame_rgb = frame
+        
+    # Resize for processing efficiency
+    analysis_frame = cv2.resize(frame_rgb, get_analysis_size(cam_name))
+    if Config.RESIZE_BEFORE_ANALYSIS and cam_name == "cam4":
+        display_frame = cv2.resize(frame_rgb, Config.EXTERNAL_CAM_SIZE)
+    else:
+        display_frame = analysis_frame.copy()
+    return analysis_frame, display_frame
+
 def analyze_worker(data_manager, frame_queue):
+    runtime_tuning.initializer("analyze")()
     while True:
         try:
-            cam_name, frame = frame_queue.get_nowait()  # Non-blocking get
+            cam_name, frame, timestamp = frame_queue.get_nowait()  # Non-blocking get
             
             if frame is None:
                 continue
             
-            # Convert BGR to RGB immediately for consistency
-            if len(frame.shape) == 3 and frame.shape[2] == 3:
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            else:
-                frame_rgb = frame
-                
-            # Resize for processing efficiency
-            if Config.RESIZE_BEFORE_ANALYSIS:
-                if cam_name == "cam4":
-                    analysis_frame = cv2.resize(frame_rgb, Config.ANALYSIS_SIZE)
-                    display_frame = cv2.resize(frame_rgb, Config.EXTERNAL_CAM_SIZE)
-                else:
-                    analysis_frame = cv2.resize(frame_rgb, (320, 240))
-                    display_frame = analysis_frame.copy()
-            else:
-                analysis_frame = cv2.resize(frame_rgb, (320, 240))
-                display_frame = analysis_frame.copy()
+            # Waited too long in the queue: not worth analysing or showing any more
+            if not frame_deadlines.fresh("analyze", cam_name, timestamp):
+                continue
+            
+            if isinstance(frame, EdgeResult):
+                # Already analysed on the client
+                handle_edge_result(data_manager, cam_name, frame, timestamp)
+                continue
+            
+            analysis_frame, display_frame = prepare_analysis_frames(cam_name, frame)
             
             # cam4 is for seat detection (internal), other cam* are for external detection
             if cam_name == "cam4":
@@ -423,79 +779,46 @@ def analyze_worker(data_manager, frame_queue):
                 
                 # Always update display frame immediately
                 data_manager.annotated_frames["internal"][cam_name] = display_frame
-                data_manager.cached_gui_frames[cam_name] = display_frame
+                data_manager.set_gui_frame(cam_name, display_frame, timestamp)
                 
                 # Process every frame for real-time response
                 try:
                     # Convert back to BGR for model processing (YOLO expects BGR)
                     model_frame = cv2.cvtColor(analysis_frame, cv2.COLOR_RGB2BGR)
                     seat_states, standing_count = detect_seat_states(model_frame)
-                    sim_img = draw_seat_layout_with_icon(SEAT_MATRIX, seat_states, standing_count)
-                    data_manager.annotated_frames["seat"] = sim_img
-                    data_manager.update_seat_data(seat_states, standing_count)
-                    
-                    # Save seat simulation less frequently to reduce I/O
-                    if data_manager.frame_skip_counter[cam_name] % 30 == 0:  # Every 30 frames
-                        save_seat_simulation(sim_img)
-                    
-                    # Reduced logging - only print significant changes
-                    occupied = seat_states.count('occupied')
-                    belted = seat_states.count('belted')
-                    if data_manager.frame_skip_counter[cam_name] % 20 == 0:  # Every 20 frames
-                        print(f"🪑 {cam_name} - Dolu: {occupied}, Kemerli: {belted}, Ayakta: {standing_count}")
-                    
-                    # Add seat-related alerts (less frequent)
-                    if data_manager.frame_skip_counter[cam_name] % 10 == 0:  # Every 10 frames
-                        if standing_count > 3:
-                            data_manager.add_alert("internal", cam_name, "warning", 
-                                                 f"⚠️ Çok fazla ayakta yolcu: {standing_count}")
-                        
-                        unbelted_count = seat_states.count("occupied")
-                        if unbelted_count > 2:  # Only alert if more than 2
-                            data_manager.add_alert("internal", cam_name, "info", 
-                                                 f"ℹ️ Kemersiz yolcu: {unbelted_count}")
+                    publish_seat_states(data_manager, cam_name, seat_states, standing_count)
                             
                 except Exception as e:
                     print(f"[HATA] İç kamera analiz hatası ({cam_name}): {e}")
                     # Create default seat layout on error
                     if "seat" not in data_manager.annotated_frames or data_manager.annotated_frames["seat"] is None:
-                        total_seats = sum(cell for row in SEAT_MATRIX for cell in row)
-                        default_states = ["empty"] * total_seats
+                        default_states = ["empty"] * TOTAL_SEATS
                         sim_img = draw_seat_layout_with_icon(SEAT_MATRIX, default_states, 0)
                         data_manager.annotated_frames["seat"] = sim_img
                     
             elif cam_name.startswith("cam"):
                 # External camera analysis with YOLOv5 (cam1, cam2, cam3)
                 try:
-                    # Convert back to BGR for YOLOv5 model
-                    model_frame = cv2.cvtColor(analysis_frame, cv2.COLOR_RGB2BGR)
-                    results = external_model(model_frame)
-                    found = False
+                    # The queued frame is still BGR, as YOLOv5 expects
+                    detections, in_zone = detect_external_cascaded(cam_name, frame, get_analysis_size(cam_name))
+                    found = bool(in_zone.any())
                     
                     # Work on display frame (RGB) for annotations
-                    annotated_frame = display_frame.copy()
-                    
-                    for *xyxy, conf, cls in results.xyxy[0]:
-                        cls_id = int(cls)
-                        if cls_id in TARGET_CLASSES and conf > 0.5:
-                            found = True
-                            x1, y1, x2, y2 = map(int, xyxy)
-                            label = f"{TARGET_CLASSES[cls_id]} {conf:.2f}"
-                            # Draw on RGB frame
-                            cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), (255, 0, 0), 2)  # Red in RGB
-                            cv2.putText(annotated_frame, label, (x1, y1 - 5), 
-                                      cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 1)
+                    annotated_frame = draw_external_detections(cam_name, display_frame, detections)
+                    rois = Config.EXTERNAL_ROIS.get(cam_name)
+                    if rois:
+                        draw_roi_zones(annotated_frame, rois)
                     
                     if found:
                         data_manager.add_alert("external", cam_name, "warning", "🚨 TESPİT VAR")
                     
                     data_manager.annotated_frames["external"][cam_name] = annotated_frame
-                    data_manager.cached_gui_frames[cam_name] = annotated_frame
+                    data_manager.set_gui_frame(cam_name, annotated_frame, timestamp)
                     
                 except Exception as e:
                     print(f"[HATA] Dış kamera analiz hatası ({cam_name}): {e}")
                     data_manager.annotated_frames["external"][cam_name] = display_frame
-                    data_manager.cached_gui_frames[cam_name] = display_frame
+                    data_manager.set_gui_frame(cam_name, display_frame, timestamp)
                     
             else:
                 # Other internal cameras (if any)
@@ -519,8 +842,7 @@ def analyze_worker(data_manager, frame_queue):
                         
                 except Exception as e:
                     print(f"[HATA] İç kamera analiz hatası ({cam_name}): {e}")
-                    total_seats = sum(cell for row in SEAT_MATRIX for cell in row)
-                    default_states = ["empty"] * total_seats
+                    default_states = ["empty"] * TOTAL_SEATS
                     sim_img = draw_seat_layout_with_icon(SEAT_MATRIX, default_states, 0)
                     data_manager.annotated_frames["seat"] = sim_img
                     
@@ -529,9 +851,41 @@ def analyze_worker(data_manager, frame_queue):
             time.sleep(0.001)  # 1ms sleep
 
 # ========== GUI SINIFI ==========
+def gui_frame_image(frame):
+    """RGB kareyi panel boyutunda PIL görüntüsüne çevirir (geçersiz karede None)"""
+    # Frame should already be in RGB format, no conversion needed
+    if len(frame.shape) != 3 or frame.shape[2] != 3:
+        return None
+    # Resize only if needed
+    if frame.shape[:2] != Config.EXTERNAL_CAM_SIZE[::-1]:
+        resized = cv2.resize(frame, Config.EXTERNAL_CAM_SIZE)
+    else:
+        resized = frame
+    return Image.fromarray(resized.astype(np.uint8))
+
+def format_deadline_stats(stats):
+    """Aşama başına atılan bayat kare sayılarını ve saat farkını tek satıra çevirir"""
+    names = {"receive": "alım", "decode": "çözme", "analyze": "analiz", "gui": "ekran"}
+    text = " · ".join(f"{names[stage]} {stats['dropped'].get(stage, 0)}" for stage in names)
+    # Only estimates beyond Config.CLOCK_SKEW_MAX_MS are corrected; smaller ones count as synced
+    offsets = {cam: ms for cam, ms in stats.get("clock_offset_ms", {}).items()
+               if cam in stats.get("clock_offset_applied", ())}
+    if offsets:
+        low, high = min(offsets.values()), max(offsets.values())
+        text += f"  |  saat farkı {low:+.0f} ms" if low == high else f"  |  saat farkı {low:+.0f}..{high:+.0f} ms"
+    return text
+
+def format_camera_health(health):
+    """Kamera başına FPS, okuma süresi ve yeniden bağlanma sayısını tek satıra çevirir"""
+    icons = {"ok": "🟢", "stalled": "🟡", "reconnecting": "🔴"}
+    return " · ".join(
+        f"{icons.get(h['state'], '⚪')} {name} {h['fps']:.1f} fps, {h['read_ms']:.0f} ms, ↻{h['reconnects']}"
+        for name, h in sorted(health.items()))
+
 class EnhancedGUI:
     def __init__(self, data_manager):
         self.data_manager = data_manager
+        self.shown_frame_times = {}  # cam_name -> capture timestamp of the frame on screen
         self.root = tk.Tk()
         self.root.title("🚌 Akıllı Servis Monitoring Sistemi")
         self.root.geometry(f"{Config.WINDOW_WIDTH}x{Config.WINDOW_HEIGHT}")
@@ -560,13 +914,24 @@ class EnhancedGUI:
             ("İç Kamera", "internal_frames"),
             ("Uyarılar", "alerts_count"),
             ("Çalışma Süresi", "uptime"),
-            ("RAM Kullanımı", "memory")
+            ("RAM Kullanımı", "memory"),
+            ("Snapshot", "snapshot")
         ]
         for i, (label, key) in enumerate(stats_info):
             ttk.Label(main_stats_frame, text=f"{label}:").grid(row=0, column=i*2, padx=5, sticky=tk.W)
             self.stats_labels[key] = ttk.Label(main_stats_frame, text="0", foreground="blue")
             self.stats_labels[key].grid(row=0, column=i*2+1, padx=5, sticky=tk.W)
         
+        # Frames dropped for exceeding Config.FRAME_MAX_AGE_MS, per pipeline stage
+        ttk.Label(main_stats_frame, text="Bayat Kare:").grid(row=1, column=0, padx=5, sticky=tk.W)
+        self.stats_labels["deadlines"] = ttk.Label(main_stats_frame, text="-", foreground="blue")
+        self.stats_labels["deadlines"].grid(row=1, column=1, columnspan=len(stats_info) * 2 - 1, padx=5, sticky=tk.W)
+        
+        # Capture health reported by the client: FPS, read latency, reconnects per camera
+        ttk.Label(main_stats_frame, text="Kamera Sağlığı:").grid(row=2, column=0, padx=5, sticky=tk.W)
+        self.stats_labels["camera_health"] = ttk.Label(main_stats_frame, text="-", foreground="blue")
+        self.stats_labels["camera_health"].grid(row=2, column=1, columnspan=len(stats_info) * 2 - 1, padx=5, sticky=tk.W)
+        
         # Seat statistics
         seat_frame = ttk.LabelFrame(frame, text="🪑 Koltuk Durumu", padding=5)
         seat_frame.pack(fill=tk.X, pady=(5, 0))
@@ -577,11 +942,13 @@ class EnhancedGUI:
             ("Dolu", "occupied_seats"),
             ("Kemerli", "belted_seats"),
             ("Boş", "empty_seats"),
-            ("Ayakta", "standing_passengers")
+            ("Ayakta", "standing_passengers"),
+            ("Maks. Ayakta", "peak_standing"),
+            ("Kemer Uyumu", "belt_compliance")
         ]
         for i, (label, key) in enumerate(seat_info):
             ttk.Label(seat_frame, text=f"{label}:").grid(row=0, column=i*2, padx=5, sticky=tk.W)
-            color = "green" if key == "belted_seats" else "red" if key == "standing_passengers" else "blue"
+            color = "green" if key in ("belted_seats", "belt_compliance") else "red" if key in ("standing_passengers", "peak_standing") else "blue"
             self.seat_labels[key] = ttk.Label(seat_frame, text="0", foreground=color)
             self.seat_labels[key].grid(row=0, column=i*2+1, padx=5, sticky=tk.W)
             
@@ -637,6 +1004,12 @@ class EnhancedGUI:
         self.stats_labels["memory"].config(text=f"{mem_mb:.1f} MB")
         for key in ["total_frames", "external_frames", "internal_frames", "alerts_count"]:
             self.stats_labels[key].config(text=str(stats[key]))
+        snapshot_stats = snapshot_writer.get_stats()
+        self.stats_labels["snapshot"].config(
+            text=f"{snapshot_stats['avg_write_ms']:.1f} ms / {snapshot_stats['dropped']} düşen")
+        self.stats_labels["deadlines"].config(text=format_deadline_stats(frame_deadlines.get_stats()))
+        if self.data_manager.camera_health:
+            self.stats_labels["camera_health"].config(text=format_camera_health(self.data_manager.camera_health))
         
         # Update seat statistics
         seat_summary = self.data_manager.get_seat_summary()
@@ -666,21 +1039,22 @@ class EnhancedGUI:
                 # Seat simulation (already in RGB)
                 frame = self.data_manager.annotated_frames["seat"]
             
+            timestamp = self.data_manager.gui_frame_times.get(cam_name)
+            if frame is not None and timestamp is not None:
+                if self.shown_frame_times.get(cam_name) == timestamp:
+                    continue  # This frame is already on screen
+                self.shown_frame_times[cam_name] = timestamp
+                if not frame_deadlines.fresh("gui", cam_name, timestamp):
+                    continue  # Too old to show: skip the conversion, keep the last image
+            
             if frame is not None:
                 try:
-                    # Frame should already be in RGB format, no conversion needed
-                    if len(frame.shape) == 3 and frame.shape[2] == 3:
-                        # Resize only if needed
-                        if frame.shape[:2] != Config.EXTERNAL_CAM_SIZE[::-1]:
-                            resized = cv2.resize(frame, Config.EXTERNAL_CAM_SIZE)
-                        else:
-                            resized = frame
-                            
-                        img = ImageTk.PhotoImage(Image.fromarray(resized.astype(np.uint8)))
-                        label.configure(image=img)
-                        label.image = img  # Keep a reference
-                    else:
+                    pil_image = gui_frame_image(frame)
+                    if pil_image is None:
                         continue  # Skip invalid frames
+                    img = ImageTk.PhotoImage(pil_image)
+                    label.configure(image=img)
+                    label.image = img  # Keep a reference
                         
                 except Exception as e:
                     print(f"[GUI] Frame güncelleme hatası ({cam_name}): {e}")
@@ -715,6 +1089,11 @@ class EnhancedGUI:
                 return
         
         self._last_alert_update = datetime.now()
+
+        # Trip-level figures come from the occupancy history (once per second)
+        for key, value in self.data_manager.get_trip_summary().items():
+            self.seat_labels[key].config(text=str(value))
+
         self.alert_text.delete(1.0, tk.END)
         alert_count = 0
         for cam_type in ["external", "internal"]:
@@ -745,16 +1124,29 @@ if __name__ == "__main__":
     # Ensure required directories exist
     ensure_directories()
     
+    # Thread/core layout before the models load (OpenCV's thread count is process-wide)
+    apply_runtime_tuning()
+    print(f"🧵 Thread ayarları ({runtime_tuning.source}): {runtime_tuning.describe()}")
+    
+    # Load models, then watch their files and accept local control commands
+    load_models()
+    start_model_watcher()
+    control_server.start()
+    install_signal_handler()
+    
     # Initialize data manager and frame queue
     data_manager = DataManager()
     frame_queue = Queue(maxsize=Config.FRAME_QUEUE_SIZE)  # Optimized queue size
+    control_server.register("health", lambda request: {"cameras": data_manager.camera_health})
+    control_server.register("stop", lambda request: handle_stop(data_manager, request))
     
     # Start worker threads
+    snapshot_writer.start()
     print("📊 Analiz thread'i başlatılıyor...")
-    threading.Thread(target=analyze_worker, args=(data_manager, frame_queue), daemon=True).start()
+    threading.Thread(target=analyze_worker, args=(data_manager, frame_queue), name="analyze_worker", daemon=True).start()
     
     print("📡 ZMQ alıcısı başlatılıyor...")
-    threading.Thread(target=zmq_receiver, args=(data_manager, frame_queue), daemon=True).start()
+    threading.Thread(target=zmq_receiver, args=(data_manager, frame_queue), name="zmq_receiver", daemon=True).start()
     
     # Initialize and start GUI
     print("🖥️ GUI başlatılıyor...")
@@ -767,4 +1159,6 @@ if __name__ == "__main__":
     print(f"   - Cam4 frame atlama: {Config.ANALYSIS_SKIP_FRAMES} (her frame işlenir)")
     print(f"   - Analiz boyutu: {Config.ANALYSIS_SIZE}")
     print(f"   - ZMQ buffer: 5 frame")
+    # Pin the main (Tk) thread last: threads started from it would inherit its cores
+    runtime_tuning.initializer("gui")()
     gui.run()
@@ -0,0 +1,157 @@
+import atexit
+import os
+import socket
+import struct
+import numpy as np
+
+try:
+    from multiprocessing import shared_memory, resource_tracker
+except ImportError:  # Python < 3.8
+    shared_memory = None
+
+# ========== YEREL PAYLAŞIMLI BELLEK TAŞIMA ==========
+# Client ve server aynı makinedeyse kareler JPEG'e çevrilmeden kamera başına bir
+# paylaşımlı bellek halkasına yazılır; ZMQ üzerinden yalnızca küçük bir bildirim gider:
+#   {"cam": "cam1", "shm": "<segment>", "slot": 2, "seq": 1234, "timestamp": ...}
+# Her yuva seqlock ile korunur: yazar önce begin=seq, sonra veri, en son end=seq yazar;
+# okuyucu end, veri, begin sırasıyla okur ve ikisi de beklenen seq değilse kareyi atar.
+SHM_SLOTS = 4
+SHM_PREFIX = "akilli_servis"
+LOCAL_IPC_ADDR = "ipc:///tmp/akilli_servis_frames"  # server binds this next to tcp://*:5555
+
+RING_HEADER = struct.Struct("<4sII")    # magic, slot count, slot data size
+RING_HEADER_SIZE = 64
+RING_MAGIC = b"ASR1"
+SLOT_SEQ = struct.Struct("<Q")          # begin seq at +0, end seq at +8
+SLOT_META = struct.Struct("<dIII")      # timestamp, height, width, channels at +16
+SLOT_HEADER_SIZE = 64
+
+
+def shm_available():
+    return shared_memory is not None
+
+
+def is_local_address(addr):
+    """ZMQ adresi bu makineyi mi gösteriyor (ipc://, localhost veya yerel IP)"""
+    if addr.startswith(("ipc://", "inproc://")):
+        return True
+    host = addr.split("://", 1)[-1].rsplit(":", 1)[0].strip("[]")
+    if host in ("localhost", "::1"):
+        return True
+    try:
+        ip = socket.gethostbyname(host)
+        return ip.startswith("127.") or ip in socket.gethostbyname_ex(socket.gethostname())[2]
+    except OSError:
+        return False
+
+
+def _slot_offset(slot, slot_size):
+    return RING_HEADER_SIZE + slot * (SLOT_HEADER_SIZE + slot_size)
+
+
+class ShmRingWriter:
+    """Bir kameranın ham karelerini paylaşımlı bellek halkasına yazar (client tarafı)"""
+
+    def __init__(self, cam_name, capacity, slots=SHM_SLOTS):
+        # pid in the name: a restarted client never reuses a segment the server still has mapped
+        self.name = f"{SHM_PREFIX}_{cam_name}_{os.getpid()}"
+        self.capacity = capacity
+        self.slots = slots
+        self.seq = 0
+        size = _slot_offset(slots, capacity)
+        self._shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        RING_HEADER.pack_into(self._shm.buf, 0, RING_MAGIC, slots, capacity)
+        atexit.register(self.close)
+
+    def write(self, frame, timestamp):
+        """Kareyi sıradaki yuvaya yazar, gönderilecek bildirimi döndürür (sığmazsa None)"""
+        if frame.nbytes > self.capacity or not frame.flags.c_contiguous:
+            return None
+        seq = self.seq + 1
+        slot = seq % self.slots
+        offset = _slot_offset(slot, self.capacity)
+        buf = self._shm.buf
+
+        SLOT_SEQ.pack_into(buf, offset, seq)  # begin: readers of this slot now see a torn frame
+        data = np.frombuffer(buf, dtype=np.uint8, count=frame.nbytes, offset=offset + SLOT_HEADER_SIZE)
+        data[:] = frame.reshape(-1)
+        height, width = frame.shape[:2]
+        channels = frame.shape[2] if frame.ndim == 3 else 1
+        SLOT_META.pack_into(buf, offset + 16, timestamp, height, width, channels)
+        SLOT_SEQ.pack_into(buf, offset + 8, seq)  # end: slot complete
+        self.seq = seq
+        return {"shm": self.name, "slot": slot, "seq": seq}
+
+    def close(self):
+        if self._shm is not None:
+            self._shm.close()
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+            self._shm = None
+
+
+class ShmRingReader:
+    """Bildirimdeki yuvadan kareyi kopyalar; üzerine yazılmış/yarım kareleri atar (server tarafı)"""
+
+    def __init__(self):
+        self.stats = {"read": 0, "overwritten": 0, "torn": 0, "missing": 0}
+        self._segments = {}   # segment name -> (SharedMemory, slots, slot size)
+        self._cam_segment = {}
+
+    def _attach(self, cam_name, name):
+        if self._cam_segment.get(cam_name) != name:
+            # The client restarted with a new segment: drop the old mapping
+            old = self._segments.pop(self._cam_segment.get(cam_name), None)
+            if old is not None:
+                old[0].close()
+            self._cam_segment[cam_name] = name
+        if name not in self._segments:
+            shm = shared_memory.SharedMemory(name=name)
+            # Attaching registers the segment with this process' resource tracker, which would
+            # unlink it when the server exits; the client owns it
+            try:
+                resource_tracker.unregister(shm._name, "shared_memory")
+            except Exception:
+                pass
+            magic, slots, slot_size = RING_HEADER.unpack_from(shm.buf, 0)
+            if magic != RING_MAGIC:
+                shm.close()
+                raise ValueError(f"geçersiz paylaşımlı bellek halkası: {name}")
+            self._segments[name] = (shm, slots, slot_size)
+        return self._segments[name]
+
+    def read(self, message):
+        """Bildirimdeki kareyi (BGR kopya) döndürür, geçerli değilse None"""
+        try:
+            shm, slots, slot_size = self._attach(message["cam"], message["shm"])
+        except FileNotFoundError:
+            self.stats["missing"] += 1
+            return None
+
+        seq = message["seq"]
+        offset = _slot_offset(message["slot"] % slots, slot_size)
+        buf = shm.buf
+        if SLOT_SEQ.unpack_from(buf, offset + 8)[0] != seq:
+            # Writer already lapped the ring (we fell behind)
+            self.stats["overwritten"] += 1
+            return None
+        _, height, width, channels = SLOT_META.unpack_from(buf, offset + 16)
+        nbytes = height * width * channels
+        if nbytes > slot_size:
+            self.stats["torn"] += 1
+            return None
+        frame = np.frombuffer(buf, dtype=np.uint8, count=nbytes, offset=offset + SLOT_HEADER_SIZE).copy()
+        if SLOT_SEQ.unpack_from(buf, offset)[0] != seq:
+            # Writer started overwriting this slot while we were copying
+            self.stats["torn"] += 1
+            return None
+
+        self.stats["read"] += 1
+        return frame.reshape((height, width, channels) if channels > 1 else (height, width))
+
+    def close(self):
+        for shm, _, _ in self._segments.values():
+            shm.close()
+        self._segments.clear()
@@ -0,0 +1,126 @@
+import os
+import threading
+import time
+import cv2
+
+# ========== AYARLAR ==========
+MAX_PENDING = 8  # distinct paths waiting to be written
+
+
+class SnapshotWriter:
+    """Görüntüleri arka planda encode edip atomik olarak diske yazar.
+
+    Aynı yol için bekleyen eski görüntü yenisiyle değiştirilir (coalesce), böylece
+    yavaş disk analiz thread'ini hiçbir zaman bekletmez. Dosyalar önce aynı dizinde
+    geçici bir dosyaya yazılır ve os.replace ile yerine konur; okuyanlar yarım
+    yazılmış dosya görmez.
+    """
+
+    def __init__(self, max_pending=MAX_PENDING):
+        self.max_pending = max_pending
+        self.stats = {
+            "submitted": 0,
+            "written": 0,
+            "coalesced": 0,
+            "dropped": 0,
+            "errors": 0,
+            "last_write_ms": 0.0,
+            "avg_write_ms": 0.0,
+            "max_write_ms": 0.0
+        }
+        self._pending = {}  # path -> (img, params), insertion ordered
+        self._cond = threading.Condition()
+        self._created_dirs = set()
+        self._busy = False
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="snapshot_writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, path, img, params=None):
+        """Görüntüyü yazma kuyruğuna ekler; kuyruk doluysa False döner.
+
+        img, submit edildikten sonra değiştirilmemelidir.
+        """
+        self.start()
+        with self._cond:
+            self.stats["submitted"] += 1
+            if path in self._pending:
+                self.stats["coalesced"] += 1
+            elif len(self._pending) >= self.max_pending:
+                self.stats["dropped"] += 1
+                return False
+            self._pending[path] = (img, params)
+            self._cond.notify()
+        return True
+
+    def flush(self, timeout=5.0):
+        """Bekleyen tüm yazmalar bitene kadar bekler"""
+        deadline = time.time() + timeout
+        with self._cond:
+            while self._pending or self._busy:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def get_stats(self):
+        with self._cond:
+            stats = dict(self.stats)
+            stats["pending"] = len(self._pending)
+        return stats
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                path = next(iter(self._pending))
+                img, params = self._pending.pop(path)
+                self._busy = True
+
+            start = time.perf_counter()
+            ok = self._write(path, img, params)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            with self._cond:
+                self._busy = False
+                if ok:
+                    stats = self.stats
+                    stats["written"] += 1
+                    stats["last_write_ms"] = elapsed_ms
+                    stats["avg_write_ms"] += (elapsed_ms - stats["avg_write_ms"]) / stats["written"]
+                    stats["max_write_ms"] = max(stats["max_write_ms"], elapsed_ms)
+                else:
+                    self.stats["errors"] += 1
+                self._cond.notify_all()
+
+    def _write(self, path, img, params):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            ext = os.path.splitext(path)[1] or ".jpg"
+            ok, encoded = cv2.imencode(ext, img, params or [])
+            if not ok:
+                print(f"❌ Snapshot encode edilemedi: {path}")
+                return False
+
+            directory = os.path.dirname(path)
+            if directory and directory not in self._created_dirs:
+                os.makedirs(directory, exist_ok=True)
+                self._created_dirs.add(directory)
+
+            with open(tmp_path, "wb") as f:
+                f.write(encoded.tobytes())
+            os.replace(tmp_path, path)
+            return True
+        except Exception as e:
+            print(f"❌ Snapshot yazma hatası ({path}): {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return False
@@ -0,0 +1,189 @@
+import threading
+import time
+from queue import Queue, Empty, Full
+
+# ========== AYARLAR ==========
+GRAB_TIMEOUT = 0.5       # seconds to wait for every camera to grab
+RETRIEVE_TIMEOUT = 0.5   # seconds to wait for every camera to decode
+FRAMESET_QUEUE_SIZE = 2  # keep only the newest sets (low latency)
+
+
+class FrameSet:
+    """Aynı anda yakalanmış karelerden oluşan küme"""
+
+    def __init__(self, seq, frames, grab_times, expected):
+        self.seq = seq
+        self.frames = frames            # {cam_name: frame}
+        self.grab_times = grab_times    # {cam_name: time.time() right after grab()}
+        self.missing = [name for name in expected if name not in frames]
+        if grab_times:
+            self.timestamp = min(grab_times.values())
+            self.skew_ms = (max(grab_times.values()) - self.timestamp) * 1000
+        else:
+            self.timestamp = time.time()
+            self.skew_ms = 0.0
+
+
+def grab_retrieve_once(cameras):
+    """Tek thread'de önce tüm kameralara grab(), sonra retrieve() uygular.
+
+    cameras: {cam_name: VideoCapture}
+    """
+    grab_times = {}
+    for name, cap in cameras.items():
+        if cap.grab():
+            grab_times[name] = time.time()
+
+    frames = {}
+    for name in list(grab_times):
+        ret, frame = cameras[name].retrieve()
+        if ret:
+            frames[name] = frame
+        else:
+            del grab_times[name]
+    return FrameSet(0, frames, grab_times, list(cameras))
+
+
+class SyncCapture:
+    """Her kamera için ayrı thread ile eşzamanlı grab/retrieve yapar.
+
+    Koordinatör her turda tüm kameralara aynı anda grab sinyali verir; tüm grab'lar
+    bitince (veya zaman aşımında) retrieve aşamasına geçilir. Takılan bir kamera o
+    turdan çıkarılır; önceki bir turun grab/retrieve çağrısında hâlâ meşgul olan kameralar
+    sonraki turlarda beklenmez, doğrudan eksik sayılır. Böylece diğerlerinin akışı engellenmez.
+    """
+
+    def __init__(self, cameras, target_fps=15, grab_timeout=GRAB_TIMEOUT,
+                 retrieve_timeout=RETRIEVE_TIMEOUT, queue_size=FRAMESET_QUEUE_SIZE):
+        self.cameras = dict(cameras)
+        self.interval = 1.0 / target_fps if target_fps else 0.0
+        self.grab_timeout = grab_timeout
+        self.retrieve_timeout = retrieve_timeout
+        self.sets = Queue(maxsize=queue_size)
+        self.stats = {"sets": 0, "incomplete": 0, "skew_ms_avg": 0.0, "skew_ms_max": 0.0}
+
+        self._cond = threading.Condition()
+        self._running = False
+        self._seq = 0
+        self._retrieve_seq = 0
+        self._grabs = {}
+        self._frames = {}
+        self._done = set()
+        self._busy = set()  # cameras still inside grab()/retrieve() (possibly of an older round)
+
+    def start(self):
+        self._running = True
+        for name, cap in self.cameras.items():
+            threading.Thread(target=self._camera_loop, args=(name, cap),
+                             name=f"sync_grab_{name}", daemon=True).start()
+        threading.Thread(target=self._coordinator_loop, name="sync_coordinator", daemon=True).start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+    def get(self, timeout=None):
+        """Sıradaki FrameSet'i döndürür (zaman aşımında None)"""
+        try:
+            return self.sets.get(timeout=timeout)
+        except Empty:
+            return None
+
+    # ---------- camera threads ----------
+    def _camera_loop(self, name, cap):
+        last_seq = 0
+        while self._running:
+            with self._cond:
+                while self._running and self._seq == last_seq:
+                    self._cond.wait(0.5)
+                seq = last_seq = self._seq
+                self._busy.add(name)
+
+            ok = cap.grab()
+            grab_time = time.time()
+
+            with self._cond:
+                self._busy.discard(name)
+                if seq != self._seq:
+                    continue  # this round already timed out without us
+                self._grabs[name] = (ok, grab_time)
+                if not ok:
+                    self._done.add(name)
+                self._cond.notify_all()
+                if not ok:
+                    continue
+                # Retrieve only after every camera grabbed, so decoding one camera
+                # never delays another camera's grab
+                while self._running and self._seq == seq and self._retrieve_seq < seq:
+                    self._cond.wait(0.5)
+                if self._seq != seq:
+                    continue
+                self._busy.add(name)
+
+            ret, frame = cap.retrieve()
+
+            with self._cond:
+                self._busy.discard(name)
+                if seq == self._seq:
+                    if ret:
+                        self._frames[name] = frame
+                    self._done.add(name)
+                    self._cond.notify_all()
+
+    # ---------- coordinator ----------
+    def _wait_until(self, predicate, timeout):
+        deadline = time.time() + timeout
+        while not predicate():
+            remaining = deadline - time.time()
+            if remaining <= 0 or not self._running:
+                return
+            self._cond.wait(remaining)
+
+    def _coordinator_loop(self):
+        while self._running:
+            round_start = time.time()
+            with self._cond:
+                self._seq += 1
+                seq = self._seq
+                self._grabs, self._frames, self._done = {}, {}, set()
+                # A camera stuck in an earlier round's grab()/retrieve() (e.g. a device being
+                # reopened) cannot join this round: wait only for the idle ones
+                idle = [name for name in self.cameras if name not in self._busy]
+                self._cond.notify_all()
+
+                self._wait_until(lambda: all(name in self._grabs for name in idle), self.grab_timeout)
+                self._retrieve_seq = seq
+                self._cond.notify_all()
+
+                grabbed = [name for name, (ok, _) in self._grabs.items() if ok]
+                self._wait_until(lambda: all(name in self._done for name in grabbed), self.retrieve_timeout)
+
+                frames = dict(self._frames)
+                grab_times = {name: self._grabs[name][1] for name in frames}
+
+            if frames:
+                self._publish(FrameSet(seq, frames, grab_times, list(self.cameras)))
+
+            sleep_time = self.interval - (time.time() - round_start)
+            if sleep_time > 0:
+                time.sleep(sleep_time)
+
+    def _publish(self, frame_set):
+        stats = self.stats
+        stats["sets"] += 1
+        if frame_set.missing:
+            stats["incomplete"] += 1
+        stats["skew_ms_avg"] += (frame_set.skew_ms - stats["skew_ms_avg"]) / stats["sets"]
+        stats["skew_ms_max"] = max(stats["skew_ms_max"], frame_set.skew_ms)
+
+        try:
+            self.sets.put_nowait(frame_set)
+        except Full:
+            # Drop the oldest set to keep latency low
+            try:
+                self.sets.get_nowait()
+                self.sets.put_nowait(frame_set)
+            except (Empty, Full):
+                pass
@@ -0,0 +1,261 @@
+import argparse
+import json
+import time
+import cv2
+import numpy as np
+
+# ========== KARELER ARASI (DELTA) KODLAMA ==========
+# OpenCV'nin bellek içi H.264 paket arayüzü yok (VideoWriter sadece dosya/boru yazar),
+# bu yüzden blok tabanlı bir MJPEG-delta kodlayıcı kullanılır:
+#   - her GOP başında tam JPEG anahtar kare (key)
+#   - aradaki karelerde sadece değişen BLOCK x BLOCK bloklar tek bir mozaik JPEG olarak (delta)
+#   - kodlayıcı kendi çıktısını çözüp referans olarak tutar (kapalı döngü), böylece
+#     kodlayıcı ve çözücünün referansı birebir aynıdır ve hata birikmez
+# Mesaj: ZMQ multipart [başlık JSON, yük]
+#   başlık: {"kind": "video", "cam", "type": "key"|"delta", "seq", "gop", "w", "h", "block", ...}
+#   delta yükü: değişen blok maskesi (packbits) + mozaik JPEG (değişen blok yoksa sadece maske)
+# Kayıp davranışı: seq/gop sırası bozulursa çözücü bir sonraki anahtar kareye kadar
+# kareleri atar; client yerelde bir paket düşürdüğünde bir sonraki kareyi anahtar kare yapar.
+GOP = 30                 # keyframe every GOP frames (2 s at 15 FPS)
+BLOCK = 16               # matches the 16x16 JPEG MCU (4:2:0), so tiles do not bleed into each other
+DELTA_THRESHOLD = 6.0    # mean abs difference (0-255) for a block to count as changed
+MAX_CHANGED = 0.5        # above this changed fraction a keyframe is cheaper
+QUALITY = 70
+
+
+def _pad(frame, block):
+    height, width = frame.shape[:2]
+    pad_h, pad_w = (-height) % block, (-width) % block
+    if pad_h or pad_w:
+        frame = cv2.copyMakeBorder(frame, 0, pad_h, 0, pad_w, cv2.BORDER_REPLICATE)
+    return frame
+
+
+def _block_view(frame, block):
+    """(satır, blok, sütun, blok, kanal) görünümü (kopya değil)"""
+    height, width, channels = frame.shape
+    return frame.reshape(height // block, block, width // block, block, channels)
+
+
+def _mosaic(tiles, cols, block):
+    """Blokları cols sütunlu tek bir görüntüde birleştirir"""
+    rows = -(-len(tiles) // cols)
+    padded = np.zeros((rows * cols,) + tiles.shape[1:], dtype=tiles.dtype)
+    padded[:len(tiles)] = tiles
+    return padded.reshape(rows, cols, block, block, -1).swapaxes(1, 2).reshape(rows * block, cols * block, -1)
+
+
+def _tiles(mosaic, cols, block, count):
+    rows = mosaic.shape[0] // block
+    tiles = mosaic.reshape(rows, block, cols, block, -1).swapaxes(1, 2)
+    return tiles.reshape(-1, block, block, mosaic.shape[2])[:count]
+
+
+class DeltaEncoder:
+    """Bir kamera için blok-delta MJPEG kodlayıcı (client tarafı)"""
+
+    def __init__(self, gop=GOP, block=BLOCK, threshold=DELTA_THRESHOLD, quality=QUALITY,
+                 max_changed=MAX_CHANGED):
+        self.gop = gop
+        self.block = block
+        self.threshold = threshold
+        self.max_changed = max_changed
+        self.encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), quality]
+        self.seq = 0
+        self.gop_id = 0
+        self._since_key = 0
+        self._force_key = True
+        self._ref = None
+
+    def force_keyframe(self):
+        """Bir paket yolda kaybolduysa çağrılır: sonraki kare anahtar kare olur"""
+        self._force_key = True
+
+    def encode(self, frame):
+        """Kareyi kodlar, (başlık alanları, yük baytları) döndürür"""
+        height, width = frame.shape[:2]
+        frame = _pad(frame, self.block)
+        self.seq += 1
+        header = {"seq": self.seq, "w": width, "h": height, "block": self.block}
+
+        key = (self._force_key or self._ref is None or self._ref.shape != frame.shape
+               or self._since_key >= self.gop - 1)
+        if not key:
+            grid = (frame.shape[1] // self.block, frame.shape[0] // self.block)
+            # INTER_AREA down to one pixel per block = per-block mean difference
+            block_diff = cv2.resize(cv2.absdiff(frame, self._ref), grid, interpolation=cv2.INTER_AREA)
+            changed = (block_diff.max(axis=2) if block_diff.ndim == 3 else block_diff) > self.threshold
+            key = changed.mean() > self.max_changed
+
+        if key:
+            _, encoded = cv2.imencode('.jpg', frame, self.encode_param)
+            self._ref = cv2.imdecode(encoded, cv2.IMREAD_COLOR)  # exactly what the decoder will hold
+            self.gop_id += 1
+            self._since_key = 0
+            self._force_key = False
+            header.update({"type": "key", "gop": self.gop_id})
+            return header, encoded.tobytes()
+
+        self._since_key += 1
+        header.update({"type": "delta", "gop": self.gop_id})
+        mask = np.packbits(changed.reshape(-1)).tobytes()
+        index = np.flatnonzero(changed)
+        if len(index) == 0:
+            return header, mask
+
+        cols = grid[0]
+        rows_i, cols_i = np.divmod(index, cols)
+        tiles = _block_view(frame, self.block)[rows_i, :, cols_i]
+        _, encoded = cv2.imencode('.jpg', _mosaic(tiles, cols, self.block), self.encode_param)
+        decoded = cv2.imdecode(encoded, cv2.IMREAD_COLOR)
+        _block_view(self._ref, self.block)[rows_i, :, cols_i] = _tiles(decoded, cols, self.block, len(index))
+        return header, mask + encoded.tobytes()
+
+
+class DeltaDecoder:
+    """Bir kameranın delta akışını çözer; sıra bozulursa anahtar kareye kadar bekler"""
+
+    def __init__(self):
+        self.stats = {"key": 0, "delta": 0, "broken": 0}
+        self._ref = None
+        self._gop = None
+        self._seq = None
+
+    def decode(self, header, payload):
+        """Paketi çözer, BGR kare döndürür (çözülemiyorsa None)"""
+        if header["type"] == "key":
+            frame = cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if frame is None:
+                self._ref = None
+                self.stats["broken"] += 1
+                return None
+            self._ref, self._gop, self._seq = frame, header["gop"], header["seq"]
+            self.stats["key"] += 1
+            return self._output(header)
+
+        if self._ref is None or header["gop"] != self._gop or header["seq"] != self._seq + 1:
+            # A packet is missing: the reference is unusable until the next keyframe
+            self.stats["broken"] += 1
+            return None
+
+        block = header["block"]
+        cols = self._ref.shape[1] // block
+        cells = (self._ref.shape[0] // block) * cols
+        mask_len = (cells + 7) // 8
+        changed = np.unpackbits(np.frombuffer(payload[:mask_len], dtype=np.uint8), count=cells)
+        index = np.flatnonzero(changed)
+        if len(index):
+            mosaic = cv2.imdecode(np.frombuffer(payload[mask_len:], dtype=np.uint8), cv2.IMREAD_COLOR)
+            if mosaic is None:
+                self._ref = None
+                self.stats["broken"] += 1
+                return None
+            rows_i, cols_i = np.divmod(index, cols)
+            _block_view(self._ref, block)[rows_i, :, cols_i] = _tiles(mosaic, cols, block, len(index))
+        self._seq = header["seq"]
+        self.stats["delta"] += 1
+        return self._output(header)
+
+    def _output(self, header):
+        # Copy: the reference is patched in place by the next delta while analysis may still use this frame
+        return self._ref[:header["h"], :header["w"]].copy()
+
+
+class StreamDecoders:
+    """Kamera başına DeltaDecoder (server tarafı, DecodePool içinden çağrılır)"""
+
+    def __init__(self):
+        self.decoders = {}
+
+    def decode(self, header, payload):
+        decoder = self.decoders.get(header["cam"])
+        if decoder is None:
+            decoder = self.decoders[header["cam"]] = DeltaDecoder()
+        return decoder.decode(header, payload)
+
+    def get_stats(self):
+        stats = {"key": 0, "delta": 0, "broken": 0}
+        for decoder in self.decoders.values():
+            for key, value in decoder.stats.items():
+                stats[key] += value
+        return stats
+
+
+# ========== KARŞILAŞTIRMA ==========
+def psnr(a, b):
+    mse = np.mean((a.astype(np.float32) - b.astype(np.float32)) ** 2)
+    return 99.0 if mse == 0 else float(10 * np.log10(255.0 ** 2 / mse))
+
+
+def benchmark(source, limit, size, gop, threshold, quality):
+    """Mevcut JPEG yolu (JSON içinde hex) ile delta kodlamayı aynı karelerde ölçer"""
+    from batch_analysis import iter_frames
+    encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), quality]
+    encoder = DeltaEncoder(gop=gop, threshold=threshold, quality=quality)
+    decoder = DeltaDecoder()
+    rows = {"jpeg": [], "delta": []}  # (bytes, encode s, decode s, psnr)
+
+    for count, (_, _, frame) in enumerate(iter_frames(source)):
+        if limit and count >= limit:
+            break
+        frame = cv2.resize(frame, size)
+
+        start = time.perf_counter()
+        _, encoded = cv2.imencode('.jpg', frame, encode_param)
+        message = json.dumps({"cam": "cam1", "img": encoded.tobytes().hex()})
+        encode_s = time.perf_counter() - start
+        start = time.perf_counter()
+        decoded = cv2.imdecode(np.frombuffer(bytes.fromhex(json.loads(message)["img"]), np.uint8), cv2.IMREAD_COLOR)
+        rows["jpeg"].append((len(message), encode_s, time.perf_counter() - start, psnr(frame, decoded)))
+
+        start = time.perf_counter()
+        header, payload = encoder.encode(frame)
+        header.update({"kind": "video", "cam": "cam1"})
+        header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+        encode_s = time.perf_counter() - start
+        start = time.perf_counter()
+        decoded = decoder.decode(json.loads(header_bytes), payload)
+        rows["delta"].append((len(header_bytes) + len(payload), encode_s, time.perf_counter() - start,
+                              psnr(frame, decoded)))
+
+    report = {}
+    for name, samples in rows.items():
+        if not samples:
+            continue
+        data = np.asarray(samples)
+        report[name] = {
+            "frames": len(samples),
+            "bytes_per_frame": float(data[:, 0].mean()),
+            "encode_ms": float(data[:, 1].mean() * 1000),
+            "decode_ms": float(data[:, 2].mean() * 1000),
+            "psnr_db": float(data[:, 3].mean())
+        }
+    report["delta_stats"] = decoder.stats
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="JPEG ve blok-delta akış kodlamasını karşılaştır")
+    parser.add_argument("source", help="Video dosyası veya resim dizini (kendi kameralarımızdan kayıt)")
+    parser.add_argument("--limit", type=int, default=600)
+    parser.add_argument("--width", type=int, default=320)
+    parser.add_argument("--height", type=int, default=240)
+    parser.add_argument("--gop", type=int, default=GOP)
+    parser.add_argument("--threshold", type=float, default=DELTA_THRESHOLD)
+    parser.add_argument("--quality", type=int, default=QUALITY)
+    parser.add_argument("--output", default=None, help="Sonuçları JSON olarak kaydet")
+    args = parser.parse_args()
+
+    report = benchmark(args.source, args.limit, (args.width, args.height), args.gop, args.threshold, args.quality)
+    for name in ("jpeg", "delta"):
+        if name in report:
+            r = report[name]
+            print(f"📊 {name:5s}: {r['bytes_per_frame'] / 1024:.1f} KB/kare, kodlama {r['encode_ms']:.2f} ms, "
+                  f"çözme {r['decode_ms']:.2f} ms, PSNR {r['psnr_db']:.1f} dB")
+    if "jpeg" in report and "delta" in report:
+        ratio = report["jpeg"]["bytes_per_frame"] / max(report["delta"]["bytes_per_frame"], 1)
+        print(f"📉 Delta, mevcut JPEG yoluna göre {ratio:.1f}x daha az bayt gönderiyor")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Rapor kaydedildi: {args.output}")